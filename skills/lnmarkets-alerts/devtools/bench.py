@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite run against the local API and feed stand-ins.
+Reports requests and wall time per check cycle, end-to-end tick-to-alert
+latency in stream mode, and risk evaluation throughput at 1 to 100k
+positions. Results can be saved as JSON and compared with a previous run,
+e.g. one taken on another commit.
+"""
+
+import sys
+import os
+import json
+import time
+import signal
+import asyncio
+import argparse
+import platform
+import tempfile
+import functools
+import subprocess
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_api import MockAPI
+from mock_ws import MockPriceFeed
+from bench_risk import synthetic_trades, best_of
+
+import lnm_client
+import alert_check
+from notifier import Notifier
+from risk_engine import PositionBook, LiquidationIndex, breaches
+from poll_scheduler import PollScheduler
+
+CREDENTIALS = ("bench-key", "bench-secret", "bench-passphrase")
+ACCOUNTS = [("bench", CREDENTIALS)]
+
+# Stream scenario: one long position, the feed flips between a safe price and
+# one inside the liquidation threshold
+LIQUIDATION = 60000.0
+SAFE_PRICE = 70000.0  # 14% from liquidation, past the re-arm level
+RISKY_PRICE = 64000.0  # 6% from liquidation
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+def bench_cycles(mock: MockAPI, cycles: int) -> dict:
+    """Requests and wall time per alert_check cycle; the first one is cold."""
+    lnm_client.invalidate_clock()
+    state = {}
+    per_cycle = []
+    timings = []
+    refill = 2 / lnm_client.AUTH_RATE[0]  # Two auth calls per cycle
+    for n in range(cycles):
+        if n:
+            time.sleep(refill)  # Like the daemon interval, start with the auth budget refilled
+        logged = len(mock.log)
+        started = time.perf_counter()
+        alert_check.run_check(state, ACCOUNTS)
+        timings.append(time.perf_counter() - started)
+        per_cycle.append(Counter(path.split("?")[0] for _, _, path, _ in mock.log[logged:]))
+    warm = per_cycle[1:] or per_cycle
+    # Daemon mode between position refreshes: cached positions are marked to market
+    scheduler = PollScheduler(3600)
+    alert_check.run_check(state, ACCOUNTS, scheduler)
+    logged = len(mock.log)
+    alert_check.run_check(state, ACCOUNTS, scheduler)
+    time.sleep(0.1)  # The mock logs a request after answering it
+    cached = len(mock.log) - logged
+    return {
+        "cycle.requests_cold": sum(per_cycle[0].values()),
+        "cycle.requests_warm": sum(sum(c.values()) for c in warm) / len(warm),
+        "cycle.requests_cached": cached,
+        "cycle.ms_cold": timings[0] * 1000,
+        "cycle.ms_warm": sum(timings[1:] or timings) / len(timings[1:] or timings) * 1000,
+        "cycle.bad_signatures": mock.bad_signatures,
+        "_endpoints": dict(per_cycle[0]),
+    }
+
+
+class ScriptedFeed(MockPriceFeed):
+    """Feed that jumps to `target` and notes when the jump went out."""
+
+    def __init__(self, **kwargs):
+        super().__init__(volatility=0, **kwargs)
+        self.target = self.price
+        self.jumped_at = None
+
+    def next_price(self) -> float:
+        if self.price != self.target:
+            self.price = self.target
+            self.jumped_at = time.perf_counter()
+        return self.price
+
+
+class CaptureSink:
+    """Notifier sink that timestamps every message."""
+
+    name = "capture"
+    limit = None
+
+    def __init__(self):
+        self.received = []  # (perf_counter, text)
+        self.arrived = None  # Callback run on each message
+
+    def send(self, text: str) -> None:
+        self.received.append((time.perf_counter(), text))
+        if self.arrived:
+            self.arrived()
+
+
+async def bench_tick_to_alert(mock: MockAPI, samples: int, tick_interval: float) -> dict:
+    """Time from a price tick leaving the feed to its liquidation alert reaching a sink."""
+    mock.running_trades = [{
+        "id": "bench-position", "side": "b", "quantity": 100, "price": 66000,
+        "margin": 2000, "pl": 0, "liquidation": LIQUIDATION,
+    }]
+    feed = await ScriptedFeed(price=SAFE_PRICE, tick_interval=tick_interval).start()
+    sink = CaptureSink()
+    loop = asyncio.get_running_loop()
+    arrived = asyncio.Event()
+    sink.arrived = lambda: loop.call_soon_threadsafe(arrived.set)
+
+    # Run the real stream loop, minus the notifier batch window
+    alert_check.PriceStream = functools.partial(alert_check.PriceStream, url=feed.url)
+    alert_check.Notifier = functools.partial(Notifier, batch_window=0)
+    stream = asyncio.ensure_future(alert_check.run_stream(3600, 3600, ACCOUNTS, [sink]))
+
+    # Wait for the first position refresh to land
+    logged = len(mock.log)
+    for _ in range(1000):
+        paths = [path for _, _, path, status in mock.log[logged:] if status == 200]
+        if any("/cross/position" in p for p in paths) and any("/running" in p for p in paths):
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(tick_interval * 5)
+
+    latencies = []
+    for _ in range(samples):
+        feed.target = SAFE_PRICE
+        await asyncio.sleep(tick_interval * 3)  # Let the alert re-arm
+        arrived.clear()
+        seen = len(sink.received)
+        feed.target = RISKY_PRICE
+        try:
+            await asyncio.wait_for(arrived.wait(), timeout=2)
+        except asyncio.TimeoutError:
+            continue
+        for received_at, text in sink.received[seen:]:
+            if "LIQUIDATION" in text:
+                latencies.append(received_at - feed.jumped_at)
+                break
+
+    os.kill(os.getpid(), signal.SIGINT)  # run_stream shuts down on SIGINT
+    await stream
+    await feed.stop()
+    return {
+        "tick_to_alert.samples": len(latencies),
+        "tick_to_alert.p50_ms": percentile(latencies, 50) * 1000,
+        "tick_to_alert.p95_ms": percentile(latencies, 95) * 1000,
+    }
+
+
+def bench_risk(sizes: list, repeat: int) -> dict:
+    """Evaluation throughput and per-tick index lookup time per book size."""
+    price = 65000.0
+    results = {}
+    for n in sizes:
+        book = PositionBook.from_positions(synthetic_trades(n, price))
+        evaluate = best_of(lambda: breaches(book, price, 10, 20), repeat)
+        index = LiquidationIndex(10)
+        index.sync(book)
+        tick = best_of(lambda: index.crossed(price), repeat)
+        results[f"risk.positions_per_s.{n}"] = n / evaluate if evaluate else float("inf")
+        results[f"risk.index_tick_us.{n}"] = tick * 1e6
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: dict, baseline: dict = None) -> None:
+    for name, value in results.items():
+        if name.startswith("_"):
+            continue
+        line = f"{name:<32} {value:>14,.2f}"
+        if baseline and name in baseline and baseline[name]:
+            change = (value - baseline[name]) / baseline[name] * 100
+            line += f"   was {baseline[name]:>14,.2f} ({change:+.1f}%)"
+        print(line)
+
+
+async def run(args) -> dict:
+    mock = MockAPI(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                   throttle_rate=args.throttle_rate, seed=1).start()
+    mock.secrets[CREDENTIALS[0]] = CREDENTIALS[1]  # Verify every signature
+    lnm_client.API_BASE = mock.base_url
+    # Keep the benchmark's state away from the real state database
+    with tempfile.TemporaryDirectory(prefix="lnm-bench-") as workdir:
+        alert_check.STATE_DB = os.path.join(workdir, "state.db")
+        alert_check.LEGACY_STATE_FILE = os.path.join(workdir, "missing.json")
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(None, bench_cycles, mock, args.cycles)
+            if args.samples:
+                results.update(await bench_tick_to_alert(mock, args.samples, args.tick_interval))
+            results.update(bench_risk([int(size) for size in args.sizes.split(",")], args.repeat))
+        finally:
+            mock.stop()
+            if alert_check._store is not None:
+                alert_check._store.close()
+                alert_check._store = None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark alert checks against local stand-ins")
+    parser.add_argument("--cycles", type=int, default=4, help="Check cycles to time")
+    parser.add_argument("--samples", type=int, default=20, help="Tick-to-alert samples (0 = skip)")
+    parser.add_argument("--tick-interval", type=float, default=0.02, help="Feed tick interval")
+    parser.add_argument("--sizes", default="1,100,10000,100000", help="Risk book sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock API response latency")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of injected 429s")
+    parser.add_argument("--json", metavar="FILE", help="Save results to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="Show changes against a saved run")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            saved = json.load(f)
+        baseline = saved["results"]
+        print(f"Comparing with {saved.get('commit', 'unknown')} ({saved.get('date', '?')})")
+
+    results = asyncio.run(run(args))
+    lnm_client.close_connections()
+    print(f"Endpoints per cold cycle: {results['_endpoints']}")
+    print_results(results, baseline)
+
+    if args.json:
+        report = {
+            "commit": git_commit(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+            "results": {k: v for k, v in results.items() if not k.startswith("_")},
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if results["cycle.bad_signatures"]:
+        print("❌ Mock API rejected signatures")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
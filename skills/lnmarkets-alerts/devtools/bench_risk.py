@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark the risk engine against synthetic position books.
+Times loading positions into the columnar book, evaluating liquidation
+distance / loss for every position, a per-tick liquidation index
+lookup, and a ±30% stress grid in 0.1% steps, at increasing book sizes.
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from risk_engine import PositionBook, LiquidationIndex, breaches, price_grid, stress_test
+
+
+def synthetic_trades(n: int, price: float = 65000.0, seed: int = 1) -> list:
+    """Random isolated trades around `price`, 2x-25x leverage."""
+    rng = random.Random(seed)
+    trades = []
+    for i in range(n):
+        long = rng.random() < 0.5
+        entry = price * rng.uniform(0.97, 1.03)
+        leverage = rng.uniform(2, 25)
+        quantity = rng.randint(1, 10_000)
+        margin = int(quantity / entry * 1e8 / leverage)
+        liquidation = entry * (1 - 1 / leverage) if long else entry / (1 - 1 / (leverage + 1))
+        pl = int(quantity * (1 / entry - 1 / price) * 1e8) * (1 if long else -1)
+        trades.append({
+            "id": f"{i:032x}", "side": "b" if long else "s", "quantity": quantity,
+            "price": entry, "margin": margin, "pl": pl, "liquidation": liquidation,
+        })
+    return trades
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark risk evaluation throughput")
+    parser.add_argument("--sizes", default="1,100,10000,100000",
+                        help="Comma-separated book sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    price = 65000.0
+    print(f"{'positions':>10} {'load ms':>9} {'eval ms':>9} {'positions/s':>13} "
+          f"{'alerts':>7} {'index tick us':>14} {'stress ms':>10}")
+    for n in (int(size) for size in args.sizes.split(",")):
+        trades = synthetic_trades(n, price)
+        load = best_of(lambda: PositionBook.from_positions(trades), args.repeat)
+        book = PositionBook.from_positions(trades)
+        evaluate = best_of(lambda: breaches(book, price, 10, 20), args.repeat)
+        alerts = len(breaches(book, price, 10, 20))
+        rate = n / evaluate if evaluate else float("inf")
+        index = LiquidationIndex(10)
+        index.sync(book)
+        tick = best_of(lambda: index.crossed(price), args.repeat)
+        grid = price_grid(price, 30, 0.1)
+        stress = best_of(lambda: stress_test(book, grid, price), args.repeat)
+        print(f"{n:>10,} {load * 1000:>9.2f} {evaluate * 1000:>9.2f} {rate:>13,.0f} "
+              f"{alerts:>7,} {tick * 1e6:>14.1f} {stress * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Concurrent load check for lnm_client's rate limiting.
+Hammers a local mock API from many threads, then verifies from the server's
+request log that no rate-limit window was exceeded and that identical
+in-flight GETs were coalesced.
+"""
+
+import sys
+import os
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_api import MockAPI, AUTH_LIMIT, PUBLIC_LIMIT
+
+import lnm_client
+
+
+def peak_in_window(times: list, window: float) -> int:
+    """Largest number of requests in any window of the given length."""
+    times = sorted(times)
+    peak = 0
+    start = 0
+    for end, t in enumerate(times):
+        while t - times[start] >= window:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check lnm_client stays within rate limits")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=4, help="Calls per thread")
+    args = parser.parse_args()
+
+    mock = MockAPI().start()
+    lnm_client.API_BASE = mock.base_url
+    os.environ.setdefault("LNM_API_KEY", "load-test")
+    os.environ.setdefault("LNM_API_SECRET", "secret")
+    os.environ.setdefault("LNM_API_PASSPHRASE", "passphrase")
+
+    errors = []
+    barrier = threading.Barrier(args.threads)
+
+    calls = [lnm_client.get_ticker, lnm_client.get_running_trades,
+             lnm_client.get_cross_position, lnm_client.get_account]
+
+    def worker(n):
+        barrier.wait()  # Start together so GETs overlap
+        for i in range(args.calls):
+            try:
+                calls[(n + i) % len(calls)]()
+            except Exception as e:
+                errors.append(e)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+    mock.stop()
+
+    total = args.threads * args.calls
+    served = {"auth": [], "public": []}
+    throttled = 0
+    for at, limit_class, _, status in mock.log:
+        if status == 429:
+            throttled += 1
+        else:
+            served[limit_class].append(at)
+
+    auth_peak = peak_in_window(served["auth"], AUTH_LIMIT[1])
+    public_peak = peak_in_window(served["public"], PUBLIC_LIMIT[1])
+    upstream = len(served["auth"]) + len(served["public"])
+
+    print(f"Client calls:      {total} in {elapsed:.1f}s")
+    print(f"Upstream requests: {upstream} ({total - upstream} coalesced)")
+    print(f"Auth peak:         {auth_peak}/{AUTH_LIMIT[0]} per {AUTH_LIMIT[1]:.0f}s")
+    print(f"Public peak:       {public_peak}/{PUBLIC_LIMIT[0]} per {PUBLIC_LIMIT[1]:.0f}s")
+    print(f"429 responses:     {throttled}")
+    print(f"Client errors:     {len(errors)}")
+
+    ok = (auth_peak <= AUTH_LIMIT[0] and public_peak <= PUBLIC_LIMIT[0]
+          and not throttled and not errors)
+    print("✅ Within limits" if ok else "❌ Limits exceeded")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the LN Markets v3 REST API.
+Serves canned data for the endpoints lnm_client uses and enforces the
+documented rate limits, so the client can be exercised offline. Latency,
+server errors and 429s can be injected, and signatures are verified with
+the client's own sign_request for keys whose secret is registered.
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import threading
+import argparse
+import urllib.parse
+from collections import deque
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from lnm_client import sign_request
+
+# Documented limits: (requests, window in seconds)
+AUTH_LIMIT = (1, 1.0)
+PUBLIC_LIMIT = (30, 60.0)
+
+TIMESTAMP_TOLERANCE_MS = 30_000  # Signed requests further off are rejected
+
+
+class MockAPI:
+    """In-process mock server; start() it and point LNM_API_BASE at base_url."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, enforce_limits: bool = True,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, seed: int = None):
+        self.enforce_limits = enforce_limits
+        self.latency = latency  # Seconds added before every response
+        self.jitter = jitter  # Uniform extra latency, up to this many seconds
+        self.error_rate = error_rate  # Fraction of requests answered with 503
+        self.throttle_rate = throttle_rate  # Fraction answered with 429 regardless of limits
+        self.secrets = {}  # API key -> secret; requests signed with these keys are verified
+        self.bad_signatures = 0
+        self._random = random.Random(seed)
+        self.ticker = {"index": 65000.0, "lastPrice": 65010.0, "bid": 65005.0,
+                       "offer": 65015.0, "fundingRate": 0.0001}
+        self.running_trades = []
+        self.closed_trades = []  # Served newest first, paginated
+        # Other paginated history, by route suffix; records carry a "time" in ms
+        self.history = {
+            "/futures/isolated/funding-fees": [], "/futures/cross/funding-fees": [],
+            "/account/deposits/lightning": [], "/account/deposits/bitcoin": [],
+            "/account/withdrawals/lightning": [], "/account/withdrawals/bitcoin": [],
+        }
+        self.cross_position = {"quantity": 0}
+        self.account = {"username": "mock", "balance": 1_000_000}
+        self.revoked_keys = set()  # API keys answered with 401
+        self.log = []  # (monotonic time, limit class, path, status)
+        self._windows = {}  # limit class or api key -> deque of request times
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v3"
+
+    def start(self) -> "MockAPI":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def admit(self, limit_class: str, bucket: str) -> float:
+        """Record a request; return 0 if within limits, else seconds to retry after."""
+        limit, window = AUTH_LIMIT if limit_class == "auth" else PUBLIC_LIMIT
+        now = time.monotonic()
+        with self._lock:
+            times = self._windows.setdefault(bucket, deque())
+            while times and now - times[0] >= window:
+                times.popleft()
+            if self.enforce_limits and len(times) >= limit:
+                return window - (now - times[0])
+            times.append(now)
+            return 0.0
+
+    def inject(self) -> int:
+        """Sleep for the configured latency; return an injected error status or 0."""
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter) if self.jitter else self.latency
+            roll = self._random.random()
+        if delay:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            return 503
+        if roll < self.error_rate + self.throttle_rate:
+            return 429
+        return 0
+
+    def verify(self, method: str, path: str, headers) -> str:
+        """Check a signed request; return an error message or None.
+
+        Keys without a registered secret are accepted unchecked.
+        """
+        secret = self.secrets.get(headers.get("lnm-access-key", ""))
+        if secret is None:
+            return None
+        timestamp = headers.get("lnm-access-timestamp", "")
+        try:
+            skew = abs(int(timestamp) - time.time() * 1000)
+        except ValueError:
+            skew = float("inf")
+        if skew > TIMESTAMP_TOLERANCE_MS:
+            return "Invalid timestamp"
+        route, _, query = path.partition("?")
+        data = f"?{query}" if query else ""
+        expected = sign_request(secret, timestamp, method, route, data)
+        if headers.get("lnm-access-signature") != expected:
+            with self._lock:
+                self.bad_signatures += 1
+            return "Invalid signature"
+        return None
+
+    def record(self, limit_class: str, path: str, status: int) -> None:
+        with self._lock:
+            self.log.append((time.monotonic(), limit_class, path, status))
+
+    def route(self, path: str):
+        """Return (limit class, response body) for a path, or None if unknown."""
+        route = path.split("?", 1)[0]
+        if route == "/v3/time":
+            now = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+            return "public", {"time": now.replace("+00:00", "Z")}
+        if route == "/v3/futures/ticker":
+            return "public", self.ticker
+        if route == "/v3/futures/isolated/trades/running":
+            return "auth", self.running_trades
+        if route == "/v3/futures/cross/position":
+            return "auth", self.cross_position
+        if route == "/v3/account":
+            return "auth", self.account
+        if route == "/v3/futures/isolated/trades/closed":
+            return "auth", self.page(path, self.closed_trades, "closedAt")
+        if route[len("/v3"):] in self.history:
+            return "auth", self.page(path, self.history[route[len("/v3"):]], "time")
+        return None
+
+    def page(self, path: str, records: list, time_key: str) -> dict:
+        """One page of records, newest first: `from` (ms), `limit` and an offset `cursor`."""
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(path).query)
+        since = int(query.get("from", ["0"])[0])
+        limit = int(query.get("limit", ["100"])[0])
+        offset = int(query.get("cursor", ["0"])[0])
+        with self._lock:
+            matching = [r for r in records if r.get(time_key, 0) >= since]
+        matching.sort(key=lambda r: r.get(time_key, 0), reverse=True)
+        page = matching[offset:offset + limit]
+        more = offset + limit < len(matching)
+        return {"data": page, "nextCursor": str(offset + limit) if more else None}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        mock = self.server.mock
+        routed = mock.route(self.path)
+        if routed is None:
+            self._reply(404, {"message": "Not found"})
+            return
+        limit_class, body = routed
+        injected = mock.inject()
+        bucket = self.headers.get("lnm-access-key", "") if limit_class == "auth" else "public"
+        if limit_class == "auth" and (not bucket or bucket in mock.revoked_keys):
+            self._reply(401, {"message": "Invalid credentials"})
+            mock.record(limit_class, self.path, 401)
+            return
+        if limit_class == "auth":
+            rejected = mock.verify("GET", self.path, self.headers)
+            if rejected:
+                status = 401 if "signature" in rejected else 400
+                self._reply(status, {"message": rejected})
+                mock.record(limit_class, self.path, status)
+                return
+        if injected == 503:
+            self._reply(503, {"message": "Service unavailable"})
+            mock.record(limit_class, self.path, 503)
+            return
+        retry_after = 0.1 if injected == 429 else mock.admit(limit_class, bucket)
+        if retry_after:
+            self._reply(429, {"message": "Too many requests"},
+                        {"Retry-After": f"{retry_after:.3f}"})
+            mock.record(limit_class, self.path, 429)
+            return
+        self._reply(200, body)
+        mock.record(limit_class, self.path, 200)
+
+    def _reply(self, status: int, body, headers: dict = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local LN Markets v3 API stand-in")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--no-limits", action="store_true", help="Do not enforce rate limits")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra latency, up to this")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of injected 429s")
+    parser.add_argument("--key", help="API key whose signatures are verified (with --secret)")
+    parser.add_argument("--secret", help="API secret for --key")
+    args = parser.parse_args()
+
+    mock = MockAPI(port=args.port, enforce_limits=not args.no_limits, latency=args.latency,
+                   jitter=args.jitter, error_rate=args.error_rate,
+                   throttle_rate=args.throttle_rate).start()
+    if args.key and args.secret:
+        mock.secrets[args.key] = args.secret
+    print(f"Mock LN Markets API on {mock.base_url}")
+    print(f"   export LNM_API_BASE={mock.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
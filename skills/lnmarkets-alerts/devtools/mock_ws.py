@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the LN Markets WebSocket price feed.
+Accepts JSON-RPC subscriptions and pushes random-walk index / last-price
+ticks. Can drop connections on a timer to exercise client reconnects.
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from lnm_stream import (
+    WebSocket, ConnectionClosed, accept_key, read_frame, SUBSCRIBE_METHOD,
+)
+
+
+class MockPriceFeed:
+    """In-process feed server; start() it and point LNM_WS_URL at url."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, price: float = 65000.0,
+                 tick_interval: float = 0.1, volatility: float = 0.0005,
+                 drop_every: float = 0, silent: bool = False):
+        self.host = host
+        self.port = port
+        self.price = price
+        self.tick_interval = tick_interval
+        self.volatility = volatility  # Std dev of each step, as a fraction
+        self.drop_every = drop_every  # Seconds before dropping a connection (0 = never)
+        self.silent = silent  # Stop sending anything, including pongs
+        self.connections = 0
+        self.subscriptions = 0
+        self._server = None
+        self._writers = set()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self) -> "MockPriceFeed":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()  # Ends each handler's read loop
+        await self._server.wait_closed()
+        await asyncio.sleep(0)
+
+    def next_price(self) -> float:
+        self.price *= 1 + random.gauss(0, self.volatility)
+        return self.price
+
+    async def _handshake(self, reader, writer) -> bool:
+        head = await reader.readuntil(b"\r\n\r\n")
+        key = None
+        for line in head.decode("latin-1").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "sec-websocket-key":
+                key = value.strip()
+        if not key:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            writer.close()
+            return False
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        return True
+
+    async def _handle(self, reader, writer):
+        try:
+            if not await self._handshake(reader, writer):
+                return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        self.connections += 1
+        self._writers.add(writer)
+        ws = WebSocket(reader, writer, client=False)
+        channels = []
+        pusher = asyncio.ensure_future(self._push(ws, channels))
+        try:
+            while self.silent:
+                await read_frame(reader)  # Swallow everything, even pings
+            while True:
+                message = json.loads(await ws.recv())
+                if message.get("method") == SUBSCRIBE_METHOD:
+                    self.subscriptions += 1
+                    channels[:] = message.get("params", [])
+                    await ws.send_text(json.dumps(
+                        {"jsonrpc": "2.0", "id": message.get("id"), "result": channels}))
+        except (ConnectionClosed, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            pusher.cancel()
+            ws.abort()
+            self._writers.discard(writer)
+
+    async def _push(self, ws, channels):
+        opened = time.monotonic()
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            if self.drop_every and time.monotonic() - opened >= self.drop_every:
+                ws.abort()  # Simulate a network drop, no close frame
+                return
+            if self.silent or not channels:
+                continue
+            price = self.next_price()
+            stamp = int(time.time() * 1000)
+            for channel in channels:
+                if channel.endswith(":index"):
+                    data = {"index": round(price, 2), "time": stamp}
+                elif channel.endswith(":last-price"):
+                    data = {"lastPrice": round(price, 1), "time": stamp}
+                else:
+                    continue
+                await ws.send_text(json.dumps({
+                    "jsonrpc": "2.0",
+                    "method": "subscription",
+                    "params": {"channel": channel, "data": data},
+                }))
+
+
+async def serve(args):
+    feed = await MockPriceFeed(port=args.port, tick_interval=args.tick_interval,
+                               volatility=args.volatility, drop_every=args.drop_every).start()
+    print(f"Mock LN Markets price feed on {feed.url}")
+    print(f"   export LNM_WS_URL={feed.url}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local LN Markets WebSocket feed stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tick-interval", type=float, default=0.5, help="Seconds between ticks")
+    parser.add_argument("--volatility", type=float, default=0.0005, help="Random-walk step std dev")
+    parser.add_argument("--drop-every", type=float, default=0,
+                        help="Drop each connection after this many seconds (0 = never)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Offline check of the alert notifier.
+Runs Notifier against a local HTTP stub standing in for the Telegram Bot API
+and a webhook, and verifies batching, retries on 429/5xx and per-chat
+spacing of Telegram messages.
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+import notifier
+from notifier import Notifier, TelegramSink, WebhookSink
+
+
+class NotifyStub:
+    """HTTP stub for Telegram sendMessage and a webhook endpoint.
+
+    Queue status codes in `failures` to answer the next requests with them.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.received = []  # (monotonic time, path, JSON body) of accepted messages
+        self.failures = []  # Statuses to return before accepting again
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "NotifyStub":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def messages(self, path_part: str) -> list:
+        with self._lock:
+            return [entry for entry in self.received if path_part in entry[1]]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with stub._lock:
+            status = stub.failures.pop(0) if stub.failures else 200
+            if status == 200:
+                stub.received.append((time.monotonic(), self.path, body))
+            else:
+                stub.rejected += 1
+        if status == 429:
+            reply = {"ok": False, "error_code": 429, "parameters": {"retry_after": 0.2}}
+        else:
+            reply = {"ok": status == 200}
+        payload = json.dumps(reply).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+async def check(args):
+    notifier.SEND_BACKOFF_BASE = 0.05  # Keep the run short
+    failures = []
+    stub = NotifyStub().start()
+    telegram = TelegramSink("123:abc", "42", api_base=stub.url)
+    webhook = WebhookSink(f"{stub.url}/hook")
+
+    # Alerts raised close together go out as one message per sink
+    sender = Notifier([telegram, webhook], batch_window=0.3).start()
+    for n in range(5):
+        sender.notify([f"alert {n}"], header="HEADER")
+        await asyncio.sleep(0.02)
+    await asyncio.sleep(0.6)
+    batched = stub.messages("/sendMessage")
+    hooked = stub.messages("/hook")
+    print(f"Batching:        5 alerts -> {len(batched)} Telegram, {len(hooked)} webhook message(s)")
+    if len(batched) != 1 or len(hooked) != 1 or batched[0][2]["text"].count("alert") != 5:
+        failures.append("alerts raised together were not batched into one message")
+
+    # 429 and 5xx are retried until delivered
+    stub.failures = [429, 502, 503]
+    sender.notify(["retried alert"])
+    await asyncio.sleep(0.3 + 2)
+    delivered = [m for m in stub.messages("/") if "retried" in m[2].get("text", "")]
+    print(f"Retries:         {stub.rejected} rejected, {len(delivered)} delivered")
+    if len(delivered) != 2:
+        failures.append("messages were not delivered after 429/5xx")
+
+    # Separate batches to one chat are spaced by the per-chat limit
+    sender.batch_window = 0
+    before = len(stub.messages("/sendMessage"))
+    for n in range(args.messages):
+        sender.notify([f"burst {n}"])
+        await asyncio.sleep(0.05)
+    await sender.close()
+    sends = [m[0] for m in stub.messages("/sendMessage")[before:]]
+    gaps = [b - a for a, b in zip(sends, sends[1:])]
+    min_gap = min(gaps) if gaps else float("nan")
+    print(f"Chat rate limit: {len(sends)} messages, min gap {min_gap:.2f}s")
+    interval = 1 / notifier.TELEGRAM_CHAT_RATE[0]
+    if not gaps or min_gap < interval * 0.9:
+        failures.append("Telegram messages to one chat were not spaced out")
+
+    # A permanent error is dropped, not retried
+    stub.failures = [400]
+    sender = Notifier([telegram], batch_window=0).start()
+    sender.notify(["bad request"])
+    await sender.close()
+    print(f"Client errors:   {sender.failed} dropped without retry")
+    if sender.failed != 1:
+        failures.append("4xx response was retried or not reported")
+
+    stub.stop()
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Batching, retries and rate limits OK")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the alert notifier offline")
+    parser.add_argument("--messages", type=int, default=4, help="Messages in the rate-limit burst")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(check(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Offline check of the WebSocket price feed client.
+Runs PriceStream against the local mock feed and verifies that ticks arrive,
+that a failing tick callback doesn't end the feed, that dropped and silent
+connections are detected, and that the client reconnects and resubscribes
+each time.
+"""
+
+import io
+import sys
+import os
+import time
+import asyncio
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ws import MockPriceFeed
+
+import lnm_stream
+from lnm_stream import PriceStream
+
+
+async def run_phase(feed, seconds, heartbeat=0.2, timeout=0.5, fail_every=0):
+    """Stream for `seconds`; return (ticks, tick delays in ms, stream).
+
+    With `fail_every`, the callback raises on every n-th tick after recording it.
+    """
+    ticks = []
+    delays = []
+
+    def on_tick(tick):
+        ticks.append(tick)
+        delays.append(time.time() * 1000 - tick["time"])
+        if fail_every and len(ticks) % fail_every == 0:
+            raise ValueError("callback failure")
+
+    stop = asyncio.Event()
+    stream = PriceStream(on_tick, url=feed.url, heartbeat=heartbeat, timeout=timeout)
+    task = asyncio.ensure_future(stream.run(stop))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await task
+    return ticks, delays, stream
+
+
+async def check(args):
+    lnm_stream.RECONNECT_BASE = 0.05  # Keep the run short
+    failures = []
+
+    feed = await MockPriceFeed(tick_interval=0.02).start()
+    ticks, delays, stream = await run_phase(feed, args.seconds)
+    await feed.stop()
+    delays.sort()
+    p50 = delays[len(delays) // 2] if delays else float("nan")
+    print(f"Steady feed:     {len(ticks)} ticks, delivery p50 {p50:.1f}ms")
+    if not ticks:
+        failures.append("no ticks received")
+
+    feed = await MockPriceFeed(tick_interval=0.02, drop_every=0.5).start()
+    ticks, _, stream = await run_phase(feed, args.seconds)
+    await feed.stop()
+    print(f"Dropped links:   {stream.connects} connects, {feed.subscriptions} subscriptions, "
+          f"{len(ticks)} ticks")
+    if stream.connects < 2 or feed.subscriptions != stream.connects:
+        failures.append("did not reconnect and resubscribe after drops")
+
+    feed = await MockPriceFeed(tick_interval=0.02).start()
+    with contextlib.redirect_stderr(io.StringIO()) as errors:
+        ticks, _, stream = await run_phase(feed, args.seconds, fail_every=2)
+    await feed.stop()
+    dropped = errors.getvalue().count("Dropped price tick")
+    print(f"Failing handler: {len(ticks)} ticks, {dropped} callback errors, {stream.connects} connect(s)")
+    if dropped < 2 or stream.connects != 1 or len(ticks) < 2 * dropped:
+        failures.append("a failing tick callback ended or restarted the feed")
+
+    feed = await MockPriceFeed(tick_interval=0.02, silent=True).start()
+    _, _, stream = await run_phase(feed, args.seconds)
+    await feed.stop()
+    print(f"Silent server:   {stream.connects} connects (heartbeat timeouts)")
+    if stream.connects < 2:
+        failures.append("did not detect a silent connection")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Feed, heartbeat and reconnect OK")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the WebSocket feed client offline")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duration of each phase")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(check(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
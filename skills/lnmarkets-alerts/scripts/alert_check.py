@@ -7,212 +7,896 @@ Checks positions and price, returns alerts if any issues detected.
 import sys
 import os
 import json
+import time
+import signal
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from lnm_client import get_ticker, get_account, get_all_positions
+from lnm_client import (
+    get_ticker, get_account, get_all_positions, get_clock_state, load_clock_state,
+    load_accounts, close_connections, set_cache,
+)
+from lnm_stream import PriceStream
+from risk_engine import (
+    PositionBook, LiquidationIndex, LossIndex, breaches, inverse_pl, liquidation_distance, margin_usage,
+)
+from price_monitor import MovementDetector, format_duration
+from state_store import StateStore
+from alert_suppression import AlertSuppressor
+from alert_rules import load_rules, compile_rules
+from notifier import Notifier, StdoutSink, sinks_from_env, send_alerts
+from position_tracker import PositionTracker, fetch_closed_trades
+from tick_recorder import TickRecorder, TICK_FILE
+from poll_scheduler import PollScheduler, MIN_POLL_INTERVAL, VOLATILITY_WINDOW, format_decision
+import metrics
 
-# Alert thresholds
-LIQUIDATION_THRESHOLD = 10  # Alert if <10% from liquidation
-LOSS_THRESHOLD = 20  # Alert if loss >20% of margin
-PRICE_CHANGE_THRESHOLD = 5  # Alert if price changed >5% since last check
+PRICE_HISTORY_CAPACITY = 100_000  # Samples kept in the ring buffer
 
-STATE_FILE = os.path.join(os.path.dirname(__file__), "..", ".alert_state.json")
+STATE_DB = os.path.join(os.path.dirname(__file__), "..", ".alert_state.db")
+LEGACY_STATE_FILE = os.path.join(os.path.dirname(__file__), "..", ".alert_state.json")
 
+DEFAULT_ACCOUNTS = [(None, None)]  # Credentials from LNM_API_* environment variables
+ACCOUNT_WORKERS = 16  # Accounts checked concurrently
 
-PRICE_HISTORY_LENGTH = 5  # Track last 5 minutes
+_account_executor = None
+_store = None
+_recorder = None  # TickRecorder when ticks are being recorded
+_plan = None  # Compiled RulePlan
+_schedule_log = None  # Called with every changed polling decision (--debug-schedule)
 
+DAEMON_INTERVAL = 15  # Seconds between checks in daemon mode
+CHECKPOINT_INTERVAL = 60  # Seconds between state saves in daemon mode
+HISTORY_RETENTION = 7 * 86400  # Seconds of price samples and position changes kept (at least the longest window)
+POSITION_REFRESH_INTERVAL = 60  # Longest time between position refreshes in daemon and stream mode
 
-def load_state():
-    """Load previous state (price history)."""
+
+def get_store():
+    """Open the state database, importing a legacy JSON state file once."""
+    global _store
+    if _store is None:
+        _store = StateStore(STATE_DB)
+        _migrate_legacy_state(_store)
+    return _store
+
+
+def _migrate_legacy_state(store):
+    """Import .alert_state.json from before the SQLite store, then set it aside."""
+    if not os.path.exists(LEGACY_STATE_FILE) or store.load():
+        return
     try:
-        with open(STATE_FILE, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {"price_history": []}
+        with open(LEGACY_STATE_FILE, "r") as f:
+            legacy = json.load(f)
+    except (OSError, ValueError):
+        return
+    # Older files kept bare prices without timestamps; those can't be replayed
+    history = [s for s in legacy.pop("price_history", []) if isinstance(s, list)]
+    store.save(legacy, prices=history)
+    os.replace(LEGACY_STATE_FILE, LEGACY_STATE_FILE + ".migrated")
+
+
+def get_plan():
+    """Compiled alert rules: the built-in defaults unless main() loaded a rule file."""
+    global _plan
+    if _plan is None:
+        _plan = compile_rules()
+    return _plan
+
+
+def load_state():
+    """Load previous state: saved sections plus the recent price history."""
+    store = get_store()
+    state = store.load()
+    state["price_history"] = store.prices(since=time.time() - max(get_plan().price_windows, default=0))
+    return state
 
 
 def save_state(state):
-    """Save current state."""
-    with open(STATE_FILE, "w") as f:
-        json.dump(state, f)
+    """Save current state in one transaction.
+
+    New price samples and position snapshots queued since the last save are
+    appended. Keys starting with "_" are runtime-only and skipped.
+    """
+    prices = state.get("_pending_prices", [])
+    positions = state.get("_pending_positions", [])
+    values = {k: v for k, v in state.items()
+              if not k.startswith("_") and k != "price_history"}
+    get_store().save(values, prices, positions)
+    state["_pending_prices"] = []
+    state["_pending_positions"] = []
 
 
-def check_price_movement(current_price, state):
-    """Check if price moved significantly over last 5 minutes."""
+def record_positions(state, account, positions):
+    """Queue a position snapshot for the state store."""
+    snapshot = list(positions.get("isolated", []))
+    cross = positions.get("cross", {})
+    if cross and cross.get("quantity", 0) != 0:
+        snapshot.append(dict(cross, id=cross.get("id", "cross")))
+    state.setdefault("_pending_positions", []).append((time.time(), account, snapshot))
+
+
+def get_price_detector(state):
+    """Movement detector for this state, rebuilt from saved history on first use."""
+    detector = state.get("_price_detector")
+    if detector is None:
+        detector = MovementDetector(get_plan().price_windows, PRICE_HISTORY_CAPACITY)
+        detector.load(state.pop("price_history", []))
+        state["_price_detector"] = detector
+    return detector
+
+
+def check_price_movement(current_price, state, now=None):
+    """Check for large peak-to-trough price moves over every configured window.
+
+    Moves already alerted on are suppressed until they repeat, escalate or
+    recover.
+    """
     alerts = []
-    price_history = state.get("price_history", [])
-    
-    # Add current price to history
-    price_history.append(current_price)
-    
-    # Keep only last N prices
-    if len(price_history) > PRICE_HISTORY_LENGTH:
-        price_history = price_history[-PRICE_HISTORY_LENGTH:]
-    
-    state["price_history"] = price_history
+    detector = get_price_detector(state)
+    now = time.time() if now is None else now
+    detector.add(now, current_price)
+    state.setdefault("_pending_prices", []).append((now, current_price))
+    plan = get_plan()
+    suppressor = AlertSuppressor(plan.price_rules, state.setdefault("price_alerts", {}))
     
-    # Need at least 5 data points to compare
-    if len(price_history) >= PRICE_HISTORY_LENGTH:
-        oldest_price = price_history[0]
-        if oldest_price and oldest_price > 0:
-            change_pct = ((current_price - oldest_price) / oldest_price) * 100
-            if abs(change_pct) >= PRICE_CHANGE_THRESHOLD:
-                direction = "📈" if change_pct > 0 else "📉"
-                alerts.append(
-                    f"{direction} BTC moved {change_pct:+.1f}% in 5 minutes!\n"
-                    f"   ${oldest_price:,.0f} → ${current_price:,.0f}"
-                )
+    for seconds, change_pct, start, end in detector.breaches(plan.price_rearm):
+        if not suppressor.check(f"price_{seconds}", None, abs(change_pct), now):
+            continue
+        metrics.inc("lnm_alerts_total", kind="price")
+        (start_ts, start_price), (end_ts, end_price) = start, end
+        direction = "📈" if change_pct > 0 else "📉"
+        alerts.append(
+            f"{direction} BTC moved {change_pct:+.1f}% in {format_duration(end_ts - start_ts)}!\n"
+            f"   ${start_price:,.0f} → ${end_price:,.0f}"
+        )
+    suppressor.sweep()
     
     return alerts
 
 
-def is_long(side: str) -> bool:
-    """Check if position is long (buy)."""
-    return side in ("b", "buy")
+def account_label(account):
+    """Suffix naming the account in alerts, empty for the default account."""
+    return f" [{account}]" if account else ""
+
 
+def account_state(state, account):
+    """State section for an account; the default account uses the top level."""
+    if account is None:
+        return state
+    return state.setdefault("accounts", {}).setdefault(account, {})
 
-def check_positions(positions, current_price):
-    """Check positions for liquidation risk and large losses."""
+
+def format_breaches(book, hits, current_price, account=None):
+    """Format risk engine hits as alert messages."""
     alerts = []
     
-    # Check isolated trades
-    for trade in positions.get("isolated", []):
-        side = trade.get("side", "unknown")
-        quantity = trade.get("quantity", 0)
-        margin = trade.get("margin", 0)
-        pl = trade.get("pl", 0)
-        liq_price = trade.get("liquidation", 0)
-        trade_id = str(trade.get("id", "?"))[:8]
-        side_str = "LONG" if is_long(side) else "SHORT"
+    for i, kind, value in hits:
+        if book.cross[i]:
+            label = f"Cross {book.side_str(i)} position"
+        else:
+            label = f"Isolated {book.side_str(i)} #{book.ids[i][:8]}"
+        label += account_label(account)
+        metrics.inc("lnm_alerts_total", kind=kind)
         
-        # Check liquidation distance
-        if liq_price and current_price:
-            if is_long(side):  # long
-                liq_distance = ((current_price - liq_price) / current_price) * 100
-            else:  # short
-                liq_distance = ((liq_price - current_price) / current_price) * 100
-            
-            if liq_distance < LIQUIDATION_THRESHOLD:
+        if kind == "liquidation":
+            alerts.append(
+                f"🚨 LIQUIDATION RISK!\n"
+                f"   {label}\n"
+                f"   Only {value:.1f}% from liquidation\n"
+                f"   Current: ${current_price:,.0f} | Liq: ${book.liquidation[i]:,.0f}"
+            )
+        else:
+            alerts.append(
+                f"📉 LARGE LOSS\n"
+                f"   {label}\n"
+                f"   Down {value:.1f}% ({book.pl[i]:,.0f} sats)"
+            )
+    
+    return alerts
+
+
+def position_suppressor(state):
+    """Suppressor over the position alerts saved in a state section.
+
+    Rules differ per position, so each check passes its own.
+    """
+    return AlertSuppressor({}, state.setdefault("position_alerts", {}))
+
+
+def rearm_levels(rules, kind):
+    """Per-position re-arm levels for one kind of rule; NaN where it is off."""
+    return [r[kind].rearm if r[kind] else float("nan") for r in rules]
+
+
+def suppress_hits(book, hits, suppressor, now, rules):
+    """Keep the hits the suppressor lets through, then re-arm recovered alerts.
+
+    `hits` must include every position past the re-arm levels, not only the
+    alert thresholds, so latched alerts are not re-armed too early. `rules`
+    are the book's per-position rules.
+    """
+    kept = [(i, kind, value) for i, kind, value in hits
+            if suppressor.check(kind, book.ids[i], value, now, rules[i][kind])]
+    suppressor.sweep()
+    return kept
+
+
+def check_positions(positions, current_price, state, account=None, now=None):
+    """Check positions for liquidation risk and large losses, suppressing repeats."""
+    book = PositionBook.from_positions(positions.get("isolated", []), positions.get("cross", {}))
+    rules = get_plan().account(account).book_rules(book)
+    hits = breaches(book, current_price, rearm_levels(rules, "liquidation"), rearm_levels(rules, "loss"))
+    hits = suppress_hits(book, hits, position_suppressor(state), time.time() if now is None else now,
+                         rules)
+    return format_breaches(book, hits, current_price, account)
+
+
+def liquidation_hits(book, index, positions_by_id, current_price, rules):
+    """Liquidation hits for the positions the index reports as crossed.
+
+    The index is built at the widest re-arm level, so each hit is checked
+    against its own position's rule.
+    """
+    hits = []
+    for position_id in index.crossed(current_price):
+        i = positions_by_id[position_id]
+        rule = rules[i]["liquidation"]
+        side = "b" if book.long[i] else "s"
+        distance = liquidation_distance(side, book.liquidation[i], current_price)
+        if rule and rule.candidate(distance):
+            hits.append((i, "liquidation", distance))
+    return hits
+
+
+def loss_hits(book, index, positions_by_id, current_price, rules):
+    """Loss hits for the positions the loss index reports as crossed.
+
+    PnL is marked to market locally from quantity and entry price, and
+    written back to the book for the alert message.
+    """
+    hits = []
+    if index is None:
+        return hits
+    for position_id in index.crossed(current_price):
+        i = positions_by_id[position_id]
+        rule = rules[i]["loss"]
+        pl = inverse_pl(book.long[i], book.quantity[i], book.price[i], current_price)
+        book.pl[i] = pl
+        loss = -pl / book.margin[i] * 100
+        if rule and rule.candidate(loss):
+            hits.append((i, "loss", loss))
+    return hits
+
+
+def hold_positions(positions, account_plan, held=None, now=None):
+    """Cache a position refresh so it can be checked locally until the next one.
+
+    Keeps the book, its per-position rules and liquidation and loss trigger
+    indices; the indices of a previous cache are updated in place. `positions`
+    may be None for an account whose rules need no positions.
+    """
+    if positions is None:
+        book = PositionBook()
+    else:
+        book = PositionBook.from_positions(positions.get("isolated", []), positions.get("cross", {}))
+    if held is None:
+        # Indexed at the widest re-arm levels so latched alerts stay visible to the suppressor
+        held = {
+            "liquidation_index": LiquidationIndex(account_plan.max_liquidation_rearm or 0),
+            "loss_index": (LossIndex(account_plan.min_loss_rearm)
+                           if account_plan.min_loss_rearm is not None else None),
+            "near": False,
+        }
+    held["liquidation_index"].sync(book)
+    if held["loss_index"] is not None:
+        held["loss_index"].sync(book)
+    held.update(
+        book=book,
+        positions_by_id={pid: i for i, pid in enumerate(book.ids)},
+        rules=account_plan.book_rules(book),
+        fetched=time.time() if now is None else now,
+    )
+    return held
+
+
+def check_held(held, current_price, state, account=None, now=None):
+    """Check cached positions at `current_price` for liquidation risk and large losses.
+
+    Only positions whose trigger price was crossed are evaluated, so the
+    cost follows the number of positions near a threshold rather than the
+    size of the book. Sets held["near"] when any position is past a re-arm
+    level, which brings the next refresh forward.
+    """
+    book, rules = held["book"], held["rules"]
+    hits = liquidation_hits(book, held["liquidation_index"], held["positions_by_id"], current_price, rules)
+    hits += loss_hits(book, held["loss_index"], held["positions_by_id"], current_price, rules)
+    held["near"] = bool(hits)
+    hits = suppress_hits(book, sorted(hits), position_suppressor(state),
+                         time.time() if now is None else now, rules)
+    return format_breaches(book, hits, current_price, account)
+
+
+def print_decision(decision):
+    """Scheduler log for --debug-schedule."""
+    print(format_decision(decision), file=sys.stderr, flush=True)
+
+
+def plan_poll(scheduler, state, account, held, current_price, now=None):
+    """Schedule an account's next position refresh from its cached positions."""
+    return scheduler.plan(account, held, current_price,
+                          get_price_detector(state).volatility(VOLATILITY_WINDOW),
+                          get_plan().account(account).needs, now)
+
+
+def check_market(ticker, state, now=None):
+    """Check price level and funding rate rules against a ticker or stream tick.
+
+    Only the fields present are checked, so a tick without a funding rate
+    leaves funding alerts as they are.
+    """
+    alerts = []
+    now = time.time() if now is None else now
+    for field, rules in get_plan().market_rules.items():
+        value = ticker.get(field)
+        if value is None:
+            continue
+        suppressor = AlertSuppressor(rules, state.setdefault("market_alerts", {}).setdefault(field, {}))
+        for key, rule in rules.items():
+            if not rule.candidate(value):
+                continue
+            if not suppressor.check(key, None, value, now):
+                continue
+            direction = "ABOVE" if rule.rising else "BELOW"
+            if field == "index":
+                metrics.inc("lnm_alerts_total", kind="price_level")
                 alerts.append(
-                    f"🚨 LIQUIDATION RISK!\n"
-                    f"   Isolated {side_str} #{trade_id}\n"
-                    f"   Only {liq_distance:.1f}% from liquidation\n"
-                    f"   Current: ${current_price:,.0f} | Liq: ${liq_price:,.0f}"
+                    f"🎯 BTC {direction} ${rule.threshold:,.0f}\n"
+                    f"   Current: ${value:,.0f}"
                 )
-        
-        # Check large losses
-        if margin > 0 and pl < 0:
-            loss_pct = abs(pl) / margin * 100
-            if loss_pct > LOSS_THRESHOLD:
+            else:
+                metrics.inc("lnm_alerts_total", kind="funding")
                 alerts.append(
-                    f"📉 LARGE LOSS\n"
-                    f"   Isolated {side_str} #{trade_id}\n"
-                    f"   Down {loss_pct:.1f}% ({pl:,} sats)"
+                    f"💸 FUNDING RATE {direction} LIMIT\n"
+                    f"   {value:.4%} (limit {rule.threshold:.4%})"
                 )
+        suppressor.sweep()
+    return alerts
+
+
+def check_account(account_info, positions, state, account=None, now=None):
+    """Check balance floor and margin usage rules for one account."""
+    plan = get_plan().account(account)
+    balance = (account_info or {}).get("balance")
+    if balance is None:
+        return []
+    alerts = []
+    now = time.time() if now is None else now
+    suppressor = AlertSuppressor({}, state.setdefault("account_alerts", {}))
     
-    # Check cross position
-    cross = positions.get("cross", {})
-    cross_qty = cross.get("quantity", 0)
-    if cross_qty != 0:
-        side = cross.get("side", "unknown")
-        margin = cross.get("margin", 0)
-        pl = cross.get("pl", 0)
-        liq_price = cross.get("liquidation", 0)
-        side_str = "LONG" if is_long(side) else "SHORT"
+    rule = plan.balance_rule
+    if rule and rule.candidate(balance) and suppressor.check("balance", None, balance, now, rule):
+        metrics.inc("lnm_alerts_total", kind="balance")
+        alerts.append(
+            f"🪫 LOW BALANCE{account_label(account)}\n"
+            f"   {balance:,.0f} sats (floor {rule.threshold:,.0f} sats)"
+        )
+    
+    rule = plan.margin_ratio_rule
+    if rule and positions is not None:
+        book = PositionBook.from_positions(positions.get("isolated", []), positions.get("cross", {}))
+        usage = margin_usage(book, balance)
+        if (usage is not None and rule.candidate(usage)
+                and suppressor.check("margin_ratio", None, usage, now, rule)):
+            metrics.inc("lnm_alerts_total", kind="margin_ratio")
+            alerts.append(
+                f"⚖️ HIGH MARGIN USAGE{account_label(account)}\n"
+                f"   {usage:.1f}% of equity is position margin (limit {rule.threshold:g}%)"
+            )
+    
+    suppressor.sweep()
+    return alerts
+
+
+def position_label(event, account=None):
+    """Label for the position a change event is about."""
+    position = event["before"] or event["after"]
+    side = {"b": "LONG", "s": "SHORT"}.get(position["side"])
+    if position["cross"]:
+        label = f"Cross {side} position"
+    else:
+        label = f"Isolated {side} #{event['id'][:8]}" if side else f"Trade #{event['id'][:8]}"
+    return label + account_label(account)
+
+
+def format_events(events, account=None):
+    """Format position change events as alert messages."""
+    alerts = []
+    
+    for event in events:
+        kind, before, after = event["kind"], event["before"], event["after"]
+        label = position_label(event, account)
+        trade = event.get("trade")
+        metrics.inc("lnm_alerts_total", kind=kind)
         
-        if liq_price and current_price:
-            if is_long(side):
-                liq_distance = ((current_price - liq_price) / current_price) * 100
+        if kind == "opened":
+            alerts.append(
+                f"🆕 POSITION OPENED\n"
+                f"   {label}\n"
+                f"   Qty: {after['quantity']:,} @ ${after['price']:,.0f} | Liq: ${after['liquidation']:,.0f}"
+            )
+        elif kind in ("increased", "partially_closed"):
+            title = "POSITION INCREASED" if kind == "increased" else "POSITION PARTIALLY CLOSED"
+            alerts.append(
+                f"{'➕' if kind == 'increased' else '✂️'} {title}\n"
+                f"   {label}\n"
+                f"   Qty: {before['quantity']:,} → {after['quantity']:,} | Margin: {after['margin']:,} sats"
+            )
+        elif kind in ("margin_added", "margin_removed"):
+            title = "MARGIN ADDED" if kind == "margin_added" else "MARGIN REMOVED"
+            alerts.append(
+                f"{'🛡️' if kind == 'margin_added' else '⚠️'} {title}\n"
+                f"   {label}\n"
+                f"   Margin: {before['margin']:,} → {after['margin']:,} sats | "
+                f"Liq: ${before['liquidation']:,.0f} → ${after['liquidation']:,.0f}"
+            )
+        elif trade is not None:
+            title = "💀 POSITION LIQUIDATED!" if kind == "liquidated" else "✅ POSITION CLOSED"
+            alerts.append(
+                f"{title}\n"
+                f"   {label}\n"
+                f"   Exit: ${trade.get('exitPrice') or 0:,.0f} | P&L: {trade.get('pl') or 0:+,.0f} sats"
+            )
+        elif before["cross"]:
+            alerts.append(
+                f"✅ POSITION CLOSED\n"
+                f"   {label}"
+            )
+        else:
+            # Not in the closed trades (yet), so the reason is unknown
+            alerts.append(
+                f"💀 POSITION CLOSED/LIQUIDATED!\n"
+                f"   Trade #{event['id'][:8]}{account_label(account)} is gone\n"
+                f"   Check your account for details"
+            )
+    
+    return alerts
+
+
+def track_positions(positions, state, account=None, credentials=None):
+    """Alert on positions opened, changed or closed since the last check.
+
+    Isolated trades that disappeared are looked up among the trades closed
+    since the saved cursor to tell liquidations from manual closes.
+    """
+    tracker = PositionTracker(state)
+    events = tracker.update(positions)
+    wanted = tracker.closes(events)
+    if wanted:
+        try:
+            trades = fetch_closed_trades(credentials, state["closed_since"], wanted)
+        except Exception as e:
+            print(f"⚠️ Could not fetch closed trades{account_label(account)}: {e}", file=sys.stderr)
+            trades = []
+        events = tracker.classify(events, trades)
+    return format_events(events, account)
+
+
+def _account_pool():
+    global _account_executor
+    if _account_executor is None:
+        _account_executor = ThreadPoolExecutor(max_workers=ACCOUNT_WORKERS,
+                                               thread_name_prefix="account")
+    return _account_executor
+
+
+def run_check(state, accounts=None, scheduler=None):
+    """Fetch data and evaluate every alert rule once.
+
+    `accounts` is a list of (name, credentials); by default the single
+    account from the environment is checked. Accounts are checked
+    concurrently against one shared ticker fetch, and a failing account
+    only adds an error alert. Each account only fetches what its rules
+    use. Updates state in place and returns (current_price, alerts).
+
+    With a PollScheduler (daemon mode), positions and account data are
+    cached between checks and only fetched again when the scheduler says
+    they are due. In between, the cached positions are marked to market at
+    the current price, which needs no authenticated requests.
+    """
+    accounts = accounts or DEFAULT_ACCOUNTS
+    plan = get_plan()
+    started = time.perf_counter()
+    now = time.time()
+    holds = state.setdefault("_held", {})
+    
+    # Get current data; account data is fetched while the ticker loads
+    pool = _account_pool()
+    fetches = []
+    for name, credentials in accounts:
+        needs = plan.account(name).needs
+        if scheduler is not None and name in holds and not scheduler.due(name, now):
+            needs = ()
+        fetches.append((
+            pool.submit(get_all_positions, credentials) if "positions" in needs else None,
+            pool.submit(get_account, credentials) if "account" in needs else None,
+        ))
+    ticker = get_ticker()
+    current_price = ticker.get("index", 0)
+    record_tick(ticker)
+    
+    all_alerts = []
+    
+    # Check price movement (also updates state with price history)
+    price_alerts = check_price_movement(current_price, state, now)
+    all_alerts.extend(price_alerts)
+    all_alerts.extend(check_market(ticker, state, now))
+    
+    # Check positions and account rules (requires auth)
+    for (name, credentials), (positions_future, account_future) in zip(accounts, fetches):
+        try:
+            section = account_state(state, name)
+            if scheduler is not None and not (positions_future or account_future):
+                if name in holds:
+                    all_alerts.extend(check_held(holds[name], current_price, section, name, now))
+                    plan_poll(scheduler, state, name, holds[name], current_price, now)
+                continue
+            positions = positions_future.result() if positions_future else None
+            account_info = account_future.result() if account_future else None
+            if scheduler is not None:
+                holds[name] = hold_positions(positions, plan.account(name), holds.get(name), now)
+                all_alerts.extend(check_held(holds[name], current_price, section, name, now))
+                plan_poll(scheduler, state, name, holds[name], current_price, now)
+            elif positions is not None:
+                all_alerts.extend(check_positions(positions, current_price, section, name))
+            if positions is not None:
+                if plan.account(name).position_changes:
+                    all_alerts.extend(track_positions(positions, section, name, credentials))
+                record_positions(state, name, positions)
+            all_alerts.extend(check_account(account_info, positions, section, name))
+        except Exception as e:
+            if name is None and "LNM_API" in str(e):
+                pass  # No credentials, skip position check
             else:
-                liq_distance = ((liq_price - current_price) / current_price) * 100
-            
-            if liq_distance < LIQUIDATION_THRESHOLD:
-                alerts.append(
-                    f"🚨 LIQUIDATION RISK!\n"
-                    f"   Cross {side_str} position\n"
-                    f"   Only {liq_distance:.1f}% from liquidation\n"
-                    f"   Current: ${current_price:,.0f} | Liq: ${liq_price:,.0f}"
-                )
+                all_alerts.append(f"⚠️ Error checking positions{account_label(name)}: {e}")
+    
+    metrics.observe("lnm_cycle_duration_seconds", time.perf_counter() - started, mode="poll")
+    return current_price, all_alerts
+
+
+def alert_header(current_price):
+    """Heading put above a batch of alerts."""
+    return f"🔔 LN MARKETS ALERTS\n\nBTC: ${current_price:,.0f}"
+
+
+def record_tick(ticker):
+    """Record a ticker when recording is on; a recording failure never stops the alert check."""
+    if not _recorder:
+        return
+    try:
+        _recorder.record(ticker)
+    except Exception as e:
+        print(f"⚠️ Could not record tick: {e}", file=sys.stderr, flush=True)
+
+
+def checkpoint(state):
+    """Persist state, including the server clock offset, and prune history past retention."""
+    state["clock"] = get_clock_state()
+    save_state(state)
+    retention = max(HISTORY_RETENTION, max(get_plan().price_windows, default=0))
+    get_store().prune(time.time() - retention)
+    if _recorder:
+        try:
+            _recorder.flush()
+        except OSError as e:
+            print(f"⚠️ Could not write recorded ticks: {e}", file=sys.stderr, flush=True)
+
+
+async def run_daemon(interval, checkpoint_interval, accounts=None, sinks=None,
+                     refresh_interval=POSITION_REFRESH_INTERVAL):
+    """Poll every `interval` seconds until SIGTERM/SIGINT, keeping state in memory.
+
+    The ticker is polled every cycle; positions are refreshed when the
+    PollScheduler says they are due, at most `refresh_interval` seconds
+    apart, and marked to market locally in between. A cycle comes early
+    when a refresh is due before it. Alerts are batched and delivered to
+    `sinks` (stdout by default).
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    
+    state = load_state()
+    load_clock_state(state.get("clock"))
+    notifier = Notifier(sinks or [StdoutSink()]).start()
+    scheduler = PollScheduler(refresh_interval, _schedule_log)
+    last_checkpoint = loop.time()
+    
+    while not stop.is_set():
+        started = loop.time()
+        try:
+            # The client is blocking, so each check runs in a worker thread
+            current_price, alerts = await loop.run_in_executor(None, run_check, state, accounts,
+                                                                scheduler)
+            if alerts:
+                notifier.notify(alerts, alert_header(current_price))
+        except Exception as e:
+            print(f"❌ Alert check failed: {e}", flush=True)
         
-        if margin > 0 and pl < 0:
-            loss_pct = abs(pl) / margin * 100
-            if loss_pct > LOSS_THRESHOLD:
-                alerts.append(
-                    f"📉 LARGE LOSS\n"
-                    f"   Cross {side_str} position\n"
-                    f"   Down {loss_pct:.1f}% ({pl:,} sats)"
-                )
+        if loop.time() - last_checkpoint >= checkpoint_interval:
+            checkpoint(state)
+            last_checkpoint = loop.time()
+        
+        elapsed = loop.time() - started
+        remaining = interval - elapsed
+        earliest = scheduler.earliest()
+        if earliest is not None:
+            # Never sooner than the minimum poll interval, even if a refresh keeps failing
+            remaining = min(remaining, max(earliest - time.time(), MIN_POLL_INTERVAL - elapsed))
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            pass
     
-    return alerts
+    checkpoint(state)
+    await notifier.close()
+    close_connections()
+
+
+async def run_stream(refresh_interval, checkpoint_interval, accounts=None, sinks=None):
+    """Evaluate alert rules on every streamed price tick until SIGTERM/SIGINT.
+
+    Positions are refreshed over REST when the PollScheduler says they are
+    due, at most `refresh_interval` seconds apart; ticks re-plan it every
+    MIN_POLL_INTERVAL, or straight away when a position comes near a
+    threshold. Between refreshes each tick only looks up the positions whose
+    liquidation or loss trigger it crossed in sorted indices, and marks
+    those to market locally; balance, margin usage and funding alerts are
+    re-evaluated on refresh.
+    Alerts go through the same repeat suppression as polling, so an alert
+    that stays active is not sent on every tick, and are batched to `sinks`.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    
+    state = load_state()
+    load_clock_state(state.get("clock"))
+    notifier = Notifier(sinks or [StdoutSink()]).start()
+    accounts = accounts or DEFAULT_ACCOUNTS
+    plan = get_plan()
+    live = {"price": 0}
+    holds = {}  # Account name -> cached positions, see hold_positions()
+    scheduler = PollScheduler(refresh_interval, _schedule_log)
+    wakeups = {name: asyncio.Event() for name, _ in accounts}  # Set to refresh an account early
+    
+    def on_tick(tick):
+        record_tick(tick)
+        current_price = tick.get("index")
+        if not current_price:
+            return
+        live["price"] = current_price
+        started = time.perf_counter()
+        now = time.time()
+        alerts = check_price_movement(current_price, state, now)
+        alerts += check_market(tick, state, now)
+        for name, held in holds.items():
+            alerts += check_held(held, current_price, account_state(state, name), name, now)
+            decision = scheduler.decisions.get(name)
+            if (decision is None or decision["near"] != held["near"] or not decision["price"]
+                    or now - decision["at"] >= MIN_POLL_INTERVAL):
+                plan_poll(scheduler, state, name, held, current_price, now)
+            if scheduler.due(name, now):
+                wakeups[name].set()
+        metrics.observe("lnm_cycle_duration_seconds", time.perf_counter() - started, mode="tick")
+        if alerts:
+            notifier.notify(alerts, alert_header(current_price))
+    
+    async def wait(seconds):
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def wait_refresh(name, attempted):
+        # Until the scheduled refresh, or a tick that finds it due sooner, but never
+        # within MIN_POLL_INTERVAL of the last attempt, even if that one failed
+        await wait(max(attempted + MIN_POLL_INTERVAL - time.time(), 0))
+        wakeup = wakeups[name]
+        wakeup.clear()
+        if stop.is_set() or scheduler.due(name):
+            return
+        next_poll = scheduler.next_poll(name)
+        timeout = refresh_interval if next_poll is None else next_poll - time.time()
+        waits = [asyncio.ensure_future(stop.wait()), asyncio.ensure_future(wakeup.wait())]
+        await asyncio.wait(waits, timeout=max(timeout, 0), return_when=asyncio.FIRST_COMPLETED)
+        for waiter in waits:
+            waiter.cancel()
+    
+    async def refresh_positions(name, credentials):
+        account_plan = plan.account(name)
+        while not stop.is_set():
+            try:
+                positions = account_info = None
+                now = time.time()
+                if "positions" in account_plan.needs:
+                    positions = await loop.run_in_executor(_account_pool(), get_all_positions, credentials)
+                if "account" in account_plan.needs:
+                    account_info = await loop.run_in_executor(_account_pool(), get_account, credentials)
+                changes = []
+                holds[name] = hold_positions(positions, account_plan, holds.get(name), now)
+                plan_poll(scheduler, state, name, holds[name], live["price"], now)
+                if positions is not None:
+                    record_positions(state, name, positions)
+                    if account_plan.position_changes:
+                        changes += await position_changes(name, credentials, positions)
+                changes += check_account(account_info, positions, account_state(state, name), name)
+                if changes:
+                    notifier.notify(changes, alert_header(live["price"]))
+            except Exception as e:
+                if name is None and "LNM_API" in str(e):
+                    return  # No credentials, stream price alerts only
+                print(f"⚠️ Error checking positions{account_label(name)}: {e}", flush=True)
+            await wait_refresh(name, now)
+    
+    async def position_changes(name, credentials, positions):
+        # Diff and classify here, in the loop thread that checkpoints state
+        tracker = PositionTracker(account_state(state, name))
+        events = tracker.update(positions)
+        wanted = tracker.closes(events)
+        if wanted:
+            try:
+                trades = await loop.run_in_executor(
+                    _account_pool(), fetch_closed_trades, credentials,
+                    tracker.state["closed_since"], wanted)
+            except Exception as e:
+                print(f"⚠️ Could not fetch closed trades{account_label(name)}: {e}", flush=True)
+                trades = []
+            events = tracker.classify(events, trades)
+        return format_events(events, name)
+    
+    async def refresh_funding():
+        # Stream ticks carry no funding rate, so it comes from the REST ticker
+        while not stop.is_set():
+            try:
+                ticker = await loop.run_in_executor(None, get_ticker)
+                alerts = check_market({"fundingRate": ticker.get("fundingRate")}, state)
+                if alerts:
+                    notifier.notify(alerts, alert_header(live["price"]))
+            except Exception as e:
+                print(f"⚠️ Error checking funding rate: {e}", flush=True)
+            await wait(refresh_interval)
+    
+    async def checkpoints():
+        while not stop.is_set():
+            await wait(checkpoint_interval)
+            checkpoint(state)
+    
+    async def price_feed():
+        # The stream reconnects by itself; anything else ending it is restarted,
+        # since alerts stop with the feed
+        stream = PriceStream(on_tick)
+        while not stop.is_set():
+            try:
+                await stream.run(stop)
+            except Exception as e:
+                print(f"⚠️ Price stream stopped: {e!r}; restarting", flush=True)
+                await wait(MIN_POLL_INTERVAL)
+    
+    coros = [price_feed(), checkpoints()]
+    coros += [refresh_positions(name, credentials) for name, credentials in accounts]
+    if "fundingRate" in plan.market_rules:
+        coros.append(refresh_funding())
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    await stop.wait()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    
+    checkpoint(state)
+    await notifier.close()
+    close_connections()
 
 
 def main():
     """Run alert check and output any alerts."""
+    global _recorder, _plan, _schedule_log
+    parser = argparse.ArgumentParser(description="Check LN Markets positions and price for alerts")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and poll on an interval")
+    parser.add_argument("--interval", type=float, default=DAEMON_INTERVAL,
+                        help=f"Seconds between checks in daemon mode (default {DAEMON_INTERVAL})")
+    parser.add_argument("--checkpoint", type=float, default=CHECKPOINT_INTERVAL,
+                        help=f"Seconds between state saves in daemon and stream mode (default {CHECKPOINT_INTERVAL})")
+    parser.add_argument("--stream", action="store_true",
+                        help="Keep running and check on every WebSocket price tick")
+    parser.add_argument("--refresh", type=float, default=POSITION_REFRESH_INTERVAL,
+                        help=f"Seconds between position refreshes in daemon and stream mode (default {POSITION_REFRESH_INTERVAL})")
+    parser.add_argument("--accounts", metavar="FILE",
+                        help="JSON file listing several accounts to check concurrently")
+    parser.add_argument("--rules", metavar="FILE",
+                        help="Rule file (JSON or TOML) with thresholds, overrides and extra rules")
+    parser.add_argument("--notify", action="store_true",
+                        help="Also send alerts to Telegram and/or a webhook configured in the environment")
+    parser.add_argument("--quiet", action="store_true",
+                        help="With --notify, skip printing alerts when Telegram or a webhook receives them")
+    parser.add_argument("--fresh", action="store_true", help="Bypass the shared response cache")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="Serve Prometheus metrics on this local port (daemon and stream mode)")
+    parser.add_argument("--metrics-json", metavar="FILE",
+                        help="Write metrics collected during a one-shot check to FILE")
+    parser.add_argument("--record", nargs="?", const=TICK_FILE, metavar="FILE",
+                        help="Append every ticker sample to a binary tick file (default .ticks.bin)")
+    parser.add_argument("--debug-schedule", action="store_true",
+                        help="Print position polling decisions to stderr (daemon and stream mode)")
+    args = parser.parse_args()
+    sinks = sinks_from_env(stdout=not args.quiet) if args.notify else []
+    if not sinks:
+        sinks = [StdoutSink()]  # Nowhere else to deliver to
+    if args.fresh:
+        set_cache(fresh=True)
+    if args.metrics_port and (args.daemon or args.stream):
+        metrics.serve(args.metrics_port)
+    if args.metrics_json:
+        metrics.enable()
+    if args.record:
+        _recorder = TickRecorder(args.record)
+    if args.debug_schedule:
+        _schedule_log = print_decision
+    
+    accounts = None
+    if args.accounts:
+        try:
+            accounts = load_accounts(args.accounts)
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not load accounts: {e}")
+            sys.exit(2)
+    
+    if args.rules:
+        try:
+            names = [name for name, _ in accounts] if accounts else []
+            _plan = compile_rules(load_rules(args.rules), names)
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not load rules from {args.rules}: {e}")
+            sys.exit(2)
+    
+    if args.stream:
+        asyncio.run(run_stream(args.refresh, args.checkpoint, accounts, sinks))
+        return
+    
+    if args.daemon:
+        asyncio.run(run_daemon(args.interval, args.checkpoint, accounts, sinks, args.refresh))
+        return
+    
     try:
         # Load previous state
         state = load_state()
         
-        # Get current data
-        ticker = get_ticker()
-        current_price = ticker.get("index", 0)
-        
-        all_alerts = []
+        # Reuse the server clock offset measured by a previous run
+        load_clock_state(state.get("clock"))
         
-        # Check price movement (also updates state with price history)
-        price_alerts = check_price_movement(current_price, state)
-        all_alerts.extend(price_alerts)
-        
-        # Check positions (requires auth)
-        try:
-            positions = get_all_positions()
-            position_alerts = check_positions(positions, current_price)
-            all_alerts.extend(position_alerts)
-            
-            # Track positions to detect liquidations
-            current_ids = set()
-            for trade in positions.get("isolated", []):
-                current_ids.add(trade.get("id"))
-            
-            # Check for disappeared positions (likely liquidated)
-            previous_ids = set(state.get("tracked_positions", []))
-            disappeared = previous_ids - current_ids
-            
-            for pos_id in disappeared:
-                all_alerts.append(
-                    f"💀 POSITION CLOSED/LIQUIDATED!\n"
-                    f"   Trade #{str(pos_id)[:8]} is gone\n"
-                    f"   Check your account for details"
-                )
-            
-            # Save current position IDs
-            state["tracked_positions"] = list(current_ids)
-            
-        except Exception as e:
-            if "LNM_API" in str(e):
-                pass  # No credentials, skip position check
-            else:
-                all_alerts.append(f"⚠️ Error checking positions: {e}")
+        current_price, all_alerts = run_check(state, accounts)
         
         # Save current state (price history already updated)
-        save_state(state)
+        checkpoint(state)
         
         # Output alerts
         if all_alerts:
-            print("🔔 LN MARKETS ALERTS\n")
-            print(f"BTC: ${current_price:,.0f}\n")
-            for alert in all_alerts:
-                print(alert)
-                print()
+            send_alerts(sinks, all_alerts, alert_header(current_price))
         else:
             # No alerts - silent
             pass
         
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json)
+        
         # Exit code: 1 if alerts, 0 if none
         sys.exit(1 if all_alerts else 0)
         
     except Exception as e:
         print(f"❌ Alert check failed: {e}")
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json)
         sys.exit(2)
 
 
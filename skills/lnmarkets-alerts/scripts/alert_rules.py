@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Alert rule configuration.
+
+A rule file (JSON, or TOML on Python 3.11+) sets thresholds over the
+built-in defaults, with overrides per account, per side and per position.
+It is compiled once into a RulePlan. The plan has one AccountPlan per
+account holding its resolved rules and the data they need ("positions",
+"account"), so a check cycle only fetches and evaluates what is in use.
+
+    {
+      "liquidation": 10,
+      "loss": 20,
+      "price_move": {"60": 3, "300": 5, "3600": 8, "86400": 12},
+      "price_levels": [{"below": 60000}, {"above": 80000}],
+      "funding": {"above": 0.0005},
+      "overrides": [
+        {"account": "desk-2", "liquidation": 5, "balance": 100000},
+        {"side": "short", "loss": 30},
+        {"position": "a1f11a32", "liquidation": null}
+      ]
+    }
+
+A null threshold turns a rule off. When overrides conflict, a position
+override beats a side override, which beats an account override. Among
+overrides that are equally specific, the later one wins. The cross
+position is matched by the id "cross".
+"""
+
+import json
+from functools import lru_cache
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+from alert_suppression import AlertRule
+
+# Alert thresholds
+LIQUIDATION_THRESHOLD = 10  # Alert if <10% from liquidation
+LOSS_THRESHOLD = 20  # Alert if loss >20% of margin
+PRICE_CHANGE_THRESHOLD = 5  # Alert if price moved >5% within 5 minutes
+
+# Peak-to-trough move thresholds per window: {seconds: percent}
+PRICE_WINDOWS = {
+    60: 3,
+    300: PRICE_CHANGE_THRESHOLD,
+    3600: 8,
+    86400: 12,
+}
+
+# Repeat suppression: an active alert is sent again only after the cooldown,
+# or at once if it got worse by the escalation step, and re-arms only after
+# recovering past the re-arm level
+ALERT_COOLDOWN = 1800  # Seconds
+LIQUIDATION_REARM = 12  # Re-arm once >12% from liquidation again
+LIQUIDATION_ESCALATION = 2  # Re-alert every 2 points closer to liquidation
+LOSS_REARM = 15  # Re-arm once loss is back under 15% of margin
+LOSS_ESCALATION = 10  # Re-alert every further 10% of margin lost
+PRICE_REARM_RATIO = 0.6  # Re-arm once the move falls under 60% of its threshold
+PRICE_LEVEL_REARM = 0.5  # Re-arm once the price is 0.5% back on the safe side
+FUNDING_REARM_RATIO = 0.8  # Re-arm once funding is back within 80% of the limit
+MARGIN_RATIO_REARM = 5  # Re-arm once margin usage is 5 points under the limit
+BALANCE_REARM_RATIO = 1.1  # Re-arm once the balance is 10% above the floor
+
+DEFAULTS = {
+    "liquidation": LIQUIDATION_THRESHOLD,  # % from liquidation
+    "loss": LOSS_THRESHOLD,  # % of margin
+    "price_move": PRICE_WINDOWS,  # {seconds: %}
+    "price_levels": [],  # [{"above": usd} or {"below": usd}]
+    "funding": None,  # {"above": rate, "below": rate}
+    "margin_ratio": None,  # Max % of account equity held as position margin
+    "balance": None,  # Floor in sats
+    "position_changes": True,  # Opened/changed/closed position alerts
+}
+POSITION_SETTINGS = ("liquidation", "loss")  # May be set per side and per position
+ACCOUNT_SETTINGS = POSITION_SETTINGS + ("margin_ratio", "balance", "position_changes")
+SELECTORS = ("account", "side", "position")
+SIDES = {"long": True, "short": False}
+# Upper bound of a liquidation threshold: its re-arm level must stay under 100%
+MAX_LIQUIDATION_THRESHOLD = 100 * LIQUIDATION_THRESHOLD / LIQUIDATION_REARM
+
+
+@lru_cache(maxsize=None)
+def liquidation_rule(threshold: float) -> AlertRule:
+    """Liquidation distance rule; the re-arm level keeps its ratio to the default."""
+    return AlertRule(threshold, threshold * LIQUIDATION_REARM / LIQUIDATION_THRESHOLD,
+                     ALERT_COOLDOWN, LIQUIDATION_ESCALATION, rising=False)
+
+
+@lru_cache(maxsize=None)
+def loss_rule(threshold: float) -> AlertRule:
+    """Loss rule; the re-arm level keeps its ratio to the default."""
+    return AlertRule(threshold, threshold * LOSS_REARM / LOSS_THRESHOLD, ALERT_COOLDOWN,
+                     LOSS_ESCALATION)
+
+
+def position_rules(liquidation=LIQUIDATION_THRESHOLD, loss=LOSS_THRESHOLD):
+    """Liquidation and loss rules keyed by kind."""
+    return {"liquidation": liquidation_rule(liquidation), "loss": loss_rule(loss)}
+
+
+def price_rules(windows=None):
+    """Price-move rule per window, keyed "price_<seconds>"."""
+    return {
+        f"price_{seconds}": AlertRule(threshold, threshold * PRICE_REARM_RATIO, ALERT_COOLDOWN,
+                                      threshold / 2)
+        for seconds, threshold in (PRICE_WINDOWS if windows is None else windows).items()
+    }
+
+
+def _limit_rule(limit: float, rising: bool, rearm: float) -> AlertRule:
+    return AlertRule(limit, rearm, ALERT_COOLDOWN, rising=rising)
+
+
+class AccountPlan:
+    """Resolved rules for one account."""
+
+    def __init__(self, sides: dict, position_overrides: list, settings: dict):
+        self.sides = sides  # long (bool) -> {"liquidation": threshold, "loss": threshold}
+        self.position_overrides = position_overrides  # [(id prefix, long or None, settings)]
+        self.margin_ratio = settings["margin_ratio"]
+        self.balance = settings["balance"]
+        self.position_changes = settings["position_changes"]
+
+        thresholds = [s[kind] for s in sides.values() for kind in POSITION_SETTINGS]
+        thresholds += [v for _, _, s in position_overrides for v in s.values()]
+        self.needs = set()
+        if (any(t is not None for t in thresholds) or self.position_changes
+                or self.margin_ratio is not None):
+            self.needs.add("positions")
+        if self.balance is not None or self.margin_ratio is not None:
+            self.needs.add("account")
+
+        liquidation = [s["liquidation"] for s in sides.values()]
+        liquidation += [s["liquidation"] for _, _, s in position_overrides if "liquidation" in s]
+        liquidation = [t for t in liquidation if t is not None]
+        loss = [s["loss"] for s in sides.values()]
+        loss += [s["loss"] for _, _, s in position_overrides if "loss" in s]
+        loss = [t for t in loss if t is not None]
+        # Widest re-arm levels, for the trigger indices of cached positions
+        self.max_liquidation_rearm = (max(liquidation_rule(t).rearm for t in liquidation)
+                                      if liquidation else None)
+        self.min_loss_rearm = min(loss_rule(t).rearm for t in loss) if loss else None
+
+        self.balance_rule = (_limit_rule(self.balance, False, self.balance * BALANCE_REARM_RATIO)
+                             if self.balance is not None else None)
+        self.margin_ratio_rule = (
+            _limit_rule(self.margin_ratio, True, self.margin_ratio - MARGIN_RATIO_REARM)
+            if self.margin_ratio is not None else None)
+
+    def rules(self, long: bool, position_id: str) -> dict:
+        """{"liquidation": AlertRule or None, "loss": AlertRule or None} for one position."""
+        thresholds = self.sides[bool(long)]
+        for prefix, side, settings in self.position_overrides:
+            if (side is None or side == bool(long)) and position_id.startswith(prefix):
+                thresholds = dict(thresholds, **settings)
+        return {
+            "liquidation": (liquidation_rule(thresholds["liquidation"])
+                            if thresholds["liquidation"] is not None else None),
+            "loss": loss_rule(thresholds["loss"]) if thresholds["loss"] is not None else None,
+        }
+
+    def book_rules(self, book) -> list:
+        """rules() for every position in a PositionBook, in book order."""
+        if not self.position_overrides:
+            by_side = {long: self.rules(long, "") for long in (True, False)}
+            return [by_side[bool(long)] for long in book.long]
+        return [self.rules(long, position_id) for long, position_id in zip(book.long, book.ids)]
+
+
+class RulePlan:
+    """Compiled rule file: market-wide rules plus one AccountPlan per account."""
+
+    def __init__(self, price_windows: dict, market_rules: dict, accounts: dict, default: AccountPlan):
+        self.price_windows = price_windows
+        self.price_rules = price_rules(price_windows)
+        # Move each window reports to the suppressor: its re-arm level
+        self.price_rearm = {seconds: self.price_rules[f"price_{seconds}"].rearm for seconds in price_windows}
+        self.market_rules = market_rules  # Ticker field -> {key: AlertRule}
+        self._accounts = accounts
+        self._default = default
+
+    def account(self, name) -> AccountPlan:
+        return self._accounts.get(name, self._default)
+
+
+def load_rules(path: str) -> dict:
+    """Read a rule file: TOML if it ends in .toml, JSON otherwise."""
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise ValueError("TOML rule files need Python 3.11+; use JSON instead")
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _number(value, what: str, allow_none: bool = True):
+    if value is None and allow_none:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{what} must be a number{' or null' if allow_none else ''}")
+    return value
+
+
+def _limits(entry, what: str) -> list:
+    """[(rising, limit)] from an {"above": x, "below": y} entry."""
+    if not isinstance(entry, dict) or not entry or set(entry) - {"above", "below"}:
+        raise ValueError(f"{what} must be an object with \"above\" and/or \"below\"")
+    return [(direction == "above", _number(entry[direction], f"{what}.{direction}", False))
+            for direction in ("above", "below") if direction in entry]
+
+
+def _market_rules(config: dict) -> dict:
+    """Price level and funding rules, grouped by the ticker field they watch."""
+    rules = {}
+    levels = config["price_levels"] or []
+    if not isinstance(levels, list):
+        raise ValueError("price_levels must be a list")
+    for entry in levels:
+        for rising, level in _limits(entry, "price_levels"):
+            rearm = level * (1 - PRICE_LEVEL_REARM / 100 if rising else 1 + PRICE_LEVEL_REARM / 100)
+            rules.setdefault("index", {})[f"level_{'above' if rising else 'below'}_{level:g}"] = (
+                _limit_rule(level, rising, rearm))
+    if config["funding"] is not None:
+        for rising, limit in _limits(config["funding"], "funding"):
+            # Pull the limit toward zero by the ratio, whichever side of zero it is on
+            rearm = limit - abs(limit) * (1 - FUNDING_REARM_RATIO) * (1 if rising else -1)
+            rules.setdefault("fundingRate", {})[f"funding_{'above' if rising else 'below'}"] = (
+                _limit_rule(limit, rising, rearm))
+    return rules
+
+
+def _check_settings(entry: dict, allowed: tuple, where: str) -> dict:
+    settings = {k: v for k, v in entry.items() if k not in SELECTORS}
+    for key, value in settings.items():
+        if key not in allowed:
+            raise ValueError(f"{where}: \"{key}\" can't be set here")
+        if key == "position_changes":
+            if not isinstance(value, bool):
+                raise ValueError(f"{where}: position_changes must be true or false")
+            continue
+        value = _number(value, f"{where}: {key}")
+        if value is None:
+            continue
+        if key == "liquidation" and not 0 < value < MAX_LIQUIDATION_THRESHOLD:
+            raise ValueError(f"{where}: liquidation must be above 0 and below "
+                             f"{MAX_LIQUIDATION_THRESHOLD:g} (% from liquidation)")
+        if key == "loss" and value <= 0:
+            raise ValueError(f"{where}: loss must be above 0 (% of margin)")
+    return settings
+
+
+def _specificity(override: dict) -> int:
+    return 4 * ("position" in override) + 2 * ("side" in override) + ("account" in override)
+
+
+def compile_rules(config: dict = None, accounts: list = None) -> RulePlan:
+    """Compile a rule file's contents into a RulePlan.
+
+    `accounts` lists the account names in use; overrides naming any other
+    account are rejected. Raises ValueError on an invalid rule file.
+    """
+    config = dict(config or {})
+    overrides = config.pop("overrides", [])
+    unknown = set(config) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown rule setting(s): {', '.join(sorted(unknown))}")
+    config = dict(DEFAULTS, **config)
+    for key in ACCOUNT_SETTINGS:
+        _check_settings({key: config[key]}, ACCOUNT_SETTINGS, "rules")
+
+    windows = config["price_move"] or {}
+    if not isinstance(windows, dict):
+        raise ValueError("price_move must map window seconds to a percent")
+    try:
+        windows = {int(seconds): _number(pct, f"price_move.{seconds}", False)
+                   for seconds, pct in windows.items()}
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"price_move: {e}")
+
+    if not isinstance(overrides, list):
+        raise ValueError("overrides must be a list")
+    for n, override in enumerate(overrides, 1):
+        where = f"override {n}"
+        if not isinstance(override, dict):
+            raise ValueError(f"{where} must be an object")
+        if "side" in override and override["side"] not in SIDES:
+            raise ValueError(f"{where}: side must be \"long\" or \"short\"")
+        if accounts is not None and "account" in override and override["account"] not in accounts:
+            raise ValueError(f"{where}: unknown account \"{override['account']}\"")
+        scoped = "side" in override or "position" in override
+        _check_settings(override, POSITION_SETTINGS if scoped else ACCOUNT_SETTINGS, where)
+    overrides = sorted(overrides, key=_specificity)
+
+    def account_plan(name) -> AccountPlan:
+        applicable = [o for o in overrides if o.get("account", name) == name]
+        settings = {key: config[key] for key in ACCOUNT_SETTINGS}
+        for o in applicable:
+            if not ("side" in o or "position" in o):
+                settings.update((k, v) for k, v in o.items() if k not in SELECTORS)
+        sides = {}
+        for side, long in SIDES.items():
+            thresholds = {kind: settings[kind] for kind in POSITION_SETTINGS}
+            for o in applicable:
+                if o.get("side") == side and "position" not in o:
+                    thresholds.update((k, v) for k, v in o.items() if k not in SELECTORS)
+            sides[long] = thresholds
+        position_overrides = [
+            (str(o["position"]), SIDES[o["side"]] if "side" in o else None,
+             {k: v for k, v in o.items() if k not in SELECTORS})
+            for o in applicable if "position" in o
+        ]
+        return AccountPlan(sides, position_overrides, settings)
+
+    names = {o["account"] for o in overrides if "account" in o}
+    return RulePlan(windows, _market_rules(config), {name: account_plan(name) for name in names},
+                    account_plan(None))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Alert deduplication with cooldown, hysteresis and escalation.
+
+Active alerts are kept in a plain dict keyed by "<kind>:<subject>" (e.g.
+"liquidation:a1f11a32-...") or just "<kind>" (e.g. "price_300"), so the
+state is saved with the rest of the alert state and each candidate costs
+one dict lookup.
+
+An alert fires when its value first crosses the threshold, then stays
+latched: it repeats only after the cooldown, or straight away if the value
+got worse by the escalation step. It re-arms once the value recovers past
+the re-arm level, which sits on the safe side of the threshold so a value
+hovering around it does not flap.
+"""
+
+
+class AlertRule:
+    """Thresholds for one kind of alert.
+
+    rising: True when a larger value is worse (loss %, price move %), False
+    when a smaller one is (distance to liquidation).
+    """
+
+    def __init__(self, threshold: float, rearm: float, cooldown: float,
+                 escalation: float = 0, rising: bool = True):
+        self.threshold = threshold
+        self.rearm = rearm  # Candidates must be reported up to this level
+        self.cooldown = cooldown  # Seconds before repeating an unchanged alert
+        self.escalation = escalation  # Worsening that re-alerts at once (0 = never)
+        self.rising = rising
+
+    def severity(self, value: float) -> float:
+        """Value oriented so that larger is always worse."""
+        return value if self.rising else -value
+
+    def breached(self, value: float) -> bool:
+        return self.severity(value) > self.severity(self.threshold)
+
+    def candidate(self, value: float) -> bool:
+        """Whether `value` is past the re-arm level, so it must be passed to check()."""
+        return self.severity(value) > self.severity(self.rearm)
+
+
+class AlertSuppressor:
+    """Decides which candidate alerts to send.
+
+    Call check() for every value past its rule's re-arm level in a cycle,
+    then sweep(): alerts that were not reported again have recovered (or
+    their position is gone) and are re-armed.
+    """
+
+    def __init__(self, rules: dict, active: dict):
+        self.rules = rules  # kind -> AlertRule
+        self.active = active  # key -> {"sent": ts, "level": value}; persisted by the caller
+        self._seen = set()
+
+    def check(self, kind: str, subject, value: float, now: float, rule: AlertRule = None) -> str:
+        """Return "new", "escalated" or "repeat" if the alert should be sent, else None.
+
+        `rule` overrides the kind's rule, for subjects with their own thresholds.
+        """
+        rule = rule or self.rules[kind]
+        key = kind if subject is None else f"{kind}:{subject}"
+        self._seen.add(key)
+        entry = self.active.get(key)
+
+        if entry is None:
+            if not rule.breached(value):
+                return None  # Between threshold and re-arm level, never alerted
+            self.active[key] = {"sent": now, "level": value}
+            return "new"
+
+        if rule.escalation and rule.severity(value) - rule.severity(entry["level"]) >= rule.escalation:
+            verdict = "escalated"
+        elif rule.breached(value) and now - entry["sent"] >= rule.cooldown:
+            verdict = "repeat"
+        else:
+            return None
+        entry["sent"] = now
+        entry["level"] = value
+        return verdict
+
+    def sweep(self) -> list:
+        """Re-arm alerts not reported since the last sweep; returns their keys."""
+        recovered = [key for key in self.active if key not in self._seen]
+        for key in recovered:
+            del self.active[key]
+        self._seen.clear()
+        return recovered
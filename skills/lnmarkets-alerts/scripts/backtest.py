@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""Replay price history through the alert rules to tune thresholds.
+
+Ticks come from a tick file (tick_recorder.py), a CSV of timestamp,price
+rows or a synthetic random walk. Positions are a synthetic book opened
+along the way at a range of leverages. Nothing touches the network.
+
+Thresholds are compiled into a rule plan as alert_check.py does, from a
+rule file's liquidation, loss and price_move settings with one of them
+replaced per grid value. A sweep runs in two passes. The first feeds the
+history through MovementDetector and the risk formulas once and keeps only
+the ticks where some threshold in the grid could fire. The second replays
+those ticks through AlertSuppressor once per threshold value, with the
+same candidate filtering as alert_check.py. For positions, the candidates
+at each value are split into runs of consecutive ticks, and within a run
+the suppressor is only checked on the ticks where its verdict can change:
+the first breach, then escalations and expired cooldowns. Liquidation,
+loss and price rules never share suppression state, so every value is
+replayed once and the grid is assembled from the results. Both passes run
+in parallel across cores.
+"""
+
+import os
+import sys
+import csv
+import json
+import math
+import time
+import random
+import argparse
+import statistics
+from array import array
+from bisect import bisect_left
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from alert_rules import compile_rules, load_rules
+from alert_suppression import AlertSuppressor
+from price_monitor import MovementDetector, format_duration, over_floor
+from risk_engine import SATS_PER_BTC, inverse_pl, liquidation_distance, trigger_price
+from tick_recorder import MAGIC, TickFile, parse_time
+
+YEAR = 365 * 86400
+
+# Synthetic history: a random walk with occasional jumps
+SYNTHETIC_PRICE = 65000.0
+SYNTHETIC_VOLATILITY = 0.6  # Annualised
+SYNTHETIC_JUMP_CHANCE = 0.0005  # Per tick
+SYNTHETIC_JUMP_SIZE = (0.02, 0.06)  # Fraction of the price
+SYNTHETIC_START = 1_700_000_000  # Fixed, so runs are reproducible
+SYNTHETIC_DAYS = 90  # Default history length; a year takes about 4x as long to replay
+
+# Synthetic positions
+OPEN_EVERY = 12 * 3600  # Seconds between positions
+HOLD = 7 * 86400  # Seconds a position is held unless liquidated first
+LEVERAGES = (5, 10, 25, 50)
+POSITION_QUANTITY = 1000  # USD
+
+DEFAULT_LIQUIDATION_GRID = "5,10,15,20"
+DEFAULT_LOSS_GRID = "10,20,30,50"
+DEFAULT_PRICE_GRID = "3,5,8"  # 5-minute move; the other windows scale with it
+POSITION_CHUNK = 64  # Positions per first-pass task
+GRID_SETTINGS = ("liquidation", "loss", "price_move")  # Rule file settings the grid varies
+REFERENCE_WINDOW = 300  # Price window --price sets; the others scale with it
+
+_data = {}  # Per worker process: times, prices and first-pass results
+
+
+def load_ticks(path: str, since_ms: int = None, until_ms: int = None) -> tuple:
+    """(times in seconds, index prices) from a tick file or a CSV.
+
+    CSVs may have a header naming an "index" or "price" column; otherwise
+    the second column is the price. Timestamps may be seconds or ms.
+    """
+    times, prices = array("d"), array("d")
+    with open(path, "rb") as f:
+        binary = f.read(len(MAGIC)) == MAGIC
+    if binary:
+        with TickFile(path) as ticks:
+            for ts, index, *_ in ticks.ticks(since_ms, until_ms):
+                if index == index:  # Not NaN
+                    times.append(ts / 1000)
+                    prices.append(index)
+        return times, prices
+
+    with open(path, "r", newline="") as f:
+        rows = csv.reader(f)
+        column = 1
+        for row in rows:
+            if not row:
+                continue
+            try:
+                ts, price = float(row[0]), float(row[column])
+            except ValueError:
+                header = [name.strip().lower() for name in row]
+                column = next((header.index(name) for name in ("index", "price") if name in header), 1)
+                continue
+            ts_ms = ts if ts > 1e11 else ts * 1000
+            if (since_ms and ts_ms < since_ms) or (until_ms and ts_ms >= until_ms):
+                continue
+            if price == price and (not times or ts_ms / 1000 >= times[-1]):
+                times.append(ts_ms / 1000)
+                prices.append(price)
+    return times, prices
+
+
+def synthetic_ticks(days: float, interval: float = 60, price: float = SYNTHETIC_PRICE,
+                    volatility: float = SYNTHETIC_VOLATILITY, seed: int = 1) -> tuple:
+    """Random-walk price history with jumps, one tick every `interval` seconds."""
+    rng = random.Random(seed)
+    sigma = volatility * math.sqrt(interval / YEAR)
+    count = int(days * 86400 / interval)
+    times = array("d", (SYNTHETIC_START + i * interval for i in range(count)))
+    prices = array("d", [0.0]) * count
+    for i in range(count):
+        if rng.random() < SYNTHETIC_JUMP_CHANCE:
+            price *= 1 + rng.choice((-1, 1)) * rng.uniform(*SYNTHETIC_JUMP_SIZE)
+        price *= math.exp(rng.gauss(0, sigma))
+        prices[i] = price
+    return times, prices
+
+
+def synthetic_positions(times, prices, open_every: float = OPEN_EVERY, seed: int = 1) -> list:
+    """Isolated positions opened every `open_every` seconds at random sides and leverages.
+
+    Liquidation prices are where the loss equals the margin, without a
+    maintenance margin.
+    """
+    rng = random.Random(seed)
+    positions = []
+    opened_at = times[0]
+    while True:
+        i = bisect_left(times, opened_at)
+        if i >= len(times):
+            return positions
+        long = rng.random() < 0.5
+        leverage = rng.choice(LEVERAGES)
+        entry = prices[i]
+        positions.append({
+            "id": f"p{len(positions)}",
+            "long": long,
+            "price": entry,
+            "quantity": POSITION_QUANTITY,
+            "margin": POSITION_QUANTITY / entry * SATS_PER_BTC / leverage,
+            "liquidation": entry * leverage / (leverage + 1 if long else leverage - 1),
+            "opened": i,
+        })
+        opened_at = times[i] + open_every
+
+
+def grid_plan(base: dict, liquidation: float = None, loss: float = None, scale: float = 1):
+    """Rule plan for `base` settings with a liquidation or loss threshold replaced, or price windows scaled."""
+    config = dict(base)
+    if liquidation is not None:
+        config["liquidation"] = liquidation
+    if loss is not None:
+        config["loss"] = loss
+    if scale != 1:
+        config["price_move"] = {seconds: pct * scale for seconds, pct in base_windows(base).items()}
+    return compile_rules(config)
+
+
+def base_windows(base: dict) -> dict:
+    return compile_rules(base).price_windows
+
+
+def position_rule(plan, kind: str):
+    """The default account's liquidation or loss rule; both sides are the same without overrides."""
+    return plan.account(None).rules(True, "")[kind]
+
+
+def _init(data: dict) -> None:
+    _data.clear()
+    _data.update(data)
+
+
+def window_moves(seconds: float, min_rearm: float) -> tuple:
+    """First pass for one price window: (tick, percent, start, end) past `min_rearm`."""
+    times, prices = _data["times"], _data["prices"]
+    detector = MovementDetector({seconds: 0}, max(len(times), 1))
+    hits = []
+    for tick, (ts, price) in enumerate(zip(times, prices)):
+        detector.add(ts, price)
+        for _, pct, start, end in detector.moves():
+            if abs(pct) >= min_rearm:
+                hits.append((tick, pct, start, end))
+    return seconds, hits
+
+
+def position_series(positions: list, hold: float, max_distance: float, min_loss: float) -> list:
+    """First pass for some positions: (position, ticks, distances, losses, liquidated tick).
+
+    Only ticks within `max_distance`% of liquidation or past `min_loss`% of
+    margin lost are kept, with the distance and the loss in % of margin at
+    each. A position ends at liquidation or after `hold`.
+    """
+    times, prices = _data["times"], _data["prices"]
+    results = []
+    for position in positions:
+        long, entry, quantity = position["long"], position["price"], position["quantity"]
+        margin, liquidation = position["margin"], position["liquidation"]
+        side = "b" if long else "s"
+        first = position["opened"]
+        stop = bisect_left(times, times[first] + hold, first)
+        # Price past which either rule could fire: the nearer of the two bounds
+        near = trigger_price(long, liquidation, max_distance)
+        loss_step = margin * min_loss / 100 / (quantity * SATS_PER_BTC)
+        losing = 1 / (1 / entry + loss_step) if long else 1 / max(1 / entry - loss_step, 1e-12)
+        bound = max(near, losing) if long else min(near, losing)
+        if long:
+            liquidated = next((i for i in range(first, stop) if prices[i] <= liquidation), None)
+        else:
+            liquidated = next((i for i in range(first, stop) if prices[i] >= liquidation), None)
+        if liquidated is not None:
+            stop = liquidated + 1
+        if long:
+            ticks = array("l", [i for i in range(first, stop) if prices[i] < bound])
+        else:
+            ticks = array("l", [i for i in range(first, stop) if prices[i] > bound])
+        distances = array("d", [liquidation_distance(side, liquidation, prices[i]) for i in ticks])
+        pls = (inverse_pl(long, quantity, entry, prices[i]) for i in ticks)
+        losses = array("d", (-pl / margin * 100 if pl < 0 else 0.0 for pl in pls))
+        results.append((position["id"], ticks, distances, losses, liquidated))
+    return results
+
+
+def replay_prices(scale: float) -> dict:
+    """Second pass: price-move alerts with every window threshold scaled by `scale`."""
+    times, moves = _data["times"], _data["moves"]
+    plan = grid_plan(_data["base"], scale=scale)
+    suppressor = AlertSuppressor(plan.price_rules, {})
+    alerts = 0
+    last = None
+    for tick in sorted(moves):
+        if last is not None and tick != last + 1:
+            suppressor.sweep()  # Nothing was reported in between, so everything re-arms
+        # As MovementDetector.breaches() reports them to check_price_movement
+        for seconds, pct, start, end in over_floor(moves[tick], plan.price_rearm):
+            if suppressor.check(f"price_{seconds}", None, abs(pct), times[tick]):
+                alerts += 1
+        suppressor.sweep()
+        last = tick
+    return {"alerts": alerts}
+
+
+def candidate_runs(ticks, values, rule) -> list:
+    """Indexes of the `values` past `rule`'s re-arm level, split into runs of consecutive ticks.
+
+    alert_check.py reports these to the suppressor every cycle, and a gap
+    between runs re-arms the alert.
+    """
+    if rule.rising:
+        candidates = [j for j, value in enumerate(values) if value > rule.rearm]
+    else:
+        candidates = [j for j, value in enumerate(values) if value < rule.rearm]
+    breaks = [k for k, (previous, j) in enumerate(zip(candidates, candidates[1:]), 1)
+              if ticks[j] != ticks[previous] + 1]
+    edges = [0, *breaks, len(candidates)] if candidates else []
+    return [candidates[start:end] for start, end in zip(edges, edges[1:])]
+
+
+def replay_run(kind: str, rule, subject: str, run: list, ticks, values) -> tuple:
+    """Replay one run of candidates through a fresh AlertSuppressor: (alerts, time of the new alert).
+
+    check() only changes anything on the first breach and, after it, where
+    the value escalated or the cooldown ran out, so only those ticks are
+    checked.
+    """
+    times = _data["times"]
+    sign = 1 if rule.rising else -1
+    threshold = sign * rule.threshold
+    first = next((j for j in run if sign * values[j] > threshold), None)
+    if first is None:
+        return 0, None  # Between threshold and re-arm level throughout
+    suppressor = AlertSuppressor({kind: rule}, {})
+    suppressor.check(kind, subject, values[first], times[ticks[first]])
+    entry = suppressor.active[f"{kind}:{subject}"]
+    alerts = 1
+    rest = iter(run[run.index(first) + 1:])
+    while True:
+        level, sent = sign * entry["level"], entry["sent"]
+        due = next((j for j in rest
+                    if (rule.escalation and sign * values[j] - level >= rule.escalation)
+                    or (sign * values[j] > threshold and times[ticks[j]] - sent >= rule.cooldown)), None)
+        if due is None:
+            return alerts, times[ticks[first]]
+        if suppressor.check(kind, subject, values[due], times[ticks[due]]):
+            alerts += 1
+
+
+def replay_positions(kind: str, threshold: float) -> dict:
+    """Second pass: liquidation or loss alerts at one threshold.
+
+    Returns the alert count and, per liquidated position, how long before
+    liquidation the alert standing at that moment was first sent (None if
+    there was none).
+    """
+    times = _data["times"]
+    rule = position_rule(grid_plan(_data["base"], **{kind: threshold}), kind)
+    alerts = 0
+    leads = {}
+    for position_id, ticks, distances, losses, liquidated in _data["positions"]:
+        values = losses if kind == "loss" else distances
+        warned_at = None
+        for run in candidate_runs(ticks, values, rule):
+            count, warned_at = replay_run(kind, rule, position_id, run, ticks, values)
+            alerts += count
+        if liquidated is not None:
+            # The liquidation tick ends the last run
+            leads[position_id] = None if warned_at is None else times[liquidated] - warned_at
+    return {"alerts": alerts, "leads": leads}
+
+
+def sweep(times, prices, positions: list, liquidation_grid: list, loss_grid: list,
+          price_grid: list, hold: float = HOLD, workers: int = None, base: dict = None) -> list:
+    """Replay every combination of thresholds; one result dict per combination.
+
+    `base` holds the rule file settings the grid starts from (defaults if None);
+    price grid values are for its REFERENCE_WINDOW window.
+    """
+    base = base or {}
+    windows = base_windows(base)
+    scales = [value / windows[REFERENCE_WINDOW] for value in price_grid]
+    price_plans = [grid_plan(base, scale=scale) for scale in scales]
+    min_rearm = {seconds: min(plan.price_rearm[seconds] for plan in price_plans) for seconds in windows}
+    max_distance = max(position_rule(grid_plan(base, liquidation=t), "liquidation").rearm
+                       for t in liquidation_grid)
+    min_loss = min(position_rule(grid_plan(base, loss=t), "loss").rearm for t in loss_grid)
+
+    data = {"times": times, "prices": prices}
+    with ProcessPoolExecutor(workers, initializer=_init, initargs=(data,)) as pool:
+        window_jobs = [pool.submit(window_moves, seconds, min_rearm[seconds]) for seconds in windows]
+        series_jobs = [pool.submit(position_series, positions[i:i + POSITION_CHUNK], hold,
+                                   max_distance, min_loss)
+                       for i in range(0, len(positions), POSITION_CHUNK)]
+        moves = {}
+        for job in window_jobs:
+            seconds, hits = job.result()
+            for tick, pct, start, end in hits:
+                moves.setdefault(tick, []).append((seconds, pct, start, end))
+        for tick_moves in moves.values():
+            tick_moves.sort(key=lambda move: move[0])  # Shorter windows first, as in moves()
+        series = [result for job in series_jobs for result in job.result()]
+
+    data = {"times": times, "moves": moves, "positions": series, "base": base}
+    with ProcessPoolExecutor(workers, initializer=_init, initargs=(data,)) as pool:
+        liquidation_jobs = {t: pool.submit(replay_positions, "liquidation", t) for t in liquidation_grid}
+        loss_jobs = {t: pool.submit(replay_positions, "loss", t) for t in loss_grid}
+        price_jobs = {v: pool.submit(replay_prices, s) for v, s in zip(price_grid, scales)}
+        by_liquidation = {t: job.result() for t, job in liquidation_jobs.items()}
+        by_loss = {t: job.result() for t, job in loss_jobs.items()}
+        by_price = {v: job.result() for v, job in price_jobs.items()}
+
+    liquidated = [position_id for position_id, *_, tick in series if tick is not None]
+    rows = []
+    for liq, loss, move in product(liquidation_grid, loss_grid, price_grid):
+        leads = []
+        for position_id in liquidated:
+            warnings = [by_liquidation[liq]["leads"][position_id], by_loss[loss]["leads"][position_id]]
+            warnings = [lead for lead in warnings if lead is not None]
+            if warnings:
+                leads.append(max(warnings))
+        rows.append({
+            "liquidation": liq,
+            "loss": loss,
+            "price": move,
+            "liquidation_alerts": by_liquidation[liq]["alerts"],
+            "loss_alerts": by_loss[loss]["alerts"],
+            "price_alerts": by_price[move]["alerts"],
+            "liquidated": len(liquidated),
+            "warned": len(leads),
+            "median_lead": statistics.median(leads) if leads else None,
+            "min_lead": min(leads) if leads else None,
+        })
+    return rows
+
+
+def _grid(text: str) -> list:
+    return [float(value) for value in text.split(",") if value.strip()]
+
+
+def _lead(seconds) -> str:
+    return "-" if seconds is None else format_duration(seconds) if seconds else "0"
+
+
+def print_rows(rows: list, base: dict = None) -> None:
+    plan = compile_rules(base)
+    thresholds = plan.account(None).sides[True]
+    current_set = (thresholds["liquidation"], thresholds["loss"], plan.price_windows.get(REFERENCE_WINDOW))
+    print(f"{'Liq%':>5} {'Loss%':>6} {'Move%':>6} | {'Liq':>6} {'Loss':>6} {'Price':>6} | "
+          f"{'Warned':>9} {'Median lead':>12} {'Min lead':>12}")
+    for row in rows:
+        current = (row["liquidation"], row["loss"], row["price"]) == current_set
+        print(f"{row['liquidation']:>5g} {row['loss']:>6g} {row['price']:>6g} | "
+              f"{row['liquidation_alerts']:>6} {row['loss_alerts']:>6} {row['price_alerts']:>6} | "
+              f"{row['warned']:>4}/{row['liquidated']:<4} {_lead(row['median_lead']):>12} "
+              f"{_lead(row['min_lead']):>12}{'  ← current' if current else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay price history through the alert thresholds")
+    parser.add_argument("--ticks", metavar="FILE", help="Tick file or CSV (default: synthetic history)")
+    parser.add_argument("--since", help="Age (e.g. 30d) or unix timestamp to start from")
+    parser.add_argument("--until", help="Age or unix timestamp to stop at")
+    parser.add_argument("--days", type=float, default=SYNTHETIC_DAYS,
+                        help=f"Synthetic history length (default {SYNTHETIC_DAYS})")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the synthetic history and book")
+    parser.add_argument("--open-every", type=float, default=OPEN_EVERY / 3600,
+                        help="Hours between synthetic positions")
+    parser.add_argument("--hold", type=float, default=HOLD / 86400, help="Days each position is held")
+    parser.add_argument("--liquidation", default=DEFAULT_LIQUIDATION_GRID,
+                        help="Liquidation distance thresholds to try (%%)")
+    parser.add_argument("--loss", default=DEFAULT_LOSS_GRID, help="Loss thresholds to try (%% of margin)")
+    parser.add_argument("--price", default=DEFAULT_PRICE_GRID, help="5-minute move thresholds to try (%%)")
+    parser.add_argument("--rules", metavar="FILE",
+                        help="Rule file whose thresholds are current and whose price windows scale "
+                             "(overrides are ignored)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    parser.add_argument("--json", metavar="FILE", help="Save the results to FILE")
+    args = parser.parse_args()
+
+    try:
+        config = load_rules(args.rules) if args.rules else {}
+        base = {key: config[key] for key in GRID_SETTINGS if key in config}
+        compile_rules(base)
+    except (OSError, ValueError) as e:
+        print(f"❌ Invalid rule file {args.rules}: {e}")
+        sys.exit(2)
+    if REFERENCE_WINDOW not in base_windows(base):
+        print(f"❌ The rules need a {REFERENCE_WINDOW}s price_move window for --price")
+        sys.exit(2)
+
+    started = time.perf_counter()
+    if args.ticks:
+        times, prices = load_ticks(args.ticks, parse_time(args.since) if args.since else None,
+                                   parse_time(args.until) if args.until else None)
+    else:
+        times, prices = synthetic_ticks(args.days, seed=args.seed)
+    if len(times) < 2:
+        print("❌ Not enough ticks to replay")
+        sys.exit(2)
+    positions = synthetic_positions(times, prices, args.open_every * 3600, args.seed)
+
+    rows = sweep(times, prices, positions, _grid(args.liquidation), _grid(args.loss),
+                 _grid(args.price), args.hold * 86400, args.workers, base)
+    elapsed = time.perf_counter() - started
+    print(f"Replayed {len(times):,} ticks over {format_duration(times[-1] - times[0])}, "
+          f"{len(positions):,} positions, {rows[0]['liquidated']:,} liquidated, "
+          f"{len(rows)} threshold sets in {elapsed:.1f}s\n")
+    print_rows(rows, base)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"ticks": len(times), "positions": len(positions), "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
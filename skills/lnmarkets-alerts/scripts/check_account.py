@@ -3,15 +3,22 @@
 
 import sys
 import os
+import argparse
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from lnm_client import get_account
+from lnm_client import get_account, set_cache
 
 def sats_to_btc(sats: int) -> float:
     """Convert satoshis to BTC."""
     return sats / 100_000_000
 
 def main():
+    parser = argparse.ArgumentParser(description="Check LN Markets account balance")
+    parser.add_argument("--fresh", action="store_true", help="Bypass the shared response cache")
+    args = parser.parse_args()
+    if args.fresh:
+        set_cache(fresh=True)
+    
     try:
         account = get_account()
         
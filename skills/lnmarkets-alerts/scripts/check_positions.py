@@ -3,19 +3,24 @@
 
 import sys
 import os
+import json
 import argparse
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from lnm_client import get_all_positions, get_ticker
+from lnm_client import get_all_positions, get_ticker, submit, set_cache
+from risk_engine import PositionBook, breaches, is_long, liquidation_distance, price_grid, stress_test
+from alert_rules import load_rules, compile_rules
+
+STRESS_RANGE = 30  # Percent either side of the current price
+STRESS_STEP = 0.1  # Percent between grid levels
+STRESS_EVERY = 5  # Percent between printed rows
+STRESS_BAR = 20  # Width of the cascade bar
+STRESS_IDS = 5  # Liquidated positions named per row
 
 def sats_to_btc(sats: int) -> float:
     """Convert satoshis to BTC."""
     return sats / 100_000_000
 
-def is_long(side: str) -> bool:
-    """Check if position is long (buy)."""
-    return side in ("b", "buy")
-
 
 def format_isolated_trade(trade: dict, current_price: float) -> str:
     """Format an isolated margin trade for display."""
@@ -31,12 +36,7 @@ def format_isolated_trade(trade: dict, current_price: float) -> str:
     side_str = "LONG" if is_long(side) else "SHORT"
     
     # Calculate distance to liquidation
-    liq_distance = None
-    if liq_price and current_price:
-        if is_long(side):  # long
-            liq_distance = ((current_price - liq_price) / current_price) * 100
-        else:  # short
-            liq_distance = ((liq_price - current_price) / current_price) * 100
+    liq_distance = liquidation_distance(side, liq_price, current_price)
     
     lines = [
         f"{side_emoji} ISOLATED {side_str} #{trade_id}",
@@ -66,12 +66,7 @@ def format_cross_position(pos: dict, current_price: float) -> str:
     side_str = "LONG" if is_long(side) else "SHORT"
     
     # Calculate distance to liquidation
-    liq_distance = None
-    if liq_price and current_price:
-        if is_long(side):  # long
-            liq_distance = ((current_price - liq_price) / current_price) * 100
-        else:  # short
-            liq_distance = ((liq_price - current_price) / current_price) * 100
+    liq_distance = liquidation_distance(side, liq_price, current_price)
     
     lines = [
         f"{side_emoji} CROSS {side_str}",
@@ -85,69 +80,113 @@ def format_cross_position(pos: dict, current_price: float) -> str:
     
     return "\n".join(lines)
 
-def check_alerts(isolated: list, cross: dict, current_price: float) -> list:
-    """Check for risky positions."""
+def check_alerts(isolated: list, cross: dict, current_price: float, plan=None) -> list:
+    """Check for risky positions against the rule plan's thresholds (defaults if None)."""
     alerts = []
+    book = PositionBook.from_positions(isolated, cross)
+    rules = (plan or compile_rules()).account(None).book_rules(book)
+    thresholds = {kind: [r[kind].threshold if r[kind] else float("nan") for r in rules]
+                  for kind in ("liquidation", "loss")}
     
-    # Check isolated trades
-    for trade in isolated:
-        side = trade.get("side", "unknown")
-        quantity = trade.get("quantity", 0)
-        margin = trade.get("margin", 0)
-        pl = trade.get("pl", 0)
-        liq_price = trade.get("liquidation", 0)
-        trade_id = trade.get("id", "?")[:8]
-        
-        if liq_price and current_price:
-            if is_long(side):
-                liq_distance = ((current_price - liq_price) / current_price) * 100
-            else:
-                liq_distance = ((liq_price - current_price) / current_price) * 100
-            
-            if liq_distance < 10:
-                side_str = "LONG" if is_long(side) else "SHORT"
-                alerts.append(f"⚠️ LIQUIDATION WARNING: Isolated {side_str} #{trade_id} only {liq_distance:.1f}% from liquidation!")
-        
-        if margin > 0 and pl < 0:
-            loss_pct = abs(pl) / margin * 100
-            if loss_pct > 20:
-                side_str = "LONG" if is_long(side) else "SHORT"
-                alerts.append(f"📉 LOSS: Isolated {side_str} #{trade_id} down {loss_pct:.1f}% ({pl:,} sats)")
-    
-    # Check cross position
-    cross_qty = cross.get("quantity", 0)
-    if cross_qty != 0:
-        side = cross.get("side", "unknown")
-        margin = cross.get("margin", 0)
-        pl = cross.get("pl", 0)
-        liq_price = cross.get("liquidation", 0)
-        
-        if liq_price and current_price:
-            if is_long(side):
-                liq_distance = ((current_price - liq_price) / current_price) * 100
-            else:
-                liq_distance = ((liq_price - current_price) / current_price) * 100
-            
-            if liq_distance < 10:
-                side_str = "LONG" if is_long(side) else "SHORT"
-                alerts.append(f"⚠️ LIQUIDATION WARNING: Cross {side_str} only {liq_distance:.1f}% from liquidation!")
+    for i, kind, value in breaches(book, current_price, thresholds["liquidation"], thresholds["loss"]):
+        if book.cross[i]:
+            label = f"Cross {book.side_str(i)}"
+        else:
+            label = f"Isolated {book.side_str(i)} #{book.ids[i][:8]}"
         
-        if margin > 0 and pl < 0:
-            loss_pct = abs(pl) / margin * 100
-            if loss_pct > 20:
-                side_str = "LONG" if is_long(side) else "SHORT"
-                alerts.append(f"📉 LOSS: Cross {side_str} down {loss_pct:.1f}% ({pl:,} sats)")
+        if kind == "liquidation":
+            alerts.append(f"⚠️ LIQUIDATION WARNING: {label} only {value:.1f}% from liquidation!")
+        else:
+            alerts.append(f"📉 LOSS: {label} down {value:.1f}% ({book.pl[i]:,.0f} sats)")
     
     return alerts
 
+def stress_rows(levels: list, origin: int, every_levels: int) -> list:
+    """(printed level, levels it covers) pairs: every `every_levels` from the origin.
+
+    Each printed row covers the levels from it up to the next printed row
+    towards the current price, so its liquidations are all named once.
+    """
+    printed = sorted({k for k in range(len(levels)) if (k - origin) % every_levels == 0}
+                     | {0, len(levels) - 1})
+    rows = []
+    for n, k in enumerate(printed):
+        if k < origin:
+            rows.append((k, range(k, printed[n + 1])))
+        elif k > origin:
+            rows.append((k, range(printed[n - 1] + 1, k + 1)))
+        else:
+            rows.append((k, range(k, k + 1)))
+    return rows
+
+
+def format_stress(book: PositionBook, levels: list, current_price: float, every: float,
+                  step: float) -> str:
+    """Cascade table: book PnL, margin lost and liquidations at a few grid levels."""
+    origin = min(range(len(levels)), key=lambda k: abs(levels[k]["price"] - current_price))
+    total_margin = sum(book.margin) or 1
+    lines = [
+        f"🧪 STRESS TEST ({len(book):,} positions, {len(levels):,} price levels)",
+        f"   Current BTC: ${current_price:,.0f}\n",
+        f"{'Move':>8} {'Price':>10} {'PnL (sats)':>15} {'Margin lost':>11} {'Liquidated':>11}",
+    ]
+    for k, covered in stress_rows(levels, origin, max(int(round(every / step)), 1)):
+        level = levels[k]
+        change = (level["price"] / current_price - 1) * 100
+        lost = level["margin_consumed"] / total_margin
+        bar = "█" * int(round(level["liquidated_margin"] / total_margin * STRESS_BAR))
+        lines.append(
+            f"{change:+7.1f}% {'$' + format(level['price'], ',.0f'):>10} {level['pl']:>+15,.0f} "
+            f"{lost:>11.1%} {level['liquidated']:>11,}  {bar}"
+        )
+        newly = [i for j in covered for i in levels[j]["newly"]]
+        if newly:
+            names = ", ".join("cross" if book.cross[i] else f"#{book.ids[i][:8]}"
+                              for i in newly[:STRESS_IDS])
+            more = f", +{len(newly) - STRESS_IDS:,} more" if len(newly) > STRESS_IDS else ""
+            lines.append(f"{'':>20}💀 {names}{more}")
+    return "\n".join(lines)
+
+
+def write_stress_json(path: str, book: PositionBook, levels: list, current_price: float) -> None:
+    """Write every grid level, naming each position by id, to a JSON file."""
+    curve = [dict(level, change=(level["price"] / current_price - 1) * 100,
+                  newly=[book.ids[i] for i in level["newly"]])
+             for level in levels]
+    with open(path, "w") as f:
+        json.dump({"price": current_price, "positions": len(book), "levels": curve}, f, indent=2)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Check LN Markets positions")
     parser.add_argument("--alerts", action="store_true", help="Show only alerts for risky positions")
+    parser.add_argument("--fresh", action="store_true", help="Bypass the shared response cache")
+    parser.add_argument("--rules", metavar="FILE", help="Rule file with alert thresholds")
+    parser.add_argument("--stress", action="store_true",
+                        help="Show book PnL and liquidations across a grid of index prices")
+    parser.add_argument("--range", type=float, default=STRESS_RANGE,
+                        help=f"Stress grid: percent either side of the current price (default {STRESS_RANGE})")
+    parser.add_argument("--step", type=float, default=STRESS_STEP,
+                        help=f"Stress grid: percent between levels (default {STRESS_STEP})")
+    parser.add_argument("--every", type=float, default=STRESS_EVERY,
+                        help=f"Stress grid: percent between printed rows (default {STRESS_EVERY})")
+    parser.add_argument("--json", metavar="FILE", help="Write every stress level to FILE")
     args = parser.parse_args()
+    for option in ("range", "step", "every"):
+        if getattr(args, option) <= 0:
+            parser.error(f"--{option} must be above 0")
+    if args.fresh:
+        set_cache(fresh=True)
+    try:
+        plan = compile_rules(load_rules(args.rules)) if args.rules else None
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load rules from {args.rules}: {e}")
+        sys.exit(1)
     
     try:
+        ticker_future = submit(get_ticker)
         positions = get_all_positions()
-        ticker = get_ticker()
+        ticker = ticker_future.result()
         current_price = ticker.get("index", 0)
         
         isolated = positions.get("isolated", [])
@@ -163,8 +202,14 @@ def main():
             print("📭 No open positions")
             return
         
-        if args.alerts:
-            alerts = check_alerts(isolated, cross, current_price)
+        if args.stress:
+            book = PositionBook.from_positions(isolated, cross)
+            levels = stress_test(book, price_grid(current_price, args.range, args.step), current_price)
+            print(format_stress(book, levels, current_price, args.every, args.step))
+            if args.json:
+                write_stress_json(args.json, book, levels, current_price)
+        elif args.alerts:
+            alerts = check_alerts(isolated, cross, current_price, plan)
             if alerts:
                 print("🚨 POSITION ALERTS\n")
                 for alert in alerts:
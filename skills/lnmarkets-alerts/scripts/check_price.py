@@ -3,11 +3,18 @@
 
 import sys
 import os
+import argparse
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from lnm_client import get_ticker
+from lnm_client import get_ticker, set_cache
 
 def main():
+    parser = argparse.ArgumentParser(description="Check BTC/USD price on LN Markets")
+    parser.add_argument("--fresh", action="store_true", help="Bypass the shared response cache")
+    args = parser.parse_args()
+    if args.fresh:
+        set_cache(fresh=True)
+    
     try:
         ticker = get_ticker()
         
@@ -1,5 +1,5 @@
 #!/bin/bash
-# Cron-friendly alert script - runs check and sends to Telegram if alerts
+# Cron-friendly alert script - runs check and sends alerts to Telegram and/or a webhook
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 SKILL_DIR="$(dirname "$SCRIPT_DIR")"
@@ -9,19 +9,11 @@ if [ -f "$SKILL_DIR/.env" ]; then
     export $(grep -v '^#' "$SKILL_DIR/.env" | xargs)
 fi
 
-# Run alert check
-OUTPUT=$(python3 "$SCRIPT_DIR/alert_check.py" 2>&1)
-EXIT_CODE=$?
-
-# If there are alerts (exit code 1), send to Telegram
-if [ $EXIT_CODE -eq 1 ] && [ -n "$OUTPUT" ]; then
-    # Telegram config (set these or pass as env vars)
-    BOT_TOKEN="${TELEGRAM_BOT_TOKEN:-8395043515:AAHTtUrHIgWy_20KtnF7DYWrKZyavkJ0Pzk}"
-    CHAT_ID="${TELEGRAM_CHAT_ID:-582668048}"
-    
-    # Send to Telegram
-    curl -s -X POST "https://api.telegram.org/bot${BOT_TOKEN}/sendMessage" \
-        -d "chat_id=${CHAT_ID}" \
-        -d "text=${OUTPUT}" \
-        -d "parse_mode=HTML" > /dev/null
+# Telegram or webhook config comes from the environment or .env; without one nobody gets the alerts
+if { [ -z "$TELEGRAM_BOT_TOKEN" ] || [ -z "$TELEGRAM_CHAT_ID" ]; } && [ -z "$ALERT_WEBHOOK_URL" ]; then
+    echo "❌ Set TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID, or ALERT_WEBHOOK_URL, to receive alerts" >&2
+    exit 2
 fi
+
+# Run alert check; alerts are delivered in-process with retries, so cron has nothing to mail
+python3 "$SCRIPT_DIR/alert_check.py" --notify --quiet
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""Incremental export of account history for accounting.
+
+Closed trades, funding fees, deposits and withdrawals are streamed page by
+page from the paginated history endpoints and appended to one CSV file (or
+a directory of Parquet parts) per dataset, so memory stays flat however long
+the history is. A state file next to the export keeps, per source, the
+newest record exported and, while a run is in progress, its page cursor:
+an interrupted run resumes where it stopped and a later run only fetches
+records added since the last one.
+
+Pages come newest first. Records are filtered on their time and id at the
+edges, so a record is written once even when pages shift under a resumed
+cursor.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lnm_client import (
+    PAGE_LIMIT, get_closed_trades, get_funding_fees, get_deposits, get_withdrawals, load_accounts,
+    record_time, set_cache,
+)
+
+EXPORT_DIR = os.path.join(os.path.dirname(__file__), "..", "history")
+STATE_FILE = ".export_state.json"  # Cursors, kept in the export directory
+PARQUET_ROW_GROUP = 10_000  # Rows buffered per Parquet row group
+
+# Dataset -> [(source, page generator factory)]
+DATASETS = {
+    "trades": [("isolated", get_closed_trades)],
+    "funding": [(margin, lambda *a, margin=margin, **k: get_funding_fees(*a, margin=margin, **k))
+                for margin in ("isolated", "cross")],
+    "deposits": [(method, lambda *a, method=method, **k: get_deposits(*a, method=method, **k))
+                 for method in ("lightning", "bitcoin")],
+    "withdrawals": [(method, lambda *a, method=method, **k: get_withdrawals(*a, method=method, **k))
+                    for method in ("lightning", "bitcoin")],
+}
+
+
+def flatten(record: dict, source: str) -> dict:
+    """One output row: nested values as JSON, plus the source it came from."""
+    row = {"source": source}
+    for key, value in record.items():
+        row[key] = json.dumps(value, separators=(",", ":")) if isinstance(value, (dict, list)) else value
+    return row
+
+
+class CsvSink:
+    """Appends rows to a CSV file, keeping the columns of an existing file.
+
+    Columns are fixed when the file is created, from the first rows
+    written; fields that only appear later are left out.
+    """
+
+    flush_rows = 1  # Persist after every page
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._writer = None
+        self.pending = 0
+
+    def write(self, rows: list) -> None:
+        if not rows:
+            return
+        if self._writer is None:
+            self._open(rows)
+        self._writer.writerows(rows)
+        self.pending += len(rows)
+
+    def _open(self, rows: list) -> None:
+        columns = None
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, newline="") as f:
+                columns = next(csv.reader(f), None)
+        self._file = open(self.path, "a", newline="")
+        self._writer = csv.DictWriter(self._file, columns or list(dict.fromkeys(
+            key for row in rows for key in row)), extrasaction="ignore")
+        if columns is None:
+            self._writer.writeheader()
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self.pending = 0
+
+    def close(self) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+
+
+class ParquetSink:
+    """Writes rows to Parquet part files in a dataset directory (needs pyarrow).
+
+    Rows are buffered, and each flush writes them to its own part file,
+    closed, synced and renamed into place before it returns, so every file
+    the export state points past is complete. The schema comes from the
+    first part of a run, and fields that only appear later are left out.
+    """
+
+    flush_rows = PARQUET_ROW_GROUP
+
+    def __init__(self, directory: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from None
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._run = int(time.time() * 1000)
+        self._parts = 0
+        self._schema = None
+        self._rows = []
+        self.pending = 0
+
+    def write(self, rows: list) -> None:
+        self._rows.extend(rows)
+        self.pending += len(rows)
+
+    def flush(self) -> None:
+        if self._rows:
+            table = self._pa.Table.from_pylist(self._rows, schema=self._schema)
+            self._schema = table.schema
+            path = os.path.join(self.directory, f"part-{self._run}-{self._parts:05d}.parquet")
+            with open(path + ".tmp", "wb") as f:
+                writer = self._pq.ParquetWriter(f, table.schema)
+                writer.write_table(table)
+                writer.close()
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            self._parts += 1
+            self._rows = []
+        self.pending = 0
+
+    def close(self) -> None:
+        self.flush()
+
+
+class ExportState:
+    """Per-source export cursors in a JSON file, saved atomically."""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.sources = json.load(f)
+        except FileNotFoundError:
+            self.sources = {}
+
+    def source(self, key: str) -> dict:
+        return self.sources.setdefault(key, {})
+
+    def save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.sources, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+class _Edge:
+    """Newest or oldest record time exported, with the ids of the records at that time."""
+
+    def __init__(self, saved: dict, newest: bool):
+        self.newest = newest
+        self.ts = saved.get("ts")
+        self.ids = set(saved.get("ids", []))
+
+    def covers(self, ts: int, record_id: str) -> bool:
+        """Whether a record is on the exported side of this edge."""
+        if self.ts is None:
+            return False
+        beyond = ts < self.ts if self.newest else ts > self.ts
+        return beyond or (ts == self.ts and record_id in self.ids)
+
+    def update(self, ts: int, record_id: str) -> None:
+        if self.ts is None or (ts > self.ts if self.newest else ts < self.ts):
+            self.ts, self.ids = ts, {record_id}
+        elif ts == self.ts:
+            self.ids.add(record_id)
+
+    def saved(self) -> dict:
+        return {"ts": self.ts, "ids": sorted(self.ids)}
+
+
+def export_source(pages, entry: dict, sink, save, source: str, start_ms: int = None) -> int:
+    """Stream one source's new records into `sink`; returns how many were written.
+
+    `pages(since_ms, cursor)` yields (items, next cursor) newest first.
+    `entry` is the source's saved state: "done", the newest record of the
+    last finished run, and while a run is in progress "run" with its cursor
+    and the newest and oldest records it wrote. `save` is called whenever
+    the sink has persisted everything the state points past. Records newer
+    than the first page of an interrupted run are left to the next run.
+    """
+    done = _Edge(entry.get("done", {}), newest=True)
+    run = entry.get("run") or {}
+    newest = _Edge(run.get("newest", {}), newest=True)
+    oldest = _Edge(run.get("oldest", {}), newest=False)
+    since = done.ts if done.ts is not None else start_ms
+    cursor = run.get("cursor")
+    written = 0
+
+    def checkpoint(next_cursor):
+        sink.flush()
+        entry["run"] = {"cursor": next_cursor, "newest": newest.saved(), "oldest": oldest.saved()}
+        save()
+
+    for items, next_cursor in pages(since, cursor):
+        rows = []
+        for item in items:
+            ts = record_time(item)
+            record_id = str(item.get("id"))
+            if ts is not None:
+                # Exported by a finished run, or by this one before a page shifted or it was resumed
+                if done.covers(ts, record_id) or oldest.covers(ts, record_id) or (since and ts < since):
+                    continue
+                newest.update(ts, record_id)
+                oldest.update(ts, record_id)
+            rows.append(flatten(item, source))
+        sink.write(rows)
+        written += len(rows)
+        if sink.pending >= sink.flush_rows:
+            checkpoint(next_cursor)
+
+    sink.flush()
+    if newest.ts is not None:
+        if newest.ts == done.ts:
+            newest.ids |= done.ids
+        entry["done"] = newest.saved()
+    entry.pop("run", None)
+    save()
+    return written
+
+
+def export_account(out_dir: str, credentials: tuple, datasets: list, fmt: str,
+                   start_ms: int = None, limit: int = PAGE_LIMIT) -> dict:
+    """Export the chosen datasets of one account into `out_dir`; returns {dataset/source: rows}."""
+    os.makedirs(out_dir, exist_ok=True)
+    state = ExportState(os.path.join(out_dir, STATE_FILE))
+    counts = {}
+    for dataset in datasets:
+        if fmt == "parquet":
+            sink = ParquetSink(os.path.join(out_dir, dataset))
+        else:
+            sink = CsvSink(os.path.join(out_dir, f"{dataset}.csv"))
+        try:
+            for source, fetch in DATASETS[dataset]:
+                key = f"{dataset}/{source}"
+
+                def pages(since_ms, cursor, fetch=fetch):
+                    return fetch(credentials, since_ms, limit, cursor=cursor)
+
+                counts[key] = export_source(pages, state.source(key), sink, state.save, source, start_ms)
+                print(f"📥 {key}: {counts[key]:,} new records", flush=True)
+        finally:
+            sink.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export LN Markets account history incrementally")
+    parser.add_argument("--out", default=EXPORT_DIR, help="Export directory (default history/)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--only", default=",".join(DATASETS),
+                        help=f"Comma-separated datasets (default {','.join(DATASETS)})")
+    parser.add_argument("--since", help="On the first export, start at this date (YYYY-MM-DD)")
+    parser.add_argument("--page-size", type=int, default=PAGE_LIMIT, help="Records requested per page")
+    parser.add_argument("--accounts", metavar="FILE",
+                        help="JSON accounts file; each account is exported to its own subdirectory")
+    args = parser.parse_args()
+    set_cache(enabled=False)
+
+    datasets = [d.strip() for d in args.only.split(",") if d.strip()]
+    unknown = [d for d in datasets if d not in DATASETS]
+    if unknown:
+        print(f"❌ Unknown dataset(s): {', '.join(unknown)}")
+        sys.exit(2)
+    start_ms = int(datetime.fromisoformat(args.since).timestamp() * 1000) if args.since else None
+
+    try:
+        accounts = load_accounts(args.accounts) if args.accounts else [(None, None)]
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load accounts: {e}")
+        sys.exit(2)
+
+    failed = False
+    for name, credentials in accounts:
+        out_dir = os.path.join(args.out, name) if name else args.out
+        try:
+            export_account(out_dir, credentials, datasets, args.format, start_ms, args.page_size)
+        except KeyboardInterrupt:
+            print("⏸️ Interrupted; the next run resumes where this one stopped")
+            sys.exit(130)
+        except Exception as e:
+            print(f"❌ Export failed{f' [{name}]' if name else ''}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,30 +2,355 @@
 """LN Markets API client with authentication (stdlib only) - v3 API."""
 
 import os
+import sys
 import time
 import hmac
 import hashlib
 import base64
 import json
+import threading
+import http.client
 import urllib.parse
-import urllib.request
-import urllib.error
+import random
+import email.utils
+import contextlib
+from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, cache writes are still atomic
+    fcntl = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+
+API_BASE = os.environ.get("LNM_API_BASE", "https://api.lnmarkets.com/v3")
+
+REQUEST_TIMEOUT = 10  # Seconds, applied to every request
+POOL_SIZE = 4  # Idle keep-alive connections kept per host
+
+_pool_lock = threading.Lock()
+_idle_connections = {}  # (scheme, host, port) -> [HTTPConnection]
+
+MAX_WORKERS = 8  # Threads available for concurrent client calls
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available.
+
+    Waiters reserve tokens in arrival order by letting the balance go negative,
+    so concurrent callers are spaced out instead of retrying in a loop.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate  # Tokens added per second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping as long as needed. Returns the time waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """Make the next acquire() wait at least `seconds` (e.g. after a 429)."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+# Documented limits: 1 request/second authenticated, 30 requests/minute public.
+# The auth bucket keeps 10% headroom so network jitter cannot push two requests
+# into the same server-side second. The public bucket allows a burst of 5 and
+# refills so that no 60s window can exceed 30 requests (5 + 25 refilled).
+AUTH_RATE = (1 / 1.1, 1)  # (tokens per second, capacity), per API key
+PUBLIC_RATE = (25 / 60, 5)  # Shared by every public request from this process
+
+_limiters = {"public": TokenBucket(*PUBLIC_RATE)}
+_limiters_lock = threading.Lock()
+
+
+def _limiter(credentials: tuple) -> TokenBucket:
+    """Rate limiter for a request: one bucket per API key, one for public calls."""
+    if credentials is None:
+        return _limiters["public"]
+    key = ("auth", credentials[0])
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = TokenBucket(*AUTH_RATE)
+    return limiter
+
+
+MAX_RETRIES = 3  # Retries for rate-limited or temporarily unavailable responses
+RETRY_STATUSES = (429, 502, 503, 504)
+BACKOFF_BASE = 0.5  # Seconds, doubled on every retry
+BACKOFF_MAX = 8
+RETRY_AFTER_MAX = 60  # Cap on a server-provided Retry-After
+
+_inflight_lock = threading.Lock()
+_inflight = {}  # (url, api key) -> Future of the raw response body
+
+# Opt-in response cache shared by every script on this machine (LNM_CACHE=1)
+CACHE_FILE = os.environ.get("LNM_CACHE_FILE", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", ".lnm_cache.json"))
+CACHE_TTL = {  # Seconds a response stays fresh, per endpoint
+    "/futures/ticker": 5,
+    "/futures/isolated/trades/running": 10,
+    "/futures/cross/position": 10,
+    "/account": 30,
+}
+_cache = {
+    "enabled": os.environ.get("LNM_CACHE", "").lower() in ("1", "true", "yes"),
+    "fresh": False,  # Skip cached reads but still store new responses
+}
+
+
+def submit(fn, *args, **kwargs):
+    """Run a client call on the shared worker pool and return its Future.
+
+    This only saves time across rate limits, e.g. a public ticker request
+    alongside authenticated ones, or calls for different API keys. Calls
+    on the same key are spaced out by its limiter anyway.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="lnm")
+    return _executor.submit(fn, *args, **kwargs)
+
+
+def _get_connection(key: tuple, timeout: float):
+    """Take an idle keep-alive connection from the pool, or open a new one.
+
+    Returns (connection, reused).
+    """
+    with _pool_lock:
+        idle = _idle_connections.get(key)
+        conn = idle.pop() if idle else None
+    if conn is not None:
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+    scheme, host, port = key
+    if scheme == "https":
+        return http.client.HTTPSConnection(host, port, timeout=timeout), False
+    return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+
+def _release_connection(key: tuple, conn) -> None:
+    """Return a connection to the pool, closing it if the pool is full."""
+    with _pool_lock:
+        idle = _idle_connections.setdefault(key, [])
+        if len(idle) < POOL_SIZE:
+            idle.append(conn)
+            return
+    conn.close()
+
+
+def close_connections() -> None:
+    """Close every idle pooled connection."""
+    with _pool_lock:
+        pools = list(_idle_connections.values())
+        _idle_connections.clear()
+    for idle in pools:
+        for conn in idle:
+            conn.close()
+
+
+def http_request(method: str, url: str, body: bytes = None, headers: dict = None,
+                 timeout: float = REQUEST_TIMEOUT, endpoint: str = None) -> tuple:
+    """Send a request over a pooled keep-alive connection.
+
+    Returns (status, headers, body bytes). A reused connection that the server
+    has already closed is retried once on a fresh connection. `endpoint`
+    labels the request in metrics (default: the URL path).
+    """
+    parts = urllib.parse.urlsplit(url)
+    endpoint = endpoint or parts.path
+    key = (parts.scheme, parts.hostname, parts.port)
+    target = parts.path or "/"
+    if parts.query:
+        target += f"?{parts.query}"
+
+    while True:
+        conn, reused = _get_connection(key, timeout)
+        try:
+            started = time.perf_counter()
+            if conn.sock is None:
+                conn.connect()
+                connected = time.perf_counter()
+                metrics.observe("lnm_request_phase_seconds", connected - started,
+                                endpoint=endpoint, phase="connect")
+                started = connected
+            conn.request(method, target, body=body, headers=headers or {})
+            response = conn.getresponse()
+            payload = response.read()
+            metrics.observe("lnm_request_phase_seconds", time.perf_counter() - started,
+                            endpoint=endpoint, phase="transfer")
+            metrics.inc("lnm_requests_total", endpoint=endpoint, status=str(response.status))
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if reused:
+                continue  # Stale keep-alive connection, reconnect
+            raise
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            _release_connection(key, conn)
+        return response.status, response.headers, payload
+
+
+class APIError(Exception):
+    """HTTP error response from the LN Markets API."""
+
+    def __init__(self, status: int, body: str):
+        super().__init__(f"HTTP {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+class RateLimitError(APIError):
+    """HTTP 429 that persisted after all retries."""
+
+
+CLOCK_OFFSET_TTL = 3600  # Re-measure the server clock offset after this many seconds
+CLOCK_DRIFT_TOLERANCE_MS = 500  # Re-measure if the local wall clock jumps by more
+CLOCK_RETRY_INTERVAL = 30  # Seconds before retrying a failed clock sync
+
+_clock_lock = threading.Lock()
+_clock_sync_lock = threading.Lock()  # Only one thread measures the offset at a time
+_clock = {
+    "offset_ms": None,  # Server time minus local time
+    "synced_at": 0.0,  # Local wall time of the last measurement
+    "wall_minus_mono": None,  # time.time() - time.monotonic() at that measurement
+    "retry_at": 0.0,  # Monotonic time before which a failed sync is not retried
+}
+
+
+def _fetch_server_time() -> int:
+    """Fetch the server timestamp in ms from /time."""
+    _limiters["public"].acquire()
+    status, _, payload = http_request("GET", f"{API_BASE}/time", timeout=5)
+    if status >= 400:
+        raise APIError(status, payload.decode(errors="replace"))
+    data = json.loads(payload.decode())
+    # Parse ISO time and convert to ms timestamp
+    from datetime import datetime
+    dt = datetime.fromisoformat(data["time"].replace("Z", "+00:00"))
+    return int(dt.timestamp() * 1000)
+
+
+def sync_clock() -> int:
+    """Measure and cache the server-minus-local clock offset in ms.
+
+    The local reference is the midpoint of the round trip. Raises on failure.
+    """
+    sent = time.time()
+    server_ms = _fetch_server_time()
+    received = time.time()
+    metrics.inc("lnm_clock_syncs_total")
+    offset_ms = int(server_ms - (sent + received) / 2 * 1000)
+    with _clock_lock:
+        _clock["offset_ms"] = offset_ms
+        _clock["synced_at"] = received
+        _clock["wall_minus_mono"] = time.time() - time.monotonic()
+        _clock["retry_at"] = 0.0
+    return offset_ms
+
+
+def _clock_is_stale() -> bool:
+    """Check whether the cached offset is missing, expired or invalidated by a clock jump."""
+    if _clock["offset_ms"] is None:
+        return True
+    if time.time() - _clock["synced_at"] > CLOCK_OFFSET_TTL:
+        return True
+    if _clock["wall_minus_mono"] is not None:
+        drift = abs(time.time() - time.monotonic() - _clock["wall_minus_mono"]) * 1000
+        if drift > CLOCK_DRIFT_TOLERANCE_MS:
+            return True
+    return False
 
-API_BASE = "https://api.lnmarkets.com/v3"
 
 def get_server_time() -> int:
-    """Get server timestamp to avoid clock sync issues."""
-    try:
-        req = urllib.request.Request(f"{API_BASE}/time", method="GET")
-        with urllib.request.urlopen(req, timeout=5) as response:
-            data = json.loads(response.read().decode())
-            # Parse ISO time and convert to ms timestamp
-            from datetime import datetime
-            dt = datetime.fromisoformat(data["time"].replace("Z", "+00:00"))
-            return int(dt.timestamp() * 1000)
-    except:
-        # Fallback to local time
-        return int(time.time() * 1000)
+    """Get the current server timestamp in ms from the cached clock offset.
+
+    The offset is measured on first use and re-measured once it expires. If
+    /time is unreachable, local time is used and the sync is retried later.
+    """
+    with _clock_lock:
+        stale = _clock_is_stale()
+        retry_blocked = time.monotonic() < _clock["retry_at"]
+    if stale and not retry_blocked:
+        with _clock_sync_lock:
+            # Another thread may have synced while we waited for the lock
+            with _clock_lock:
+                stale = _clock_is_stale() and time.monotonic() >= _clock["retry_at"]
+            if stale:
+                try:
+                    sync_clock()
+                except (OSError, http.client.HTTPException, APIError, ValueError, KeyError):
+                    with _clock_lock:
+                        _clock["retry_at"] = time.monotonic() + CLOCK_RETRY_INTERVAL
+    offset_ms = _clock["offset_ms"]
+    if offset_ms is None:
+        metrics.inc("lnm_clock_fallbacks_total")
+        offset_ms = 0
+    return int(time.time() * 1000) + offset_ms
+
+
+def invalidate_clock() -> None:
+    """Forget the cached clock offset so the next signed request re-syncs."""
+    with _clock_lock:
+        _clock["offset_ms"] = None
+        _clock["retry_at"] = 0.0
+
+
+def get_clock_state() -> dict:
+    """Export the cached clock offset for persisting across runs."""
+    with _clock_lock:
+        if _clock["offset_ms"] is None:
+            return {}
+        return {"offset_ms": _clock["offset_ms"], "synced_at": _clock["synced_at"]}
+
+
+def load_clock_state(saved: dict) -> None:
+    """Restore a clock offset saved by get_clock_state(), if still fresh."""
+    if not saved or saved.get("offset_ms") is None:
+        return
+    if time.time() - saved.get("synced_at", 0) > CLOCK_OFFSET_TTL:
+        return
+    with _clock_lock:
+        _clock["offset_ms"] = int(saved["offset_ms"])
+        _clock["synced_at"] = float(saved["synced_at"])
+        _clock["wall_minus_mono"] = time.time() - time.monotonic()
+
+
+def _is_timestamp_rejection(status: int, payload: bytes) -> bool:
+    """Check whether an error response rejected the request timestamp."""
+    return status in (400, 401, 403) and b"timestamp" in payload.lower()
+
 
 def get_credentials():
     """Get API credentials from environment variables."""
@@ -38,6 +363,33 @@ def get_credentials():
     
     return key, secret, passphrase
 
+def load_accounts(path: str) -> list:
+    """Load (name, credentials) pairs from a JSON accounts file.
+
+    The file holds a list of {"name", "key", "secret", "passphrase"} objects.
+    A value starting with "$" is read from that environment variable.
+    """
+    with open(path, "r") as f:
+        entries = json.load(f)
+    
+    accounts = []
+    for n, entry in enumerate(entries):
+        name = entry.get("name") or f"account-{n + 1}"
+        values = []
+        for field in ("key", "secret", "passphrase"):
+            value = entry.get(field, "")
+            if value.startswith("$"):
+                value = os.environ.get(value[1:], "")
+            if not value:
+                raise ValueError(f"Account {name}: missing {field}")
+            values.append(value)
+        accounts.append((name, tuple(values)))
+    
+    names = [name for name, _ in accounts]
+    if len(set(names)) != len(names):
+        raise ValueError("Account names must be unique")
+    return accounts
+
 def sign_request(secret: str, timestamp: str, method: str, path: str, data: str = "") -> str:
     """Generate HMAC signature for API request (v3 format)."""
     # v3 uses lowercase method
@@ -49,10 +401,177 @@ def sign_request(secret: str, timestamp: str, method: str, path: str, data: str
     ).digest()
     return base64.b64encode(signature).decode()
 
-def api_request(method: str, endpoint: str, params: dict = None, auth: bool = True) -> dict:
-    """Make API request to LN Markets v3."""
-    # Use server time to avoid clock sync issues
-    timestamp = str(get_server_time()) if auth else str(int(time.time() * 1000))
+def _retry_delay(headers, retries: int) -> float:
+    """Seconds to wait before retrying: Retry-After if sent, else exponential backoff."""
+    retry_after = headers.get("Retry-After") if headers is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_AFTER_MAX)
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(retry_after)
+                return min(max(when.timestamp() - time.time(), 0.0), RETRY_AFTER_MAX)
+            except (TypeError, ValueError):
+                pass
+    delay = min(BACKOFF_BASE * (2 ** retries), BACKOFF_MAX)
+    return delay + random.uniform(0, BACKOFF_BASE)
+
+
+def _coalesce(key: tuple, fn):
+    """Run fn, or wait for an identical call that is already in flight."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+    if not leader:
+        return future.result()
+    try:
+        result = fn()
+    except BaseException as e:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        future.set_exception(e)
+        raise
+    with _inflight_lock:
+        _inflight.pop(key, None)
+    future.set_result(result)
+    return result
+
+
+def _send(method: str, url: str, path: str, data: str, body: bytes, credentials: tuple) -> bytes:
+    """Sign and send a request, re-syncing the clock and backing off on 429.
+
+    Returns the raw response body.
+    """
+    auth = credentials is not None
+    limiter = _limiter(credentials)
+    resynced = False
+    retries = 0
+    
+    while True:
+        # Wait for the rate limit before signing so the timestamp is fresh
+        waited = limiter.acquire()
+        metrics.observe("lnm_request_phase_seconds", waited, endpoint=path, phase="ratelimit")
+        headers = {}
+        
+        if auth:
+            signing = time.perf_counter()
+            key, secret, passphrase = credentials
+            # Sign with the server clock (cached offset) to avoid clock sync issues
+            timestamp = str(get_server_time())
+            signature = sign_request(secret, timestamp, method, path, data)
+            
+            # v3 uses lowercase headers
+            headers = {
+                "lnm-access-key": key,
+                "lnm-access-signature": signature,
+                "lnm-access-passphrase": passphrase,
+                "lnm-access-timestamp": timestamp,
+            }
+            metrics.observe("lnm_request_phase_seconds", time.perf_counter() - signing,
+                            endpoint=path, phase="sign")
+        
+        if method in ["POST", "PUT"] and body:
+            headers["Content-Type"] = "application/json"
+        
+        status, response_headers, payload = http_request(method, url, body=body, headers=headers)
+        
+        if auth and not resynced and _is_timestamp_rejection(status, payload):
+            # Our cached offset is off, re-sync and sign again
+            resynced = True
+            invalidate_clock()
+            metrics.inc("lnm_retries_total", endpoint=path, reason="timestamp")
+            continue
+        if status in RETRY_STATUSES and retries < MAX_RETRIES:
+            metrics.inc("lnm_retries_total", endpoint=path, reason=str(status))
+            # Hold back every caller sharing this limit, not just this one
+            limiter.pause(_retry_delay(response_headers, retries))
+            retries += 1
+            continue
+        if status == 429:
+            raise RateLimitError(status, payload.decode(errors="replace"))
+        if status >= 400:
+            raise APIError(status, payload.decode(errors="replace"))
+        return payload
+
+
+def set_cache(enabled: bool = None, fresh: bool = None) -> None:
+    """Turn the shared response cache on or off; `fresh` bypasses cached reads.
+
+    Settings left as None are unchanged.
+    """
+    if enabled is not None:
+        _cache["enabled"] = enabled
+    if fresh is not None:
+        _cache["fresh"] = fresh
+
+
+@contextlib.contextmanager
+def _cache_lock(exclusive: bool):
+    """Hold an advisory lock on the cache across processes."""
+    with open(CACHE_FILE + ".lock", "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def _read_cache_file() -> dict:
+    try:
+        with open(CACHE_FILE, "r") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return entries if isinstance(entries, dict) else {}
+
+
+def _cache_key(url: str, credentials: tuple) -> str:
+    # Cached per account, without keeping the API key itself on disk
+    owner = hashlib.sha256(credentials[0].encode()).hexdigest()[:16] if credentials else "public"
+    return f"{owner} {url}"
+
+
+def _cache_get(key: str, ttl: float) -> bytes:
+    """Cached response body if younger than `ttl` seconds, else None."""
+    try:
+        with _cache_lock(exclusive=False):
+            entry = _read_cache_file().get(key)
+    except OSError:
+        return None
+    if not entry or not 0 <= time.time() - entry.get("at", 0) <= ttl:
+        return None
+    return entry["body"].encode()
+
+
+def _cache_put(key: str, payload: bytes) -> None:
+    """Store a response body, dropping expired entries. Never raises."""
+    now = time.time()
+    max_ttl = max(CACHE_TTL.values())
+    try:
+        with _cache_lock(exclusive=True):
+            entries = {k: v for k, v in _read_cache_file().items()
+                       if now - v.get("at", 0) <= max_ttl}
+            entries[key] = {"at": now, "body": payload.decode()}
+            # Write a private temp file and swap it in, so readers never see half a file
+            tmp = f"{CACHE_FILE}.{os.getpid()}.tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp, CACHE_FILE)
+    except (OSError, ValueError):
+        pass
+
+
+def api_request(method: str, endpoint: str, params: dict = None, auth: bool = True,
+                credentials: tuple = None) -> dict:
+    """Make API request to LN Markets v3.
+
+    Authenticated requests use `credentials` (key, secret, passphrase), or
+    the environment if not given. Identical GET requests already in flight
+    are merged into one. With the response cache enabled, GETs to endpoints
+    in CACHE_TTL are answered from it while fresh.
+    """
     path = f"/v3{endpoint}"
     
     # Build data string for signature
@@ -70,56 +589,145 @@ def api_request(method: str, endpoint: str, params: dict = None, auth: bool = Tr
         url = f"{API_BASE}{endpoint}"
         body = data.encode() if data else None
     
-    headers = {}
-    
-    if auth:
-        key, secret, passphrase = get_credentials()
-        signature = sign_request(secret, timestamp, method, path, data)
-        
-        # v3 uses lowercase headers
-        headers = {
-            "lnm-access-key": key,
-            "lnm-access-signature": signature,
-            "lnm-access-passphrase": passphrase,
-            "lnm-access-timestamp": timestamp,
-        }
+    if not auth:
+        credentials = None
+    elif credentials is None:
+        credentials = get_credentials()
     
-    if method in ["POST", "PUT"] and body:
-        headers["Content-Type"] = "application/json"
+    ttl = CACHE_TTL.get(endpoint) if method == "GET" and _cache["enabled"] else None
+    if ttl and not _cache["fresh"]:
+        payload = _cache_get(_cache_key(url, credentials), ttl)
+        if payload is not None:
+            metrics.inc("lnm_cache_hits_total", endpoint=path)
+            return json.loads(payload.decode())
     
-    req = urllib.request.Request(url, data=body, headers=headers, method=method)
+    def fetch():
+        payload = _send(method, url, path, data, body, credentials)
+        if ttl:
+            _cache_put(_cache_key(url, credentials), payload)
+        return payload
     
+    started = time.perf_counter()
     try:
-        with urllib.request.urlopen(req) as response:
-            return json.loads(response.read().decode())
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode() if e.fp else str(e)
-        raise Exception(f"HTTP {e.code}: {error_body}")
+        if method == "GET":
+            key = (url, credentials[0] if credentials else None)
+            payload = _coalesce(key, fetch)
+        else:
+            payload = _send(method, url, path, data, body, credentials)
+    except APIError as e:
+        metrics.inc("lnm_request_errors_total", endpoint=path, error=str(e.status))
+        raise
+    except (OSError, http.client.HTTPException) as e:
+        metrics.inc("lnm_request_errors_total", endpoint=path, error=type(e).__name__)
+        raise
+    finally:
+        metrics.observe("lnm_request_duration_seconds", time.perf_counter() - started,
+                        endpoint=path)
+    
+    # Each caller decodes its own copy, so coalesced results are never shared
+    decoding = time.perf_counter()
+    result = json.loads(payload.decode())
+    metrics.observe("lnm_request_phase_seconds", time.perf_counter() - decoding,
+                    endpoint=path, phase="decode")
+    return result
 
 def get_ticker() -> dict:
     """Get current BTC/USD ticker (no auth required)."""
     return api_request("GET", "/futures/ticker", auth=False)
 
-def get_account() -> dict:
+def get_account(credentials: tuple = None) -> dict:
     """Get account information including balance."""
-    return api_request("GET", "/account")
+    return api_request("GET", "/account", credentials=credentials)
 
-def get_running_trades() -> list:
+def get_running_trades(credentials: tuple = None) -> list:
     """Get running isolated margin trades."""
-    result = api_request("GET", "/futures/isolated/trades/running")
+    result = api_request("GET", "/futures/isolated/trades/running", credentials=credentials)
     return result if isinstance(result, list) else []
 
-def get_open_trades() -> list:
+def get_open_trades(credentials: tuple = None) -> list:
     """Get open (pending) isolated margin trades."""
-    result = api_request("GET", "/futures/isolated/trades/open")
+    result = api_request("GET", "/futures/isolated/trades/open", credentials=credentials)
     return result if isinstance(result, list) else []
 
-def get_cross_position() -> dict:
+def get_cross_position(credentials: tuple = None) -> dict:
     """Get cross margin position."""
-    return api_request("GET", "/futures/cross/position")
+    return api_request("GET", "/futures/cross/position", credentials=credentials)
+
+PAGE_LIMIT = 100  # Items requested per page from paginated endpoints
+
+
+def iter_pages(endpoint: str, params: dict = None, credentials: tuple = None,
+               cursor: str = None, limit: int = PAGE_LIMIT):
+    """Yield (items, next cursor) for each page of a paginated GET endpoint.
+
+    Pages come as {"data": [...], "nextCursor": ...}; a plain list is a
+    single page. Passing a yielded cursor back in resumes after that page.
+    """
+    while True:
+        query = dict(params or {}, limit=limit)
+        if cursor:
+            query["cursor"] = cursor
+        result = api_request("GET", endpoint, query, credentials=credentials)
+        if isinstance(result, dict):
+            items, cursor = result.get("data") or [], result.get("nextCursor")
+        else:
+            items, cursor = result if isinstance(result, list) else [], None
+        yield items, cursor
+        if not cursor or not items:
+            return
+
+
+TIME_FIELDS = ("closedAt", "time", "createdAt", "timestamp", "ts")  # First parseable one is the record time
+
+
+def record_time(record: dict):
+    """Record time in ms from the first parseable time field (ms number or ISO string), or None."""
+    for field in TIME_FIELDS:
+        value = record.get(field)
+        if value is None:
+            continue
+        try:
+            if isinstance(value, str):
+                return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1000)
+            return int(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _history(endpoint: str, credentials: tuple, since_ms: int, limit: int, cursor: str):
+    params = {"from": since_ms} if since_ms else None
+    return iter_pages(endpoint, params, credentials, cursor, limit)
+
+
+def get_closed_trades(credentials: tuple = None, since_ms: int = None, limit: int = PAGE_LIMIT,
+                      cursor: str = None):
+    """Yield pages of closed isolated trades, optionally only those closed since `since_ms`."""
+    return _history("/futures/isolated/trades/closed", credentials, since_ms, limit, cursor)
+
+
+def get_funding_fees(credentials: tuple = None, since_ms: int = None, limit: int = PAGE_LIMIT,
+                     cursor: str = None, margin: str = "isolated"):
+    """Yield pages of funding fees of "isolated" or "cross" margin positions."""
+    return _history(f"/futures/{margin}/funding-fees", credentials, since_ms, limit, cursor)
+
+
+def get_deposits(credentials: tuple = None, since_ms: int = None, limit: int = PAGE_LIMIT,
+                 cursor: str = None, method: str = "lightning"):
+    """Yield pages of "lightning" or "bitcoin" deposits."""
+    return _history(f"/account/deposits/{method}", credentials, since_ms, limit, cursor)
+
+
+def get_withdrawals(credentials: tuple = None, since_ms: int = None, limit: int = PAGE_LIMIT,
+                    cursor: str = None, method: str = "lightning"):
+    """Yield pages of "lightning" or "bitcoin" withdrawals."""
+    return _history(f"/account/withdrawals/{method}", credentials, since_ms, limit, cursor)
+
+
+def get_all_positions(credentials: tuple = None) -> dict:
+    """Get all positions (running isolated trades + cross position).
 
-def get_all_positions() -> dict:
-    """Get all positions (running isolated trades + cross position)."""
-    running = get_running_trades()
-    cross = get_cross_position()
-    return {"isolated": running, "cross": cross}
+    The two requests are made one after the other: they share the key's
+    rate limit, so running them concurrently would not finish any sooner.
+    """
+    return {"isolated": get_running_trades(credentials), "cross": get_cross_position(credentials)}
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""LN Markets WebSocket price feed (stdlib only).
+
+Minimal RFC 6455 client on asyncio streams plus a PriceStream that keeps a
+JSON-RPC subscription to the index / last-price channels alive with
+heartbeats, automatic reconnects and resubscription.
+"""
+
+import os
+import ssl
+import sys
+import json
+import time
+import base64
+import struct
+import asyncio
+import hashlib
+import random
+import urllib.parse
+
+WS_URL = os.environ.get("LNM_WS_URL", "wss://api.lnmarkets.com")
+
+CHANNELS = ["futures:btc_usd:index", "futures:btc_usd:last-price"]
+SUBSCRIBE_METHOD = "v1/public/subscribe"
+
+HEARTBEAT_INTERVAL = 10  # Seconds between pings
+HEARTBEAT_TIMEOUT = 25  # Reconnect if nothing was received for this long
+CONNECT_TIMEOUT = 10
+RECONNECT_BASE = 0.5  # Seconds, doubled after every failed attempt
+RECONNECT_MAX = 30
+
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class ConnectionClosed(Exception):
+    """The WebSocket connection was closed."""
+
+
+def accept_key(key: str) -> str:
+    """Compute Sec-WebSocket-Accept for a Sec-WebSocket-Key."""
+    digest = hashlib.sha1((key + _GUID).encode()).digest()
+    return base64.b64encode(digest).decode()
+
+
+def _apply_mask(data: bytes, mask: bytes) -> bytes:
+    """XOR data with a 4-byte mask (same operation masks and unmasks)."""
+    if not data:
+        return data
+    n = len(data)
+    key = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(n, "big")
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool) -> bytes:
+    """Build a single final frame. Clients must mask, servers must not."""
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    n = len(payload)
+    if n < 126:
+        header += bytes([mask_bit | n])
+    elif n < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack("!H", n)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack("!Q", n)
+    if mask:
+        key = os.urandom(4)
+        return header + key + _apply_mask(payload, key)
+    return header + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple:
+    """Read one frame. Returns (fin, opcode, payload)."""
+    first, second = await reader.readexactly(2)
+    fin = bool(first & 0x80)
+    opcode = first & 0x0F
+    n = second & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(n) if n else b""
+    if mask:
+        payload = _apply_mask(payload, mask)
+    return fin, opcode, payload
+
+
+class WebSocket:
+    """One WebSocket connection (client or server side)."""
+
+    def __init__(self, reader, writer, client: bool = True):
+        self.reader = reader
+        self.writer = writer
+        self.client = client
+        self.last_received = time.monotonic()
+        self.closed = False
+
+    @classmethod
+    async def connect(cls, url: str, timeout: float = CONNECT_TIMEOUT) -> "WebSocket":
+        """Open a client connection and perform the opening handshake."""
+        parts = urllib.parse.urlsplit(url)
+        secure = parts.scheme == "wss"
+        port = parts.port or (443 if secure else 80)
+        context = ssl.create_default_context() if secure else None
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=context), timeout)
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        request = (
+            f"GET {target} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        writer.write(request.encode())
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        lines = head.decode("latin-1").split("\r\n")
+        if " 101 " not in lines[0] + " ":
+            writer.close()
+            raise ConnectionError(f"WebSocket handshake failed: {lines[0]}")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        if headers.get("sec-websocket-accept") != accept_key(key):
+            writer.close()
+            raise ConnectionError("WebSocket handshake failed: bad Sec-WebSocket-Accept")
+        return cls(reader, writer, client=True)
+
+    async def _send(self, opcode: int, payload: bytes) -> None:
+        if self.closed:
+            raise ConnectionClosed("Connection is closed")
+        self.writer.write(encode_frame(opcode, payload, mask=self.client))
+        await self.writer.drain()
+
+    async def send_text(self, text: str) -> None:
+        await self._send(OP_TEXT, text.encode())
+
+    async def ping(self, payload: bytes = b"") -> None:
+        await self._send(OP_PING, payload)
+
+    async def recv(self) -> str:
+        """Return the next text message, answering pings along the way."""
+        fragments = []
+        while True:
+            try:
+                fin, opcode, payload = await read_frame(self.reader)
+            except (asyncio.IncompleteReadError, ConnectionError) as e:
+                self.closed = True
+                raise ConnectionClosed("Connection lost") from e
+            self.last_received = time.monotonic()
+
+            if opcode == OP_PING:
+                await self._send(OP_PONG, payload)
+            elif opcode == OP_PONG:
+                pass
+            elif opcode == OP_CLOSE:
+                if not self.closed:
+                    self.writer.write(encode_frame(OP_CLOSE, payload[:2], mask=self.client))
+                    self.closed = True
+                code = struct.unpack("!H", payload[:2])[0] if len(payload) >= 2 else 1005
+                raise ConnectionClosed(f"Closed by peer ({code})")
+            else:
+                fragments.append(payload)
+                if fin:
+                    return b"".join(fragments).decode()
+
+    async def close(self, code: int = 1000) -> None:
+        if not self.closed:
+            try:
+                await self._send(OP_CLOSE, struct.pack("!H", code))
+            except (ConnectionError, ConnectionClosed):
+                pass
+            self.closed = True
+        self.abort()
+
+    def abort(self) -> None:
+        """Drop the connection without a closing handshake."""
+        self.closed = True
+        self.writer.close()
+
+
+def parse_tick(message: dict) -> dict:
+    """Turn a subscription notification into a ticker-shaped dict, or None.
+
+    Index updates carry "index", last-price updates carry "lastPrice"; both
+    carry "time" in ms.
+    """
+    if message.get("method") != "subscription":
+        return None
+    params = message.get("params") or {}
+    channel = params.get("channel", "")
+    data = params.get("data") or {}
+    stamp = data.get("time") or int(time.time() * 1000)
+    if channel.endswith(":index") and "index" in data:
+        return {"channel": channel, "index": float(data["index"]), "time": stamp}
+    if channel.endswith(":last-price") and "lastPrice" in data:
+        return {"channel": channel, "lastPrice": float(data["lastPrice"]), "time": stamp}
+    return None
+
+
+class PriceStream:
+    """Streams price ticks to on_tick(tick), reconnecting until stopped."""
+
+    def __init__(self, on_tick, url: str = WS_URL, channels: list = None,
+                 heartbeat: float = HEARTBEAT_INTERVAL, timeout: float = HEARTBEAT_TIMEOUT):
+        self.on_tick = on_tick
+        self.url = url
+        self.channels = channels or CHANNELS
+        self.heartbeat = heartbeat
+        self.timeout = timeout
+        self.connects = 0  # Successful connections, including reconnects
+        self._ws = None
+        self._request_id = 0
+
+    async def _subscribe(self, ws: WebSocket) -> None:
+        self._request_id += 1
+        await ws.send_text(json.dumps({
+            "jsonrpc": "2.0",
+            "id": str(self._request_id),
+            "method": SUBSCRIBE_METHOD,
+            "params": self.channels,
+        }))
+
+    async def _keepalive(self, ws: WebSocket) -> None:
+        """Ping periodically and drop the connection if the peer goes silent."""
+        while not ws.closed:
+            await asyncio.sleep(self.heartbeat)
+            if time.monotonic() - ws.last_received > self.timeout:
+                ws.abort()
+                return
+            try:
+                await ws.ping()
+            except (ConnectionError, ConnectionClosed):
+                return
+
+    async def _consume(self, ws: WebSocket) -> None:
+        while True:
+            text = await ws.recv()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                continue
+            if not isinstance(message, dict):
+                continue
+            if "error" in message:
+                raise ConnectionError(f"Subscription failed: {message['error']}")
+            self._dispatch(message)
+
+    def _dispatch(self, message: dict) -> None:
+        """Pass a message's tick to on_tick; a bad tick or a failing callback only loses that tick."""
+        try:
+            tick = parse_tick(message)
+            if tick is not None:
+                self.on_tick(tick)
+        except Exception as e:
+            print(f"⚠️ Dropped price tick: {e!r}", file=sys.stderr, flush=True)
+
+    async def run(self, stop: asyncio.Event = None) -> None:
+        """Connect, subscribe and dispatch ticks until `stop` is set."""
+        stop = stop or asyncio.Event()
+        failures = 0
+        while not stop.is_set():
+            keepalive = None
+            try:
+                self._ws = await WebSocket.connect(self.url)
+                self.connects += 1
+                failures = 0
+                await self._subscribe(self._ws)
+                keepalive = asyncio.ensure_future(self._keepalive(self._ws))
+                consume = asyncio.ensure_future(self._consume(self._ws))
+                stopped = asyncio.ensure_future(stop.wait())
+                await asyncio.wait([consume, stopped], return_when=asyncio.FIRST_COMPLETED)
+                stopped.cancel()
+                if consume.done():
+                    consume.result()  # Re-raise why the feed ended
+                else:
+                    consume.cancel()
+            except (OSError, ConnectionClosed, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                failures += 1
+            finally:
+                if keepalive is not None:
+                    keepalive.cancel()
+                if self._ws is not None:
+                    await self._ws.close()
+                    self._ws = None
+            if stop.is_set():
+                break
+            delay = min(RECONNECT_BASE * (2 ** max(failures - 1, 0)), RECONNECT_MAX)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=delay * random.uniform(0.5, 1.0))
+            except asyncio.TimeoutError:
+                pass
+
+
+def main():
+    """Print live ticks until interrupted."""
+    def on_tick(tick):
+        price = tick.get("index", tick.get("lastPrice"))
+        label = "Index" if "index" in tick else "Last "
+        print(f"📈 {label} ${price:,.1f}", flush=True)
+
+    stream = PriceStream(on_tick)
+    try:
+        asyncio.run(stream.run())
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""In-process metrics with Prometheus text and JSON export.
+
+Counters, gauges and latency histograms are keyed by name and labels. Collection is
+off until enable() is called; until then inc() and observe() return on the
+first line, so instrumented code pays a function call and nothing else.
+"""
+
+import json
+import threading
+from bisect import bisect_left
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# name -> (type, help)
+DESCRIPTIONS = {
+    "lnm_requests_total": ("counter", "HTTP responses from the API by path and status"),
+    "lnm_request_errors_total": ("counter", "API calls that failed, by endpoint and error"),
+    "lnm_retries_total": ("counter", "Requests retried, by endpoint and reason"),
+    "lnm_request_duration_seconds": ("histogram", "API call latency including rate-limit waits and retries"),
+    "lnm_request_phase_seconds": ("histogram", "API call latency by phase (ratelimit, sign, connect, transfer, decode)"),
+    "lnm_cache_hits_total": ("counter", "API calls answered from the shared response cache"),
+    "lnm_clock_syncs_total": ("counter", "Server clock offset measurements"),
+    "lnm_clock_fallbacks_total": ("counter", "Signatures made with local time because no clock offset was available"),
+    "lnm_alerts_total": ("counter", "Alerts raised, by kind"),
+    "lnm_cycle_duration_seconds": ("histogram", "Alert evaluation time per poll cycle or stream tick"),
+    "lnm_poll_interval_seconds": ("gauge", "Seconds between position polls chosen by the scheduler, by account"),
+    "lnm_poll_headroom_percent": ("gauge", "Price move left before the riskiest position's liquidation alert, by account"),
+    "lnm_price_volatility": ("gauge", "Realized price volatility the scheduler used, percent per square-root second"),
+}
+
+_enabled = False
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_gauges = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [count per bucket..., +Inf count, sum, count]
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """Add to a counter."""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """Set a gauge to its current value."""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _gauges[key] = value
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """Record a duration in a histogram."""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(BUCKETS) + 3)
+        histogram[bisect_left(BUCKETS, seconds)] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+
+
+def _sort_key(item):
+    (name, labels), _ = item
+    return name, [(k, str(v)) for k, v in labels]
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items(), key=_sort_key)
+        gauges = sorted(_gauges.items(), key=_sort_key)
+        histograms = sorted(((key, list(value)) for key, value in _histograms.items()),
+                            key=_sort_key)
+    lines = []
+    described = set()
+
+    def describe(name, kind):
+        if name not in described:
+            described.add(name)
+            help_text = DESCRIPTIONS.get(name, (kind, name))[1]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in counters:
+        describe(name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for (name, labels), value in gauges:
+        describe(name, "gauge")
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for (name, labels), histogram in histograms:
+        describe(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), histogram):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram[-2]:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> dict:
+    """All metrics as a JSON-serialisable dict."""
+    with _lock:
+        counters = sorted(_counters.items(), key=_sort_key)
+        gauges = sorted(_gauges.items(), key=_sort_key)
+        histograms = sorted(((key, list(value)) for key, value in _histograms.items()),
+                            key=_sort_key)
+    result = {"counters": {}, "gauges": {}, "histograms": {}}
+    for (name, labels), value in counters:
+        result["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+    for (name, labels), value in gauges:
+        result["gauges"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+    for (name, labels), histogram in histograms:
+        result["histograms"].setdefault(name, []).append({
+            "labels": dict(labels),
+            "count": histogram[-1],
+            "sum": histogram[-2],
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], histogram)),
+        })
+    return result
+
+
+def write_json(path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Enable collection and serve /metrics from a background thread."""
+    enable()
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
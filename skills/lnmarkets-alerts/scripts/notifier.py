@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Alert notifications: batching async dispatcher and delivery sinks.
+
+Alerts are queued with notify() and sent by a background task. Alerts raised
+within BATCH_WINDOW seconds of each other go out as one message. Every sink
+gets its own copy, and a failed delivery is retried with backoff on 429 and
+5xx. Telegram sends are held to the per-chat rate limits.
+"""
+
+import os
+import sys
+import json
+import random
+import asyncio
+import argparse
+import http.client
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lnm_client import TokenBucket, http_request, close_connections
+
+TELEGRAM_API = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org")
+TELEGRAM_MESSAGE_LIMIT = 4096  # Characters per message
+
+# Telegram limits: about 1 message/second to a chat, 20 messages/minute to a group
+TELEGRAM_CHAT_RATE = (1, 1)  # (messages per second, burst)
+TELEGRAM_GROUP_RATE = (20 / 60, 3)
+
+BATCH_WINDOW = 2.0  # Seconds to wait for more alerts before sending
+BATCH_MAX = 20  # Alerts per batch
+SEND_RETRIES = 4  # Retries after the first attempt
+SEND_BACKOFF_BASE = 1.0  # Seconds, doubled on every retry
+SEND_BACKOFF_MAX = 30
+RETRY_AFTER_MAX = 60  # Cap on a server-provided retry delay
+
+_chat_limiters = {}
+
+
+def _chat_limiter(token: str, chat_id: str) -> TokenBucket:
+    """Token bucket shared by every sink sending to this chat."""
+    key = (token, str(chat_id))
+    if key not in _chat_limiters:
+        rate, burst = TELEGRAM_GROUP_RATE if str(chat_id).startswith("-") else TELEGRAM_CHAT_RATE
+        _chat_limiters[key] = TokenBucket(rate, burst)
+    return _chat_limiters[key]
+
+
+def _retry_after(headers, payload: bytes) -> float:
+    """Server-provided retry delay in seconds (Telegram body or Retry-After), or None."""
+    try:
+        return float(json.loads(payload.decode())["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        pass
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _split(text: str, limit: int) -> list:
+    """Split text into chunks of at most `limit` characters, at blank lines where possible."""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    return chunks + [text] if text else chunks
+
+
+class DeliveryError(Exception):
+    """A sink answered with an error status."""
+
+    def __init__(self, sink: str, status: int, body: str, retry_after: float = None):
+        super().__init__(f"{sink}: HTTP {status}: {body}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class StdoutSink:
+    """Print messages to stdout."""
+
+    name = "stdout"
+    limit = None
+
+    def send(self, text: str) -> None:
+        print(text, flush=True)
+
+
+class WebhookSink:
+    """POST {"text": message} as JSON to a URL."""
+
+    name = "webhook"
+    limit = None
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def send(self, text: str) -> None:
+        body = json.dumps({"text": text}).encode()
+        status, headers, payload = http_request(
+            "POST", self.url, body=body, headers={"Content-Type": "application/json"},
+            endpoint=self.name)
+        if status >= 300:
+            raise DeliveryError(self.name, status, payload.decode(errors="replace")[:200],
+                                _retry_after(headers, payload))
+
+
+class TelegramSink:
+    """Send messages to a Telegram chat through the Bot API."""
+
+    name = "telegram"
+    limit = TELEGRAM_MESSAGE_LIMIT
+
+    def __init__(self, token: str, chat_id: str, api_base: str = None):
+        self.url = f"{api_base or TELEGRAM_API}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.limiter = _chat_limiter(token, chat_id)
+
+    def send(self, text: str) -> None:
+        self.limiter.acquire()
+        body = json.dumps({"chat_id": self.chat_id, "text": text}).encode()
+        status, headers, payload = http_request(
+            "POST", self.url, body=body, headers={"Content-Type": "application/json"},
+            endpoint=self.name)
+        if status >= 300:
+            retry_after = _retry_after(headers, payload)
+            if retry_after:
+                self.limiter.pause(min(retry_after, RETRY_AFTER_MAX))
+            raise DeliveryError(self.name, status, payload.decode(errors="replace")[:200],
+                                retry_after)
+
+
+def sinks_from_env(stdout: bool = True) -> list:
+    """Sinks configured by TELEGRAM_BOT_TOKEN/TELEGRAM_CHAT_ID and ALERT_WEBHOOK_URL."""
+    sinks = [StdoutSink()] if stdout else []
+    token = os.environ.get("TELEGRAM_BOT_TOKEN")
+    chat_id = os.environ.get("TELEGRAM_CHAT_ID")
+    if token and chat_id:
+        sinks.append(TelegramSink(token, chat_id))
+    webhook = os.environ.get("ALERT_WEBHOOK_URL")
+    if webhook:
+        sinks.append(WebhookSink(webhook))
+    return sinks
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, DeliveryError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (OSError, http.client.HTTPException))
+
+
+class Notifier:
+    """Batches queued alerts and delivers them to every sink.
+
+    start() the dispatcher inside a running event loop, notify() from the
+    loop thread, and close() to flush what is queued and stop.
+    """
+
+    def __init__(self, sinks: list, batch_window: float = BATCH_WINDOW,
+                 batch_max: int = BATCH_MAX):
+        self.sinks = sinks
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.sent = 0  # Messages delivered, counted per sink
+        self.failed = 0  # Messages dropped after all retries, counted per sink
+        self._queue = None
+        self._task = None
+
+    def start(self) -> "Notifier":
+        self._queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def notify(self, alerts: list, header: str = "") -> None:
+        """Queue alerts; `header` is put above the batch (the latest one wins)."""
+        for alert in alerts:
+            self._queue.put_nowait((header, alert))
+
+    async def close(self) -> None:
+        """Deliver everything queued, then stop the dispatcher."""
+        self._queue.put_nowait(None)
+        await self._task
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_max:
+                # Take whatever is already queued, then wait out the window
+                try:
+                    if self._queue.empty():
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch: list) -> None:
+        header = batch[-1][0]
+        text = "\n\n".join(([header] if header else []) + [alert for _, alert in batch])
+        await asyncio.gather(*(self._deliver(sink, text) for sink in self.sinks))
+
+    async def _deliver(self, sink, text: str) -> None:
+        loop = asyncio.get_running_loop()
+        for chunk in (_split(text, sink.limit) if sink.limit else [text]):
+            for attempt in range(SEND_RETRIES + 1):
+                try:
+                    # Sinks block on I/O and rate limits, so they run in worker threads
+                    await loop.run_in_executor(None, sink.send, chunk)
+                    self.sent += 1
+                    break
+                except Exception as e:
+                    if attempt == SEND_RETRIES or not _retryable(e):
+                        self.failed += 1
+                        print(f"⚠️ Notification via {sink.name} failed: {e}",
+                              file=sys.stderr, flush=True)
+                        return
+                    delay = getattr(e, "retry_after", None)
+                    if delay is None:
+                        delay = min(SEND_BACKOFF_BASE * (2 ** attempt), SEND_BACKOFF_MAX)
+                        delay += random.uniform(0, SEND_BACKOFF_BASE)
+                    await asyncio.sleep(min(delay, RETRY_AFTER_MAX))
+
+
+async def _send_once(sinks: list, alerts: list, header: str) -> int:
+    notifier = Notifier(sinks, batch_window=0, batch_max=len(alerts) or 1).start()
+    notifier.notify(alerts, header)
+    await notifier.close()
+    return notifier.failed
+
+
+def send_alerts(sinks: list, alerts: list, header: str = "") -> bool:
+    """Deliver one batch of alerts from synchronous code. Returns True if every sink got it."""
+    failed = asyncio.run(_send_once(sinks, alerts, header))
+    close_connections()
+    return not failed
+
+
+def main():
+    """Send a message from stdin or the command line to the configured sinks."""
+    parser = argparse.ArgumentParser(description="Send a notification to the configured sinks")
+    parser.add_argument("text", nargs="?", help="Message (default: read stdin)")
+    parser.add_argument("--no-stdout", action="store_true", help="Do not echo to stdout")
+    args = parser.parse_args()
+
+    text = args.text if args.text is not None else sys.stdin.read().strip()
+    if not text:
+        return
+    sinks = sinks_from_env(stdout=not args.no_stdout)
+    sys.exit(0 if send_alerts(sinks, [text]) else 1)
+
+
+if __name__ == "__main__":
+    main()
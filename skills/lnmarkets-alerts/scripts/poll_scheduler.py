@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Risk-adaptive position polling.
+
+Each position gets a poll interval from its headroom, the percent the price
+can still move before its liquidation alert fires, and from recent realized
+volatility. The interval is the time the price would need to cover that
+headroom at Z_SCORE standard deviations, so a position inside its threshold
+is polled every few seconds and a distant one rarely. Positions are fetched
+per account, so an account is polled when its riskiest position is due, and
+never more often than its share of the authenticated request budget allows.
+"""
+
+import os
+import sys
+import time
+from heapq import nsmallest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lnm_client import AUTH_RATE
+import metrics
+
+MIN_POLL_INTERVAL = 5  # Seconds between polls for a position at or inside its threshold
+Z_SCORE = 4  # Standard deviations of recent volatility a position must be able to take until its next poll
+VOLATILITY_WINDOW = 900  # Seconds of price history volatility is measured over
+VOLATILITY_FLOOR = 0.01  # % per √second assumed at the least (about 3% a day), for calm or short history
+POLL_BUDGET_SHARE = 0.5  # Share of an API key's authenticated rate polling may use
+POLL_SLACK = 0.5  # Seconds early a poll may run, so a polling cycle doesn't just miss it
+DEBUG_POSITIONS = 5  # Riskiest positions listed in each decision
+LOG_CHANGE = 0.2  # Decisions are logged when the interval moves by more than 20%
+
+POSITIONS_COST = 2  # Authenticated requests per position poll: isolated trades and cross position
+ACCOUNT_COST = 1  # Extra request when the account's rules also need its balance
+
+
+def poll_cost(needs: set) -> int:
+    """Authenticated requests one poll of an account makes."""
+    return (POSITIONS_COST if "positions" in needs else 0) + (ACCOUNT_COST if "account" in needs else 0)
+
+
+def budget_interval(cost: int) -> float:
+    """Shortest interval at which polls of `cost` requests stay within the budget share."""
+    return cost / (AUTH_RATE[0] * POLL_BUDGET_SHARE)
+
+
+def poll_interval(headroom: float, volatility: float, min_interval: float,
+                  max_interval: float) -> float:
+    """Seconds until a position `headroom`% from its alert should be polled again.
+
+    `volatility` is in percent per √second; positions without a headroom
+    (no liquidation price) get `max_interval`.
+    """
+    if headroom is None:
+        return max_interval
+    if headroom <= 0:
+        return min_interval
+    interval = (headroom / (Z_SCORE * max(volatility or 0, VOLATILITY_FLOOR))) ** 2
+    return min(max_interval, max(min_interval, interval))
+
+
+def headrooms(book, rules: list, current_price: float) -> list:
+    """Percent move left before each position's liquidation alert, None without a liquidation price.
+
+    Positions without a liquidation rule count from the liquidation price itself.
+    """
+    if not current_price:
+        return [None] * len(book)
+    inv = 100 / current_price
+    return [
+        ((current_price - liq) if lng else (liq - current_price)) * inv
+        - (rule["liquidation"].threshold if rule["liquidation"] else 0)
+        if liq else None
+        for lng, liq, rule in zip(book.long, book.liquidation, rules)
+    ]
+
+
+class PollScheduler:
+    """Next position poll per account.
+
+    plan() records a decision for an account from its cached positions
+    (see alert_check.hold_positions) and due() says whether that account
+    should be fetched now. The latest decision per account is kept in
+    `decisions`, and decisions that change are passed to `log`.
+    """
+
+    def __init__(self, max_interval: float, log=None):
+        self.max_interval = max_interval
+        self.decisions = {}  # Account name -> latest decision
+        self.log = log
+
+    def plan(self, account, held: dict, current_price: float, volatility: float,
+             needs: set = ("positions",), now: float = None) -> dict:
+        """Decide when `account` is next polled; returns the decision."""
+        now = time.time() if now is None else now
+        floor = max(MIN_POLL_INTERVAL, budget_interval(poll_cost(needs)))
+        ceiling = max(self.max_interval, floor)
+        book = held["book"]
+        room = headrooms(book, held["rules"], current_price)
+        riskiest = nsmallest(DEBUG_POSITIONS, (i for i, h in enumerate(room) if h is not None),
+                             key=room.__getitem__)
+        positions = [
+            {"id": book.ids[i], "headroom": room[i],
+             "interval": poll_interval(room[i], volatility, floor, ceiling)}
+            for i in riskiest
+        ]
+        if held.get("near"):
+            interval, reason = floor, "near threshold"
+        elif not positions:
+            interval, reason = ceiling, "no liquidation risk"
+        else:
+            interval = positions[0]["interval"]
+            if positions[0]["headroom"] <= 0:
+                reason = "inside threshold"
+            elif interval <= floor:
+                reason = "budget floor" if floor > MIN_POLL_INTERVAL else "minimum interval"
+            elif interval >= ceiling:
+                reason = "maximum interval"
+            else:
+                reason = "volatility"
+        decision = {
+            "account": account,
+            "at": now,
+            "price": current_price,
+            "volatility": volatility,
+            "interval": interval,
+            "reason": reason,
+            "near": bool(held.get("near")),
+            "next_poll": held["fetched"] + interval,
+            "positions": positions,
+        }
+        previous = self.decisions.get(account)
+        self.decisions[account] = decision
+        label = account or "default"
+        metrics.set_gauge("lnm_poll_interval_seconds", interval, account=label)
+        if positions:
+            metrics.set_gauge("lnm_poll_headroom_percent", positions[0]["headroom"], account=label)
+        if volatility is not None:
+            metrics.set_gauge("lnm_price_volatility", volatility)
+        if self.log and _changed(previous, decision):
+            self.log(decision)
+        return decision
+
+    def due(self, account, now: float = None) -> bool:
+        """Whether `account` should be polled now; accounts never planned always are."""
+        decision = self.decisions.get(account)
+        if decision is None:
+            return True
+        now = time.time() if now is None else now
+        return now + POLL_SLACK >= decision["next_poll"]
+
+    def next_poll(self, account) -> float:
+        """Time of the next poll of `account`, or None if it was never planned."""
+        decision = self.decisions.get(account)
+        return decision["next_poll"] if decision else None
+
+    def earliest(self) -> float:
+        """Time of the next poll of any account, or None."""
+        return min((d["next_poll"] for d in self.decisions.values()), default=None)
+
+
+def _changed(previous: dict, decision: dict) -> bool:
+    """Whether a decision differs enough from the previous one to log it."""
+    if previous is None:
+        return True
+    ids = [d["positions"][0]["id"] if d["positions"] else None for d in (previous, decision)]
+    return (previous["reason"] != decision["reason"] or ids[0] != ids[1]
+            or abs(decision["interval"] - previous["interval"]) > previous["interval"] * LOG_CHANGE)
+
+
+def format_decision(decision: dict) -> str:
+    """One line explaining a decision, for debug output."""
+    account = f" [{decision['account']}]" if decision["account"] else ""
+    volatility = decision["volatility"]
+    line = (f"🗓️ Positions{account}: next poll in {decision['interval']:.0f}s ({decision['reason']}), "
+            + (f"volatility {volatility:.4f}%/√s" if volatility is not None else "volatility unknown"))
+    if decision["positions"]:
+        riskiest = decision["positions"][0]
+        line += f", riskiest #{riskiest['id'][:8]} {riskiest['headroom']:+.2f}% from its alert"
+    return line
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Incremental position tracking.
+
+Each refresh is reduced to a small snapshot per position (side, quantity,
+margin, entry and liquidation price) and diffed against the previous one,
+which yields typed change events. Isolated trades that disappeared are
+looked up among the trades closed since a saved cursor, newest first, to
+tell a liquidation from a manual close without re-reading the history.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lnm_client import get_closed_trades, record_time
+from risk_engine import is_long
+
+CROSS_ID = "cross"  # Snapshot key of the cross position
+SNAPSHOT_FIELDS = ("quantity", "margin", "price", "liquidation")
+CLOSED_PAGES_MAX = 5  # Pages of closed trades read per lookup
+CURSOR_OVERLAP_MS = 60_000  # Re-read this much before the cursor in case closes land late
+LIQUIDATION_LOSS_RATIO = 0.98  # A loss of at least 98% of margin counts as liquidated
+
+# Event kinds, in the order they are reported
+EVENT_KINDS = ("liquidated", "closed", "partially_closed", "margin_removed",
+               "margin_added", "increased", "opened")
+
+
+def snapshot(positions: dict) -> dict:
+    """Reduce get_all_positions() output to {id: fields} for diffing."""
+    current = {}
+    for trade in positions.get("isolated", []):
+        current[str(trade.get("id"))] = _fields(trade, cross=False)
+    cross = positions.get("cross") or {}
+    if cross.get("quantity", 0):
+        current[CROSS_ID] = _fields(cross, cross=True)
+    return current
+
+
+def _fields(position: dict, cross: bool) -> dict:
+    fields = {name: position.get(name) or 0 for name in SNAPSHOT_FIELDS}
+    fields["side"] = "b" if is_long(position.get("side", "")) else "s"
+    fields["cross"] = cross
+    return fields
+
+
+def diff_snapshots(previous: dict, current: dict) -> list:
+    """Change events between two snapshots.
+
+    Each event is {"kind", "id", "before", "after"}; `before` is None for an
+    opened position and `after` is None for a closed one. A cross position
+    that flipped side is reported as closed, then opened.
+    """
+    events = []
+    for position_id, before in previous.items():
+        after = current.get(position_id)
+        if after is None or after["side"] != before["side"]:
+            events.append(_event("closed", position_id, before, None))
+            if after is not None:
+                events.append(_event("opened", position_id, None, after))
+            continue
+        if after["quantity"] > before["quantity"]:
+            events.append(_event("increased", position_id, before, after))
+        elif after["quantity"] < before["quantity"]:
+            events.append(_event("partially_closed", position_id, before, after))
+        elif after["margin"] > before["margin"]:
+            events.append(_event("margin_added", position_id, before, after))
+        elif after["margin"] < before["margin"]:
+            events.append(_event("margin_removed", position_id, before, after))
+    for position_id, after in current.items():
+        if position_id not in previous:
+            events.append(_event("opened", position_id, None, after))
+    events.sort(key=lambda e: EVENT_KINDS.index(e["kind"]))
+    return events
+
+
+def _event(kind: str, position_id: str, before: dict, after: dict) -> dict:
+    return {"kind": kind, "id": position_id, "before": before, "after": after}
+
+
+def is_liquidation(trade: dict) -> bool:
+    """Whether a closed trade was liquidated rather than closed by the user.
+
+    Uses an explicit flag when the API gives one, otherwise an exit at or
+    past the liquidation price, or a loss of (nearly) the whole margin.
+    """
+    reason = str(trade.get("closeReason") or trade.get("closedReason") or "").lower()
+    if reason:
+        return "liquidat" in reason
+    if trade.get("liquidated") is not None:
+        return bool(trade["liquidated"])
+    exit_price = trade.get("exitPrice") or 0
+    liquidation = trade.get("liquidation") or 0
+    if exit_price and liquidation:
+        if is_long(trade.get("side", "")):
+            return exit_price <= liquidation
+        return exit_price >= liquidation
+    margin = trade.get("margin") or 0
+    return bool(margin) and (trade.get("pl") or 0) <= -margin * LIQUIDATION_LOSS_RATIO
+
+
+def fetch_closed_trades(credentials: tuple, since_ms: int, wanted: set,
+                        max_pages: int = CLOSED_PAGES_MAX) -> list:
+    """Closed trades since `since_ms`, paging newest first until every `wanted` id is seen."""
+    trades = []
+    missing = set(wanted)
+    for pages, (items, _) in enumerate(get_closed_trades(credentials, since_ms), 1):
+        trades.extend(items)
+        missing.difference_update(str(t.get("id")) for t in items)
+        if not missing or pages >= max_pages:
+            break
+    return trades
+
+
+class PositionTracker:
+    """Keeps the last snapshot and the closed-trades cursor in a state section.
+
+    update() diffs a refresh against the last snapshot; closes() lists the
+    isolated trades whose close reason should be looked up, and classify()
+    resolves them from the trades fetch_closed_trades() returned. The first
+    update only records a baseline, so existing positions are not reported
+    as opened and no history is fetched.
+    """
+
+    def __init__(self, state: dict):
+        self.state = state
+        legacy = state.pop("tracked_positions", None)
+        if "position_snapshot" not in state and legacy is not None:
+            # Ids tracked before snapshots existed: report the ones that are gone
+            state["position_snapshot"] = {
+                str(pid): {"side": None, "cross": False, **dict.fromkeys(SNAPSHOT_FIELDS, 0)}
+                for pid in legacy
+            }
+        state.setdefault("closed_since", int(time.time() * 1000) - CURSOR_OVERLAP_MS)
+
+    def update(self, positions: dict) -> list:
+        current = snapshot(positions)
+        previous = self.state.get("position_snapshot")
+        self.state["position_snapshot"] = current
+        if previous is None:
+            return []
+        for position_id, before in previous.items():
+            if before["side"] is None and position_id in current:
+                previous[position_id] = current[position_id]  # Migrated id still open
+        return diff_snapshots(previous, current)
+
+    @staticmethod
+    def closes(events: list) -> set:
+        return {e["id"] for e in events if e["kind"] == "closed" and not e["before"]["cross"]}
+
+    def classify(self, events: list, trades: list) -> list:
+        """Mark closed events "liquidated" where the trade was, attaching the closed trade.
+
+        Closes not found among `trades` keep kind "closed" with no trade. The
+        cursor moves up to the newest close seen.
+        """
+        by_id = {str(t.get("id")): t for t in trades}
+        for event in events:
+            trade = by_id.get(event["id"]) if event["kind"] == "closed" else None
+            if trade is not None:
+                event["trade"] = trade
+                if is_liquidation(trade):
+                    event["kind"] = "liquidated"
+        # Trades without a parseable close time are classified but do not move the cursor
+        newest = max(filter(None, map(record_time, trades)), default=0)
+        if newest:
+            self.state["closed_since"] = max(self.state["closed_since"],
+                                             newest - CURSOR_OVERLAP_MS)
+        events.sort(key=lambda e: EVENT_KINDS.index(e["kind"]))
+        return events
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Time-based price movement detection over several windows.
+
+Samples go into a fixed-size ring buffer. Each window keeps monotonic deques
+of buffer positions for its running max and min, so every tick costs
+amortized O(1) per window regardless of sampling rate, and a spike that
+reverts inside the window is still seen as a peak-to-trough move.
+"""
+
+from math import log, sqrt
+from array import array
+from collections import deque
+
+
+class RingBuffer:
+    """Fixed-capacity (timestamp, price) buffer addressed by sequence number."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array("d", [0.0]) * capacity
+        self.prices = array("d", [0.0]) * capacity
+        self.count = 0  # Samples ever appended; the next sequence number
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, ts: float, price: float) -> int:
+        """Store a sample and return its sequence number."""
+        seq = self.count
+        slot = seq % self.capacity
+        self.times[slot] = ts
+        self.prices[slot] = price
+        self.count += 1
+        return seq
+
+    def oldest(self) -> int:
+        """Sequence number of the oldest sample still held."""
+        return max(0, self.count - self.capacity)
+
+    def get(self, seq: int) -> tuple:
+        slot = seq % self.capacity
+        return self.times[slot], self.prices[slot]
+
+    def samples(self) -> list:
+        """All held samples, oldest first, as [timestamp, price] pairs."""
+        return [list(self.get(seq)) for seq in range(self.oldest(), self.count)]
+
+
+class PriceWindow:
+    """Running max/min of the samples within `seconds` of the newest one."""
+
+    def __init__(self, buffer: RingBuffer, seconds: float):
+        self.buffer = buffer
+        self.seconds = seconds
+        self._max = deque()  # Sequence numbers, prices decreasing
+        self._min = deque()  # Sequence numbers, prices increasing
+
+    def push(self, seq: int) -> None:
+        ts, price = self.buffer.get(seq)
+        prices = self.buffer.prices
+        capacity = self.buffer.capacity
+        while self._max and prices[self._max[-1] % capacity] <= price:
+            self._max.pop()
+        self._max.append(seq)
+        while self._min and prices[self._min[-1] % capacity] >= price:
+            self._min.pop()
+        self._min.append(seq)
+
+        # Drop samples that left the window or were overwritten in the buffer
+        cutoff = ts - self.seconds
+        oldest = self.buffer.oldest()
+        for extreme in (self._max, self._min):
+            while extreme and (extreme[0] < oldest or self.buffer.get(extreme[0])[0] < cutoff):
+                extreme.popleft()
+
+    def move(self) -> tuple:
+        """Largest move inside the window as (percent, from sample, to sample), or None.
+
+        The move runs from whichever extreme came first to the other one, so a
+        drop reads negative and a rally positive.
+        """
+        if not self._max:
+            return None
+        hi, lo = self._max[0], self._min[0]
+        if hi == lo:
+            return None
+        first, last = (lo, hi) if lo < hi else (hi, lo)
+        start, end = self.buffer.get(first), self.buffer.get(last)
+        if start[1] <= 0:
+            return None
+        return (end[1] - start[1]) / start[1] * 100, start, end
+
+
+class MovementDetector:
+    """Peak-to-trough move detection over several time windows."""
+
+    def __init__(self, windows: dict, capacity: int = 100_000):
+        # windows: {seconds: threshold percent}
+        self.buffer = RingBuffer(capacity)
+        self.windows = [(PriceWindow(self.buffer, seconds), threshold)
+                        for seconds, threshold in sorted(windows.items())]
+
+    def add(self, ts: float, price: float) -> None:
+        """Record a sample. Out-of-order samples are ignored."""
+        if self.buffer.count and ts < self.buffer.get(self.buffer.count - 1)[0]:
+            return
+        seq = self.buffer.append(ts, price)
+        for window, _ in self.windows:
+            window.push(seq)
+
+    def moves(self) -> list:
+        """(window seconds, percent, from sample, to sample) for every window with a move."""
+        found = []
+        for window, _ in self.windows:
+            move = window.move()
+            if move is not None:
+                found.append((window.seconds,) + move)
+        return found
+
+    def breaches(self, floors: dict = None) -> list:
+        """(window seconds, percent, from sample, to sample) for windows over threshold.
+
+        `floors` ({seconds: percent}) replaces the thresholds, e.g. with the
+        re-arm levels an AlertSuppressor needs to see.
+        """
+        if floors is None:
+            floors = {window.seconds: threshold for window, threshold in self.windows}
+        return over_floor(self.moves(), floors)
+
+    def volatility(self, seconds: float):
+        """Realized volatility over the last `seconds`, in percent per √second, or None.
+
+        Squared log returns are summed and divided by the time they span, so
+        irregular sampling and gaps don't bias it. None with fewer than two
+        samples in the window.
+        """
+        buffer = self.buffer
+        seq = buffer.count - 1
+        if seq < 1:
+            return None
+        end_ts, price = buffer.get(seq)
+        start_ts = end_ts
+        total = 0.0
+        while seq > buffer.oldest():
+            ts, previous = buffer.get(seq - 1)
+            if ts < end_ts - seconds:
+                break
+            if previous > 0 and price > 0:
+                total += log(price / previous) ** 2
+            start_ts, price = ts, previous
+            seq -= 1
+        if end_ts <= start_ts:
+            return None
+        return sqrt(total / (end_ts - start_ts)) * 100
+
+    def samples(self) -> list:
+        return self.buffer.samples()
+
+    def load(self, samples: list) -> None:
+        """Replay saved [timestamp, price] samples."""
+        for ts, price in samples:
+            self.add(ts, price)
+
+
+def over_floor(moves: list, floors: dict) -> list:
+    """The moves() entries at least their window's floor percent, shortest window first.
+
+    Longer windows that see exactly the same move as a shorter one are
+    left out.
+    """
+    found = []
+    seen = set()
+    for seconds, pct, start, end in moves:
+        if abs(pct) < floors[seconds] or (start, end) in seen:
+            continue
+        seen.add((start, end))
+        found.append((seconds, pct, start, end))
+    return found
+
+
+def format_duration(seconds: float) -> str:
+    """Human-readable duration, e.g. '45 seconds', '5 minutes', '2 hours'."""
+    seconds = max(int(round(seconds)), 1)
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size:
+            n = round(seconds / size)
+            return f"{n} {unit}{'s' if n != 1 else ''}"
+    return f"{seconds} second{'s' if seconds != 1 else ''}"
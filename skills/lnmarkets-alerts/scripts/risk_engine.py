@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""Shared risk evaluation for LN Markets positions.
+
+Positions are loaded into a columnar PositionBook (one array per field) so
+liquidation distance and loss ratio are computed for the whole book in a
+single pass instead of per-dict lookups.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import repeat
+
+NAN = float("nan")
+SATS_PER_BTC = 100_000_000
+
+
+def is_long(side: str) -> bool:
+    """Check if position is long (buy)."""
+    return side in ("b", "buy")
+
+
+def inverse_pl(long: bool, quantity: float, entry_price: float, price: float) -> float:
+    """Unrealized PnL in sats of an inverse futures position of `quantity` USD."""
+    if not (entry_price and price):
+        return 0.0
+    pl = quantity * (1 / entry_price - 1 / price) * SATS_PER_BTC
+    return pl if long else -pl
+
+
+def liquidation_distance(side: str, liq_price: float, current_price: float):
+    """Percent the price can move against a position before liquidation, or None."""
+    if not (liq_price and current_price):
+        return None
+    if is_long(side):
+        return ((current_price - liq_price) / current_price) * 100
+    return ((liq_price - current_price) / current_price) * 100
+
+
+class PositionBook:
+    """Columnar store of isolated trades plus the cross position."""
+
+    def __init__(self):
+        self.ids = []
+        self.cross = array("b")  # 1 for the cross position, 0 for isolated trades
+        self.long = array("b")  # 1 for long, 0 for short
+        self.quantity = array("d")
+        self.price = array("d")  # Entry price
+        self.margin = array("d")
+        self.pl = array("d")
+        self.liquidation = array("d")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, position: dict, cross: bool = False) -> None:
+        """Append one position dict."""
+        # The cross position is keyed "cross" whatever its API id, so rule overrides can name it
+        self.ids.append("cross" if cross else str(position.get("id", "?")))
+        self.cross.append(1 if cross else 0)
+        self.long.append(1 if is_long(position.get("side", "unknown")) else 0)
+        self.quantity.append(position.get("quantity", 0) or 0)
+        self.price.append(position.get("price", 0) or 0)
+        self.margin.append(position.get("margin", 0) or 0)
+        self.pl.append(position.get("pl", 0) or 0)
+        self.liquidation.append(position.get("liquidation", 0) or 0)
+
+    @classmethod
+    def from_positions(cls, isolated: list, cross: dict = None) -> "PositionBook":
+        """Build a book from API results; a cross position with no quantity is skipped."""
+        book = cls()
+        for trade in isolated:
+            book.add(trade)
+        if cross and cross.get("quantity", 0) != 0:
+            book.add(cross, cross=True)
+        return book
+
+    def side_str(self, i: int) -> str:
+        return "LONG" if self.long[i] else "SHORT"
+
+
+def evaluate(book: PositionBook, current_price: float) -> tuple:
+    """Compute (liquidation distance %, loss % of margin) arrays for every position.
+
+    Distance is NaN where there is no liquidation price or no current price;
+    loss is 0 unless the position has margin and a negative PnL.
+    """
+    if current_price:
+        inv = 100 / current_price
+        distance = array("d", [
+            ((current_price - liq) if lng else (liq - current_price)) * inv if liq else NAN
+            for lng, liq in zip(book.long, book.liquidation)
+        ])
+    else:
+        distance = array("d", [NAN]) * len(book)
+    loss = array("d", [
+        -pl / margin * 100 if margin > 0 and pl < 0 else 0.0
+        for margin, pl in zip(book.margin, book.pl)
+    ])
+    return distance, loss
+
+
+def breaches(book: PositionBook, current_price: float, liq_threshold: float,
+             loss_threshold: float) -> list:
+    """List (index, kind, value) for every breached threshold, in book order.
+
+    kind is "liquidation" (value = % from liquidation, below liq_threshold) or
+    "loss" (value = % of margin lost, above loss_threshold). Either threshold
+    may be a sequence with one value per position; NaN turns a check off.
+    """
+    distance, loss = evaluate(book, current_price)
+    if not hasattr(liq_threshold, "__len__"):
+        liq_threshold = repeat(liq_threshold)
+    if not hasattr(loss_threshold, "__len__"):
+        loss_threshold = repeat(loss_threshold)
+    hits = []
+    for i, (d, l, dt, lt) in enumerate(zip(distance, loss, liq_threshold, loss_threshold)):
+        if d < dt:  # False for NaN
+            hits.append((i, "liquidation", d))
+        if l > lt:
+            hits.append((i, "loss", l))
+    return hits
+
+
+def margin_usage(book: PositionBook, balance: float):
+    """Percent of account equity (balance + margin + PnL) held as position margin, or None."""
+    margin = sum(book.margin)
+    equity = balance + margin + sum(book.pl)
+    if equity <= 0:
+        return None
+    return margin / equity * 100
+
+
+def trigger_price(long: bool, liq_price: float, threshold: float) -> float:
+    """Index price at which a position comes within `threshold`% of liquidation.
+
+    A long alerts below its trigger, a short above it.
+    """
+    if long:
+        return liq_price / (1 - threshold / 100)
+    return liq_price / (1 + threshold / 100)
+
+
+def loss_trigger_price(long: bool, quantity: float, entry_price: float, margin: float,
+                       threshold: float):
+    """Index price at which a position has lost `threshold`% of its margin, or None.
+
+    A long alerts below its trigger, a short above it. None without quantity,
+    entry price or margin, or when a short can't lose that much: its loss in
+    sats is capped at quantity / entry price.
+    """
+    if not (quantity and entry_price and margin):
+        return None
+    loss_per_usd = margin * threshold / 100 / (quantity * SATS_PER_BTC)  # BTC lost per USD held
+    if long:
+        return 1 / (1 / entry_price + loss_per_usd)
+    inverse = 1 / entry_price - loss_per_usd
+    return 1 / inverse if inverse > 0 else None
+
+
+class LiquidationIndex:
+    """Positions sorted by liquidation-alert trigger price.
+
+    crossed(price) is a bisect lookup that returns only the positions whose
+    trigger the price has passed, so per-tick cost depends on the number of
+    alerts rather than the number of positions. Positions are added and
+    removed incrementally.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        # Parallel sorted lists per side: triggers and position ids
+        self._triggers = {True: [], False: []}
+        self._ids = {True: [], False: []}
+        self._entries = {}  # id -> (long, liquidation, trigger)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, position_id):
+        return position_id in self._entries
+
+    def add(self, position_id: str, long: bool, liq_price: float) -> None:
+        """Insert or move a position; positions without a liquidation price are ignored."""
+        self._place(position_id, bool(long), liq_price)
+
+    def _trigger(self, long: bool, liq_price: float):
+        return trigger_price(long, liq_price, self.threshold) if liq_price else None
+
+    def _keys(self, book: PositionBook):
+        return book.liquidation
+
+    def _place(self, position_id: str, long: bool, key) -> None:
+        entry = self._entries.get(position_id)
+        if entry is not None:
+            if entry[:2] == (long, key):
+                return
+            self.remove(position_id)
+        trigger = self._trigger(long, key)
+        if trigger is None:
+            return
+        triggers, ids = self._triggers[long], self._ids[long]
+        i = bisect_right(triggers, trigger)
+        triggers.insert(i, trigger)
+        ids.insert(i, position_id)
+        self._entries[position_id] = (long, key, trigger)
+
+    def remove(self, position_id: str) -> None:
+        entry = self._entries.pop(position_id, None)
+        if entry is None:
+            return
+        long, _, trigger = entry
+        triggers, ids = self._triggers[long], self._ids[long]
+        i = bisect_left(triggers, trigger)
+        while ids[i] != position_id:  # Step over equal triggers
+            i += 1
+        del triggers[i]
+        del ids[i]
+
+    def sync(self, book: PositionBook) -> None:
+        """Bring the index in line with a fresh book: add, move and drop positions."""
+        current = set(book.ids)
+        for position_id in [p for p in self._entries if p not in current]:
+            self.remove(position_id)
+        for position_id, long, key in zip(book.ids, book.long, self._keys(book)):
+            self._place(position_id, bool(long), key)
+
+    def crossed(self, current_price: float) -> list:
+        """Ids of positions within the threshold of liquidation at this price."""
+        if not current_price:
+            return []
+        longs = self._ids[True][bisect_right(self._triggers[True], current_price):]
+        shorts = self._ids[False][:bisect_left(self._triggers[False], current_price)]
+        return longs + shorts
+
+
+class LossIndex(LiquidationIndex):
+    """Positions sorted by the index price at which their loss reaches the threshold.
+
+    Same lookups as LiquidationIndex, with triggers from the inverse futures
+    PnL on quantity, entry price and margin rather than from the
+    liquidation price.
+    """
+
+    def add(self, position_id: str, long: bool, quantity: float, entry_price: float,
+            margin: float) -> None:
+        self._place(position_id, bool(long), (quantity, entry_price, margin))
+
+    def _trigger(self, long: bool, key: tuple):
+        return loss_trigger_price(long, *key, self.threshold)
+
+    def _keys(self, book: PositionBook):
+        return zip(book.quantity, book.price, book.margin)
+
+
+def price_grid(current_price: float, span: float, step: float) -> list:
+    """Index prices from -span% to +span% of `current_price` in `step`% steps, ascending.
+
+    Includes `current_price` itself; levels at or below zero are left out.
+    Raises ValueError unless `span` and `step` are positive.
+    """
+    if span <= 0 or step <= 0:
+        raise ValueError("Stress grid span and step must be above 0")
+    n = int(round(span / step))
+    prices = [current_price * (1 + k * step / 100) for k in range(-n, n + 1)]
+    return [p for p in prices if p > 0]
+
+
+class _SideSums:
+    """One side of a book sorted by liquidation and by entry price, with prefix sums.
+
+    Inverse futures PnL is linear in 1 / price: a long's is a - b / price with
+    a = quantity / entry and b = quantity (in sats), a short's the negative.
+    So the PnL of any run of positions at any price is two prefix-sum lookups.
+    Positions without an entry price contribute margin only.
+    """
+
+    def __init__(self, book: PositionBook, indices: list, long: bool):
+        never = 0.0 if long else float("inf")  # No liquidation price: never liquidated
+        liquidation = [book.liquidation[i] or never for i in indices]
+        by_liquidation = sorted(range(len(indices)), key=liquidation.__getitem__)
+        self.liquidation = [liquidation[j] for j in by_liquidation]
+        self.ids = [indices[j] for j in by_liquidation]  # Book indices in liquidation order
+        terms = [self._terms(book, i) for i in indices]
+        self.liq_sums = self._prefix([terms[j] for j in by_liquidation])
+        by_entry = sorted(range(len(indices)), key=lambda j: book.price[indices[j]])
+        self.entry = [book.price[indices[j]] for j in by_entry]
+        self.entry_sums = self._prefix([terms[j] for j in by_entry])
+
+    @staticmethod
+    def _terms(book: PositionBook, i: int) -> tuple:
+        entry = book.price[i]
+        if not entry:
+            return 0.0, 0.0, book.margin[i]
+        sats = book.quantity[i] * SATS_PER_BTC
+        return sats / entry, sats, book.margin[i]
+
+    @staticmethod
+    def _prefix(terms: list) -> list:
+        """Running sums of (a, b, margin), starting from zeros."""
+        sums = [(0.0, 0.0, 0.0)]
+        a = b = m = 0.0
+        for ta, tb, tm in terms:
+            a += ta
+            b += tb
+            m += tm
+            sums.append((a, b, m))
+        return sums
+
+    @staticmethod
+    def span(sums: list, start: int, stop: int) -> tuple:
+        (a0, b0, m0), (a1, b1, m1) = sums[start], sums[stop]
+        return a1 - a0, b1 - b0, m1 - m0
+
+
+def stress_test(book: PositionBook, prices: list, current_price: float) -> list:
+    """Book PnL, margin consumed and liquidations at every price in an ascending grid.
+
+    Each level is a dict: "price"; "pl", the book's PnL in sats with
+    liquidated positions losing their whole margin; "margin_consumed", sats
+    of margin lost to liquidations and unrealized losses; "liquidated", the
+    count of positions past their liquidation price, with
+    "liquidated_margin" their margin; and "newly", book indices of the
+    positions that liquidate between this level and the next one towards
+    `current_price` (at the level nearest it: all already past liquidation).
+
+    Sides are sorted once and every level is a few bisects over prefix sums,
+    so the cost is O((positions + levels) log positions).
+    """
+    longs = _SideSums(book, [i for i in range(len(book)) if book.long[i]], True)
+    shorts = _SideSums(book, [i for i in range(len(book)) if not book.long[i]], False)
+    origin = min(range(len(prices)), key=lambda k: abs(prices[k] - current_price), default=0)
+    n_long, n_short = len(longs.ids), len(shorts.ids)
+    all_long = _SideSums.span(longs.liq_sums, 0, n_long)
+    all_short = _SideSums.span(shorts.liq_sums, 0, n_short)
+
+    def pl(sums, sign, inv):
+        return sign * (sums[0] - sums[1] * inv)
+
+    levels = []
+    bounds = []  # (first liquidated long, stop of liquidated shorts) per level
+    for price in prices:
+        inv = 1 / price
+        # Longs liquidate at or below their liquidation price, shorts at or above
+        first_long = bisect_left(longs.liquidation, price)
+        stop_short = bisect_right(shorts.liquidation, price)
+        liq_long = _SideSums.span(longs.liq_sums, first_long, n_long)
+        liq_short = _SideSums.span(shorts.liq_sums, 0, stop_short)
+        # Losing: longs entered above the price, shorts below it
+        losing_long = _SideSums.span(longs.entry_sums, bisect_right(longs.entry, price), n_long)
+        losing_short = _SideSums.span(shorts.entry_sums, 0, bisect_left(shorts.entry, price))
+
+        liquidated_margin = liq_long[2] + liq_short[2]
+        survivors_pl = (pl(all_long, 1, inv) - pl(liq_long, 1, inv)
+                        + pl(all_short, -1, inv) - pl(liq_short, -1, inv))
+        # A liquidation price is on the losing side of entry, so liquidated positions are losing ones
+        unrealized_loss = -(pl(losing_long, 1, inv) - pl(liq_long, 1, inv)
+                            + pl(losing_short, -1, inv) - pl(liq_short, -1, inv))
+        levels.append({
+            "price": price,
+            "pl": survivors_pl - liquidated_margin,
+            "margin_consumed": liquidated_margin + max(unrealized_loss, 0.0),
+            "liquidated": (n_long - first_long) + stop_short,
+            "liquidated_margin": liquidated_margin,
+        })
+        bounds.append((first_long, stop_short))
+
+    # Moving down from the current price only longs liquidate, moving up only shorts
+    for k, level in enumerate(levels):
+        first_long, stop_short = bounds[k]
+        if k == origin:
+            level["newly"] = longs.ids[first_long:] + shorts.ids[:stop_short]
+        elif k < origin:
+            level["newly"] = longs.ids[first_long:bounds[k + 1][0]]
+        else:
+            level["newly"] = shorts.ids[bounds[k - 1][1]:stop_short]
+    return levels
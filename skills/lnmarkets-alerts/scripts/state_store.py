@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Crash-safe alert state store (SQLite in WAL mode).
+
+Small state (clock offset, tracked positions, per-account sections) lives in
+a key/value table. Price samples and position changes are appended as they
+happen instead of rewriting a JSON file, every save is one transaction, and
+loading only reads the recent window through an index, however much history
+has piled up. History older than the retention period is pruned with
+prune(); what is kept stays queryable.
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS price_samples (
+    ts REAL PRIMARY KEY,
+    price REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS open_positions (
+    account TEXT NOT NULL,
+    position_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,  -- Position without volatile fields
+    PRIMARY KEY (account, position_id)
+);
+CREATE TABLE IF NOT EXISTS position_snapshots (
+    ts REAL NOT NULL,
+    account TEXT NOT NULL,
+    position_id TEXT NOT NULL,
+    data TEXT  -- NULL once the position is gone
+);
+CREATE INDEX IF NOT EXISTS position_snapshots_by_position
+    ON position_snapshots (account, position_id, ts);
+CREATE INDEX IF NOT EXISTS position_snapshots_by_time
+    ON position_snapshots (ts);
+"""
+
+# Fields that move with the price on every fetch; a change in these alone is
+# not recorded as a new snapshot
+VOLATILE_FIELDS = ("pl",)
+
+
+def _fingerprint(position: dict) -> str:
+    return json.dumps({k: v for k, v in position.items() if k not in VOLATILE_FIELDS},
+                      sort_keys=True)
+
+
+class StateStore:
+    """SQLite-backed state; safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints, safe under WAL
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def load(self) -> dict:
+        """All key/value state as a dict."""
+        with self._lock:
+            rows = self._db.execute("SELECT key, value FROM kv").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def save(self, values: dict, prices: list = (), positions: list = ()) -> None:
+        """Write key/values, append price samples and record position changes atomically.
+
+        prices: [(ts, price)]; positions: [(ts, account, [position dicts])].
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)",
+                    [(key, json.dumps(value)) for key, value in values.items()])
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO price_samples (ts, price) VALUES (?, ?)", prices)
+                for ts, account, snapshot in positions:
+                    self._record_positions(ts, account, snapshot)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def prune(self, before: float) -> tuple:
+        """Delete price samples and position changes older than `before`; returns (prices, changes).
+
+        Both are indexed by time. Open positions are unaffected, since change
+        detection compares against open_positions.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                prices = self._db.execute("DELETE FROM price_samples WHERE ts < ?", (before,)).rowcount
+                changes = self._db.execute(
+                    "DELETE FROM position_snapshots WHERE ts < ?", (before,)).rowcount
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return prices, changes
+
+    def _record_positions(self, ts: float, account: str, snapshot: list) -> None:
+        """Log positions that opened, changed or disappeared since the last snapshot."""
+        account = account or ""
+        previous = dict(self._db.execute(
+            "SELECT position_id, fingerprint FROM open_positions WHERE account = ?", (account,)))
+        current = {str(position.get("id", "cross")): position for position in snapshot}
+
+        changed = []
+        for pid, position in current.items():
+            fingerprint = _fingerprint(position)
+            if previous.get(pid) != fingerprint:
+                changed.append((pid, fingerprint, json.dumps(position)))
+        gone = [pid for pid in previous if pid not in current]
+        self._db.executemany(
+            "INSERT INTO position_snapshots (ts, account, position_id, data) VALUES (?, ?, ?, ?)",
+            [(ts, account, pid, data) for pid, _, data in changed]
+            + [(ts, account, pid, None) for pid in gone])
+        self._db.executemany(
+            "INSERT OR REPLACE INTO open_positions (account, position_id, fingerprint) VALUES (?, ?, ?)",
+            [(account, pid, fingerprint) for pid, fingerprint, _ in changed])
+        self._db.executemany(
+            "DELETE FROM open_positions WHERE account = ? AND position_id = ?",
+            [(account, pid) for pid in gone])
+
+    def prices(self, since: float = None, until: float = None) -> list:
+        """Price samples as [ts, price] pairs, oldest first."""
+        query = "SELECT ts, price FROM price_samples WHERE ts >= ? AND ts <= ? ORDER BY ts"
+        with self._lock:
+            rows = self._db.execute(query, (since or 0, until or float("inf"))).fetchall()
+        return [list(row) for row in rows]
+
+    def position_history(self, position_id: str = None, account: str = None,
+                         since: float = None) -> list:
+        """Recorded changes as (ts, account, position_id, position dict or None if gone)."""
+        query = "SELECT ts, account, position_id, data FROM position_snapshots WHERE ts >= ?"
+        args = [since or 0]
+        if position_id is not None:
+            query += " AND position_id = ?"
+            args.append(position_id)
+        if account is not None:
+            query += " AND account = ?"
+            args.append(account)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY ts", args).fetchall()
+        return [(ts, acct, pid, json.loads(data) if data else None)
+                for ts, acct, pid, data in rows]
+
+
+def parse_since(value: str) -> float:
+    """Turn '90s', '30m', '4h' or '7d' into an absolute timestamp."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value and value[-1] in units:
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def main():
+    """Query recorded price and position history."""
+    default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".alert_state.db")
+    parser = argparse.ArgumentParser(description="Query LN Markets alert history")
+    parser.add_argument("what", choices=["prices", "positions"])
+    parser.add_argument("--since", default="1h", help="Age (e.g. 30m, 4h, 7d) or unix timestamp")
+    parser.add_argument("--id", help="Only this position id")
+    parser.add_argument("--db", default=default_path)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ No state database at {args.db}")
+        sys.exit(1)
+    store = StateStore(args.db)
+    since = parse_since(args.since)
+
+    if args.what == "prices":
+        for ts, price in store.prices(since):
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}  ${price:,.1f}")
+    else:
+        for ts, account, pid, position in store.position_history(args.id, since=since):
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))
+            who = f" [{account}]" if account else ""
+            if position is None:
+                print(f"{stamp}  #{pid[:8]}{who} gone")
+            else:
+                print(f"{stamp}  #{pid[:8]}{who} qty {position.get('quantity', 0):,} "
+                      f"margin {position.get('margin', 0):,} pl {position.get('pl', 0):+,}")
+
+
+if __name__ == "__main__":
+    main()
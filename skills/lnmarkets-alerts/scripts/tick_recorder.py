@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Compact binary tick recorder with a memory-mapped reader.
+
+Every ticker sample is appended as one fixed-width little-endian record:
+
+    ts (int64 ms) | index | last | bid | offer | funding rate (float32 each)
+
+That is 28 bytes a tick, so a million ticks take 28 MB. Records are kept in
+time order, so TickFile finds a time range by binary search over the mapped
+file and hands out memoryviews (or NumPy arrays) over it without copying.
+Fields missing from a sample are stored as NaN.
+"""
+
+import os
+import sys
+import mmap
+import time
+import struct
+import argparse
+from bisect import bisect_left
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+TICK_FILE = os.environ.get(
+    "LNM_TICK_FILE", os.path.join(os.path.dirname(__file__), "..", ".ticks.bin"))
+
+MAGIC = b"LNMTICK1"
+HEADER = struct.Struct("<8sI4x")  # Magic, record size, padding to 16 bytes
+RECORD = struct.Struct("<q5f")
+FIELDS = ("ts", "index", "last", "bid", "offer", "funding")
+TICKER_KEYS = ("index", "lastPrice", "bid", "offer", "fundingRate")  # Ticker fields in record order
+NUMPY_DTYPE = [("ts", "<i8"), ("index", "<f4"), ("last", "<f4"), ("bid", "<f4"),
+               ("offer", "<f4"), ("funding", "<f4")]
+
+NAN = float("nan")
+
+
+class TickRecorder:
+    """Append-only writer. Samples older than the last one recorded are dropped."""
+
+    def __init__(self, path: str = TICK_FILE):
+        self.path = path
+        self._file = open(path, "a+b")
+        self._file.seek(0, os.SEEK_END)
+        size = self._file.tell()
+        if size == 0:
+            self._file.write(HEADER.pack(MAGIC, RECORD.size))
+            self.last_ts = None
+            return
+        _check_header(self._file, path)
+        # Drop a record torn by a crash mid-write
+        whole = HEADER.size + (size - HEADER.size) // RECORD.size * RECORD.size
+        if whole != size:
+            self._file.truncate(whole)
+        self.last_ts = None
+        if whole > HEADER.size:
+            self._file.seek(whole - RECORD.size)
+            self.last_ts = RECORD.unpack(self._file.read(RECORD.size))[0]
+        self._file.seek(0, os.SEEK_END)
+
+    def append(self, ts_ms: int, index=NAN, last=NAN, bid=NAN, offer=NAN, funding=NAN) -> bool:
+        """Append one sample; returns False if it was out of order."""
+        if self.last_ts is not None and ts_ms < self.last_ts:
+            return False
+        self._file.write(RECORD.pack(ts_ms, index, last, bid, offer, funding))
+        self.last_ts = ts_ms
+        return True
+
+    def record(self, ticker: dict, ts_ms: int = None) -> bool:
+        """Append a ticker (REST or stream shaped); the time defaults to the tick's or now."""
+        if ts_ms is None:
+            ts_ms = tick_time(ticker.get("time"))
+        values = [ticker.get(key) for key in TICKER_KEYS]
+        return self.append(ts_ms, *(NAN if v is None else float(v) for v in values))
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _check_header(f, path: str) -> None:
+    f.seek(0)
+    magic, size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or size != RECORD.size:
+        raise ValueError(f"{path} is not a tick file")
+
+
+class _Timestamps:
+    """Sequence of record timestamps read straight from the map, for bisect."""
+
+    def __init__(self, buffer, count: int):
+        self._buffer = buffer
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i: int) -> int:
+        return struct.unpack_from("<q", self._buffer, HEADER.size + i * RECORD.size)[0]
+
+
+class TickFile:
+    """Read-only memory map of a tick file.
+
+    Records appended after opening are not seen; open it again to pick them up.
+    """
+
+    def __init__(self, path: str = TICK_FILE):
+        self.path = path
+        with open(path, "rb") as f:
+            _check_header(f, path)
+            size = os.fstat(f.fileno()).st_size
+            self._count = (size - HEADER.size) // RECORD.size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self._count else None
+        self._ts = _Timestamps(self._map, self._count)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i: int) -> tuple:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return RECORD.unpack_from(self._map, HEADER.size + i * RECORD.size)
+
+    def span(self, start_ms: int = None, end_ms: int = None) -> tuple:
+        """(first, stop) record indices of ticks with start_ms <= ts < end_ms."""
+        first = 0 if start_ms is None else bisect_left(self._ts, start_ms)
+        stop = self._count if end_ms is None else bisect_left(self._ts, end_ms)
+        return first, max(first, stop)
+
+    def view(self, start_ms: int = None, end_ms: int = None) -> memoryview:
+        """Raw records in the time range, as a memoryview over the map."""
+        first, stop = self.span(start_ms, end_ms)
+        if first == stop:
+            return memoryview(b"")
+        return memoryview(self._map)[HEADER.size + first * RECORD.size:
+                                     HEADER.size + stop * RECORD.size]
+
+    def ticks(self, start_ms: int = None, end_ms: int = None):
+        """Iterate (ts, index, last, bid, offer, funding) tuples in the time range."""
+        view = self.view(start_ms, end_ms)
+        try:
+            yield from RECORD.iter_unpack(view)
+        finally:
+            view.release()
+
+    def to_numpy(self, start_ms: int = None, end_ms: int = None):
+        """Structured NumPy array over the time range, sharing memory with the map."""
+        import numpy as np
+        first, stop = self.span(start_ms, end_ms)
+        if first == stop:
+            return np.empty(0, dtype=np.dtype(NUMPY_DTYPE))
+        return np.frombuffer(self._map, dtype=np.dtype(NUMPY_DTYPE), count=stop - first,
+                             offset=HEADER.size + first * RECORD.size)
+
+    def close(self) -> None:
+        """Unmap the file; views handed out must be released first."""
+        if self._map is not None:
+            self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def tick_time(value) -> int:
+    """A tick's time in ms from epoch ms (number or numeric string) or ISO 8601; now if missing.
+
+    Raises ValueError for anything else.
+    """
+    if value is None or value == "":
+        return int(time.time() * 1000)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(float(value))
+        except ValueError:
+            pass
+        try:
+            return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1000)
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognised tick time: {value!r}")
+
+
+def parse_time(value: str) -> int:
+    """Age (30m, 4h, 7d) before now or a unix timestamp in seconds, as ms."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units:
+        return int((time.time() - float(value[:-1]) * units[value[-1]]) * 1000)
+    return int(float(value) * 1000)
+
+
+def record_loop(path: str, interval: float) -> None:
+    """Poll the REST ticker every `interval` seconds and record it until interrupted."""
+    from lnm_client import get_ticker, set_cache
+    set_cache(enabled=False)
+    with TickRecorder(path) as recorder:
+        while True:
+            started = time.monotonic()
+            try:
+                recorder.record(get_ticker())
+                recorder.flush()
+            except Exception as e:
+                print(f"⚠️ Ticker fetch failed: {e}", file=sys.stderr, flush=True)
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or inspect LN Markets ticks")
+    parser.add_argument("command", choices=["info", "dump", "record"])
+    parser.add_argument("--file", default=TICK_FILE)
+    parser.add_argument("--since", help="Age (e.g. 30m, 4h, 7d) or unix timestamp")
+    parser.add_argument("--until", help="Age or unix timestamp")
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between polls (record)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        try:
+            record_loop(args.file, args.interval)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    start = parse_time(args.since) if args.since else None
+    end = parse_time(args.until) if args.until else None
+    with TickFile(args.file) as ticks:
+        if args.command == "info":
+            first, stop = ticks.span(start, end)
+            print(f"{args.file}: {len(ticks):,} ticks, {stop - first:,} in range")
+            if stop > first:
+                for label, i in (("First", first), ("Last", stop - 1)):
+                    ts = ticks[i][0]
+                    print(f"{label}: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts / 1000))}")
+            return
+        print(",".join(FIELDS))
+        for tick in ticks.ticks(start, end):
+            print(",".join([str(tick[0])] + [f"{v:.8g}" for v in tick[1:]]))
+
+
+if __name__ == "__main__":
+    main()